@@ -0,0 +1,14 @@
+import secrets
+
+from fastapi import Header, HTTPException
+
+from .config import settings
+
+
+async def exigir_token_admin(x_admin_token: str | None = Header(None)) -> None:
+    # Admin routes can flush caches and force reloads from MySQL; without ADMIN_TOKEN
+    # they stay closed.
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Rotas administrativas desligadas (ADMIN_TOKEN vazio)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido")
@@ -0,0 +1,201 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+
+from .config import settings
+from .versioning import VersaoDados, etag_confere
+
+CacheKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+_PARAM_TYPES = (int, float, str, bool, date)
+_REQUEST_PARAM = "etag_request"
+_RESPONSE_PARAM = "etag_response"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+@dataclass
+class EndpointStats:
+    hits: int = 0
+    misses: int = 0
+    ttl: int = 0
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, enabled: bool = True) -> None:
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._stats: Dict[str, EndpointStats] = {}
+        self._size = 0
+        # Dash callbacks call the routers from worker threads, not only from the API loop.
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Any | None:
+        endpoint = key[0]
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stats.hits += 1
+            return entry.value
+
+    def set(self, key: CacheKey, value: Any, ttl: int) -> None:
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._stats.setdefault(key[0], EndpointStats()).ttl = ttl
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value=value, size=size, expires_at=time.monotonic() + ttl)
+            self._size += size
+            # Least recently used entries go first once the memory budget is exceeded.
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, endpoint: str | None = None, ano: int | None = None) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if (endpoint is None or key[0] == endpoint) and (ano is None or _covers_year(key, ano))
+            ]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries_per_endpoint: Dict[str, int] = {}
+            for key in self._entries:
+                entries_per_endpoint[key[0]] = entries_per_endpoint.get(key[0], 0) + 1
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "endpoints": {
+                    endpoint: {
+                        "hits": stats.hits,
+                        "misses": stats.misses,
+                        "ttl": stats.ttl,
+                        "entries": entries_per_endpoint.get(endpoint, 0),
+                    }
+                    for endpoint, stats in self._stats.items()
+                },
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+
+def _covers_year(key: CacheKey, ano: int) -> bool:
+    params = dict(key[1])
+    return params.get("ano") == ano or ano in (params.get("anos") or ())
+
+
+def _estimate_size(value: Any) -> int:
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(repr(value))
+
+
+def _normalize_params(arguments: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    params = {}
+    for name, value in arguments.items():
+        if name == "session":
+            continue
+        if name == "ano" and value is None:
+            # Endpoints without an explicit year answer for the current one.
+            value = datetime.utcnow().year
+        if isinstance(value, (list, tuple)) and all(isinstance(item, _PARAM_TYPES) for item in value):
+            value = tuple(value)
+        if value is None or isinstance(value, _PARAM_TYPES + (tuple,)):
+            params[name] = value
+    return tuple(sorted(params.items()))
+
+
+response_cache = ResponseCache(max_bytes=settings.cache_max_bytes, enabled=settings.cache_enabled)
+
+
+def _etag_headers(etag: str) -> Dict[str, str]:
+    # no-cache: clients may keep the payload but must revalidate it on every use.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def cached(endpoint: str, ttl: int | None = None, versao: VersaoDados | None = None) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        async def data_version(*args: Any, **kwargs: Any) -> str | None:
+            bound = signature.bind_partial(*args, **kwargs)
+            session = bound.arguments.get("session")
+            if versao is None or not settings.etag_enabled or session is None:
+                return None
+            return await versao.token(session, endpoint, _normalize_params(bound.arguments))
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # Injected by FastAPI only; direct callers (the Dash app) pass neither.
+            request: Request | None = kwargs.pop(_REQUEST_PARAM, None)
+            response: Response | None = kwargs.pop(_RESPONSE_PARAM, None)
+
+            token = await data_version(*args, **kwargs)
+            if token is not None:
+                etag = f'W/"{token}"'
+                if request is not None and etag_confere(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=_etag_headers(etag))
+                if response is not None:
+                    response.headers.update(_etag_headers(etag))
+
+            # ttl=0 turns the response cache off for the route; the ETag still applies.
+            validade = settings.cache_default_ttl if ttl is None else ttl
+            if not response_cache.enabled or validade <= 0:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind_partial(*args, **kwargs)
+            params = _normalize_params(bound.arguments)
+            # A new data version is a new entry: a TTL entry never outlives its data.
+            key = (endpoint, params if token is None else params + (("_versao", token),))
+            value = response_cache.get(key)
+            if value is None:
+                value = await func(*args, **kwargs)
+                response_cache.set(key, value, validade)
+            return value
+
+        if versao is not None:
+            wrapper.__signature__ = signature.replace(
+                parameters=[
+                    *signature.parameters.values(),
+                    # Optional, so callers inspecting the signature (tools/index_advisor) can skip them.
+                    inspect.Parameter(
+                        _REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Request
+                    ),
+                    inspect.Parameter(
+                        _RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Response
+                    ),
+                ]
+            )
+        wrapper.data_version = data_version
+        return wrapper
+
+    return decorator
@@ -8,6 +8,47 @@ class Settings(BaseSettings):
     db_user: str = Field(..., alias="DB_USER")
     db_password: str = Field(..., alias="DB_PASSWORD")
     db_name: str = Field(..., alias="DB_NAME")
+    db_pool_size: int = Field(10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(30, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    db_pool_warmup: int = Field(2, alias="DB_POOL_WARMUP")
+    db_statement_timeout_ms: int = Field(0, alias="DB_STATEMENT_TIMEOUT_MS")
+    query_concurrency: int = Field(4, alias="QUERY_CONCURRENCY")
+    admin_token: str = Field("", alias="ADMIN_TOKEN")
+    cache_enabled: bool = Field(True, alias="CACHE_ENABLED")
+    cache_default_ttl: int = Field(300, alias="CACHE_DEFAULT_TTL")
+    cache_max_bytes: int = Field(64 * 1024 * 1024, alias="CACHE_MAX_BYTES")
+    kpi_memo_ttl: int = Field(60, alias="KPI_MEMO_TTL")
+    etag_enabled: bool = Field(True, alias="ETAG_ENABLED")
+    etag_max_age: int = Field(900, alias="ETAG_MAX_AGE")
+    orjson_enabled: bool = Field(False, alias="ORJSON_ENABLED")
+    compression_enabled: bool = Field(True, alias="COMPRESSION_ENABLED")
+    compression_minimum_size: int = Field(1024, alias="COMPRESSION_MINIMUM_SIZE")
+    compression_gzip_level: int = Field(6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(4, alias="COMPRESSION_BROTLI_QUALITY")
+    resumo_mensal_enabled: bool = Field(False, alias="RESUMO_MENSAL_ENABLED")
+    resumo_mensal_refresh_interval: int = Field(0, alias="RESUMO_MENSAL_REFRESH_INTERVAL")
+    estoque_razao_enabled: bool = Field(False, alias="ESTOQUE_RAZAO_ENABLED")
+    estoque_razao_refresh_interval: int = Field(0, alias="ESTOQUE_RAZAO_REFRESH_INTERVAL")
+    estoque_razao_lote: int = Field(50_000, alias="ESTOQUE_RAZAO_LOTE")
+    estoque_razao_atraso: int = Field(60, alias="ESTOQUE_RAZAO_ATRASO")
+    iss_agregado_enabled: bool = Field(False, alias="ISS_AGREGADO_ENABLED")
+    iss_agregado_refresh_interval: int = Field(0, alias="ISS_AGREGADO_REFRESH_INTERVAL")
+    iss_agregado_lote: int = Field(50_000, alias="ISS_AGREGADO_LOTE")
+    iss_agregado_atraso: int = Field(60, alias="ISS_AGREGADO_ATRASO")
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    vencimentos_refresh_interval: int = Field(300, alias="VENCIMENTOS_REFRESH_INTERVAL")
+    depreciacao_refresh_interval: int = Field(300, alias="DEPRECIACAO_REFRESH_INTERVAL")
+    cubo_memoria_enabled: bool = Field(False, alias="CUBO_MEMORIA_ENABLED")
+    cubo_memoria_refresh_interval: int = Field(300, alias="CUBO_MEMORIA_REFRESH_INTERVAL")
+    cubo_memoria_anos: int = Field(5, alias="CUBO_MEMORIA_ANOS")
+    pagination_default_limit: int = Field(100, alias="PAGINATION_DEFAULT_LIMIT")
+    pagination_max_limit: int = Field(1000, alias="PAGINATION_MAX_LIMIT")
+    export_chunk_rows: int = Field(10_000, alias="EXPORT_CHUNK_ROWS")
+    export_delta_lag_seconds: int = Field(60, alias="EXPORT_DELTA_LAG_SECONDS")
+    snapshot_parquet_dir: str = Field("dados/parquet", alias="SNAPSHOT_PARQUET_DIR")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
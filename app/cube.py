@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+AGRUPAMENTOS = ("rollup", "cubo", "separado")
+
+
+@dataclass(frozen=True)
+class Dimensao:
+    coluna: str
+    # Lookup table joined for the label; dimensions without one group by the raw column.
+    tabela: Optional[str] = None
+    rotulo: str = "descricao"
+
+
+@dataclass(frozen=True)
+class CuboSpec:
+    origem: str
+    dimensoes: Mapping[str, Dimensao]
+    medidas: Tuple[str, ...]
+
+
+@dataclass
+class Agregado:
+    conjunto: Tuple[str, ...]
+    chaves: Dict[str, Any]
+    valores: Dict[str, float] = field(default_factory=dict)
+
+
+def conjuntos_de_agrupamento(dimensoes: Sequence[str], agrupamento: str) -> List[Tuple[str, ...]]:
+    dimensoes = tuple(dimensoes)
+    if agrupamento == "rollup":
+        return [dimensoes[:tamanho] for tamanho in range(len(dimensoes), -1, -1)]
+    if agrupamento == "cubo":
+        return [conjunto for tamanho in range(len(dimensoes), -1, -1) for conjunto in combinations(dimensoes, tamanho)]
+    if agrupamento == "separado":
+        return [(dimensao,) for dimensao in dimensoes] + [()]
+    raise ValueError(f"Agrupamento desconhecido: {agrupamento}")
+
+
+def montar_sql(spec: CuboSpec, dimensoes: Sequence[str], medidas: Sequence[str], where: str) -> str:
+    selecionadas, joins = [], []
+    for nome in dimensoes:
+        dimensao = spec.dimensoes[nome]
+        if dimensao.tabela is None:
+            selecionadas.append((f"t.{dimensao.coluna}", nome))
+            continue
+        alias = f"d_{nome}"
+        joins.append(f"LEFT JOIN {dimensao.tabela} {alias} ON {alias}.id = t.{dimensao.coluna}")
+        selecionadas.append((f"{alias}.{dimensao.rotulo}", nome))
+
+    colunas = [f"{expressao} AS {nome}" for expressao, nome in selecionadas]
+    colunas += [f"COALESCE(SUM(t.{medida}), 0) AS {medida}" for medida in medidas]
+    sql = f"SELECT {', '.join(colunas)}\nFROM {spec.origem} t"
+    if joins:
+        sql += "\n" + "\n".join(joins)
+    if where:
+        sql += f"\nWHERE {where}"
+    if selecionadas:
+        sql += "\nGROUP BY " + ", ".join(expressao for expressao, _ in selecionadas)
+    return sql
+
+
+def agregar(
+    linhas: Sequence[Mapping[str, Any]], conjuntos: Sequence[Tuple[str, ...]], medidas: Sequence[str]
+) -> List[Agregado]:
+    agregados: List[Agregado] = []
+    for conjunto in conjuntos:
+        somas: Dict[Tuple[Any, ...], List[float]] = {}
+        for linha in linhas:
+            chave = tuple(linha[nome] for nome in conjunto)
+            # A missing label behaves like the inner join of a dedicated GROUP BY query.
+            if any(valor is None for valor in chave):
+                continue
+            acumulado = somas.setdefault(chave, [0.0] * len(medidas))
+            for indice, medida in enumerate(medidas):
+                acumulado[indice] += float(linha[medida] or 0)
+        if not conjunto and not somas:
+            somas[()] = [0.0] * len(medidas)
+
+        grupo = [
+            Agregado(conjunto=conjunto, chaves=dict(zip(conjunto, chave)), valores=dict(zip(medidas, valores)))
+            for chave, valores in somas.items()
+        ]
+        if medidas:
+            grupo.sort(key=lambda agregado: agregado.valores[medidas[0]], reverse=True)
+        agregados.extend(grupo)
+    return agregados
+
+
+async def fetch_cubo(
+    session: AsyncSession,
+    spec: CuboSpec,
+    dimensoes: Sequence[str],
+    medidas: Sequence[str],
+    agrupamento: str = "rollup",
+    where: str = "",
+    params: Mapping[str, Any] | None = None,
+) -> List[Agregado]:
+    # A single grouped scan at the finest requested grain; every grouping set and
+    # subtotal is then re-aggregated from those rows in Python (MySQL has ROLLUP but
+    # no GROUPING SETS, and independent per-dimension totals need the latter).
+    conjuntos = conjuntos_de_agrupamento(dimensoes, agrupamento)
+    result = await session.execute(text(montar_sql(spec, dimensoes, medidas, where)), dict(params or {}))
+    return agregar([row._mapping for row in result.all()], conjuntos, medidas)
@@ -1,17 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from . import metrics
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, future=True, echo=False)
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    # Times every checkout, including the wait for a free connection and the
+    # overflow connects, so pool starvation shows up in /metrics.
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(time.perf_counter() - inicio)
+
+
+engine = create_async_engine(
+    settings.database_url,
+    future=True,
+    echo=False,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    # Recycle below MySQL's wait_timeout so idle connections are not dropped under us.
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    poolclass=MeasuredQueuePool if settings.metrics_enabled else AsyncAdaptedQueuePool,
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
+if settings.db_statement_timeout_ms > 0:
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_statement_timeout(dbapi_connection, _connection_record) -> None:
+        # MySQL aborts read-only SELECTs that exceed max_execution_time (milliseconds).
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET SESSION max_execution_time = {int(settings.db_statement_timeout_ms)}")
+        cursor.close()
+
+
+if settings.metrics_enabled:
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, _cursor, _statement, _parameters, _context, _executemany) -> None:
+        # A connection runs one statement at a time; a failed statement's start is
+        # simply overwritten by the next one.
+        conn.info["metrics_inicio"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, _parameters, _context, _executemany) -> None:
+        duracao = time.perf_counter() - conn.info.pop("metrics_inicio")
+        metrics.observe_query(statement, duracao, cursor.rowcount)
+
+
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
+
+
+async def warm_up_pool(quantidade: int) -> int:
+    # Opens the connections at the same time so they are distinct pool entries,
+    # then returns them all to the pool ready for the first requests.
+    conexoes = await asyncio.gather(
+        *(engine.connect().start() for _ in range(quantidade)), return_exceptions=True
+    )
+    abertas = 0
+    for conexao in conexoes:
+        if isinstance(conexao, BaseException):
+            logger.warning("Falha ao pré-aquecer conexão do pool: %s", conexao)
+            continue
+        try:
+            await conexao.execute(text("SELECT 1"))
+            abertas += 1
+        finally:
+            await conexao.close()
+    return abertas
+
+
+def pool_status() -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {
+        "pool": type(pool).__name__,
+        "configurado": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "statement_timeout_ms": settings.db_statement_timeout_ms,
+        },
+    }
+    for nome in ("size", "checkedin", "checkedout", "overflow"):
+        metodo = getattr(pool, nome, None)
+        if callable(metodo):
+            status[nome] = metodo()
+    return status
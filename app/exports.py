@@ -0,0 +1,326 @@
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import SessionLocal
+from .responses import orjson, orjson_ativo
+
+logger = logging.getLogger(__name__)
+
+INTEIRO, TEXTO, DATA, DATA_HORA, NUMERO = "inteiro", "texto", "data", "data_hora", "numero"
+
+
+@dataclass(frozen=True)
+class Coluna:
+    nome: str
+    # Mirrors the Power Query types: Int64.Type, type text, type date, type datetime, type number.
+    tipo: str
+    # Derived from the current date (e.g. DATEDIFF(..., CURDATE())); left out of snapshots.
+    volatil: bool = False
+
+
+@dataclass(frozen=True)
+class VisaoExportavel:
+    nome: str
+    colunas: Tuple[Coluna, ...]
+    # Views carrying ano/mes filter on them directly; the others on a date column range.
+    coluna_ano: str | None = None
+    coluna_mes: str | None = None
+    coluna_data: str | None = None
+    # Row modification timestamp backing the /delta watermark endpoints.
+    coluna_atualizacao: str | None = None
+
+    def filtro(self, ano: int | None, mes: int | None) -> Tuple[str, Dict[str, Any]]:
+        if ano is None:
+            return "", {}
+        if self.coluna_ano:
+            condicoes, params = [f"{self.coluna_ano} = :ano"], {"ano": ano}
+            if mes is not None:
+                condicoes.append(f"{self.coluna_mes} = :mes")
+                params["mes"] = mes
+            return "WHERE " + " AND ".join(condicoes), params
+        # Half-open range keeps the date column sargable, unlike YEAR()/MONTH().
+        inicio = date(ano, mes or 1, 1)
+        fim = date(ano + 1, 1, 1) if mes in (None, 12) else date(ano, mes + 1, 1)
+        return (
+            f"WHERE {self.coluna_data} >= :inicio AND {self.coluna_data} < :fim",
+            {"inicio": inicio, "fim": fim},
+        )
+
+    def filtro_delta(self, desde: datetime, ate: datetime) -> Tuple[str, Dict[str, Any]]:
+        # Half-open [desde, ate): the returned watermark is the next call's desde, so a
+        # row is delivered exactly once even when it shares the boundary second.
+        coluna = self.coluna_atualizacao
+        return f"WHERE {coluna} >= :desde AND {coluna} < :ate", {"desde": desde, "ate": ate}
+
+    def particao(self) -> Tuple[str, str]:
+        if self.coluna_ano:
+            return self.coluna_ano, self.coluna_mes
+        return f"YEAR({self.coluna_data})", f"MONTH({self.coluna_data})"
+
+    def estaveis(self) -> Tuple[Coluna, ...]:
+        return tuple(coluna for coluna in self.colunas if not coluna.volatil)
+
+
+def select_longo(origem: str, colunas: Sequence[Coluna], where: str = "") -> str:
+    # Long exports must not be cut by the per-connection max_execution_time.
+    dica = "/*+ MAX_EXECUTION_TIME(0) */ " if settings.db_statement_timeout_ms > 0 else ""
+    lista = ", ".join(coluna.nome for coluna in colunas)
+    return f"SELECT {dica}{lista} FROM {origem} {where}".strip()
+
+
+def _colunas(*pares: Tuple[str, str]) -> Tuple[Coluna, ...]:
+    return tuple(Coluna(nome, tipo) for nome, tipo in pares)
+
+
+VISOES: Dict[str, VisaoExportavel] = {
+    visao.nome: visao
+    for visao in (
+        VisaoExportavel(
+            nome="vw_execucao_despesa_mensal",
+            colunas=_colunas(
+                ("ano", INTEIRO),
+                ("mes", INTEIRO),
+                ("orgao_id", INTEIRO),
+                ("dotacao", NUMERO),
+                ("valor_empenhado", NUMERO),
+                ("valor_liquidado", NUMERO),
+                ("valor_pago", NUMERO),
+                ("competencia", DATA_HORA),
+                ("atualizado_em", DATA_HORA),
+            ),
+            coluna_ano="ano",
+            coluna_mes="mes",
+            coluna_atualizacao="atualizado_em",
+        ),
+        VisaoExportavel(
+            nome="vw_execucao_receita_mensal",
+            colunas=_colunas(
+                ("ano", INTEIRO),
+                ("mes", INTEIRO),
+                ("orgao_id", INTEIRO),
+                ("fonte_id", INTEIRO),
+                ("valor_previsto", NUMERO),
+                ("valor_arrecadado", NUMERO),
+                ("competencia", DATA_HORA),
+                ("atualizado_em", DATA_HORA),
+            ),
+            coluna_ano="ano",
+            coluna_mes="mes",
+            coluna_atualizacao="atualizado_em",
+        ),
+        VisaoExportavel(
+            nome="vw_contratos_gestao",
+            colunas=_colunas(
+                ("contrato_id", INTEIRO),
+                ("numero_contrato", TEXTO),
+                ("processo_id", INTEIRO),
+                ("data_assinatura", DATA),
+                ("vigencia_inicio", DATA),
+                ("vigencia_fim", DATA),
+                ("valor_total", NUMERO),
+            )
+            + (Coluna("dias_para_vencer", INTEIRO, volatil=True),),
+            coluna_data="data_assinatura",
+        ),
+        VisaoExportavel(
+            nome="vw_acordos_parcelamento",
+            colunas=_colunas(
+                ("acordo_id", INTEIRO),
+                ("contribuinte_id", INTEIRO),
+                ("data_acordo", DATA),
+                ("qtde_parcelas", INTEIRO),
+                ("valor_total", NUMERO),
+            ),
+            coluna_data="data_acordo",
+        ),
+        VisaoExportavel(
+            nome="vw_acordos_parcelas",
+            colunas=_colunas(
+                ("parcela_id", INTEIRO),
+                ("acordo_id", INTEIRO),
+                ("numero_parcela", INTEIRO),
+                ("data_vencimento", DATA),
+                ("valor_parcela", NUMERO),
+                ("situacao_atual", TEXTO),
+            ),
+            coluna_data="data_vencimento",
+        ),
+    )
+}
+
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def _converter(valor: Any, tipo: str) -> Any:
+    if valor is None:
+        return None
+    if tipo == NUMERO:
+        return float(valor)
+    if tipo == INTEIRO:
+        return int(valor)
+    if tipo == DATA and isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    if tipo == DATA_HORA and isinstance(valor, str):
+        return datetime.fromisoformat(valor)
+    return valor
+
+
+class _Csv:
+    media_type = "text/csv; charset=utf-8"
+    extensao = "csv"
+
+    def __init__(self, visao: VisaoExportavel) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._writer.writerow([coluna.nome for coluna in visao.colunas])
+
+    def _drenar(self) -> bytes:
+        dados = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return dados
+
+    def escrever(self, linhas: Sequence[Sequence[Any]]) -> bytes:
+        self._writer.writerows(linhas)
+        return self._drenar()
+
+    def fechar(self) -> bytes:
+        return self._drenar()
+
+
+class _Ndjson:
+    media_type = "application/x-ndjson"
+    extensao = "ndjson"
+
+    def __init__(self, visao: VisaoExportavel) -> None:
+        self._nomes = [coluna.nome for coluna in visao.colunas]
+        self._orjson = orjson_ativo()
+
+    def escrever(self, linhas: Sequence[Sequence[Any]]) -> bytes:
+        if self._orjson:
+            return b"".join(
+                orjson.dumps(dict(zip(self._nomes, linha)), default=_valor_json, option=orjson.OPT_APPEND_NEWLINE)
+                for linha in linhas
+            )
+        return "".join(
+            json.dumps(dict(zip(self._nomes, linha)), default=_valor_json, ensure_ascii=False) + "\n"
+            for linha in linhas
+        ).encode("utf-8")
+
+    def fechar(self) -> bytes:
+        return b""
+
+
+class _SaidaDrenavel(io.RawIOBase):
+    # Write-only sink handed to the Parquet writer; whatever it wrote is taken out
+    # after every row group so the file is never held whole in memory.
+
+    def __init__(self) -> None:
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+class _Parquet:
+    media_type = "application/vnd.apache.parquet"
+    extensao = "parquet"
+
+    def __init__(self, visao: VisaoExportavel) -> None:
+        # Imported on demand: pyarrow is heavy and only this format needs it.
+        import pyarrow.parquet as pq
+
+        self._visao = visao
+        self.schema = esquema_arrow(visao.colunas)
+        self._saida = _SaidaDrenavel()
+        self._writer = pq.ParquetWriter(self._saida, self.schema, compression="snappy")
+
+    def escrever(self, linhas: Sequence[Sequence[Any]]) -> bytes:
+        # Each chunk becomes one row group.
+        self._writer.write_table(tabela_arrow(self._visao.colunas, self.schema, linhas))
+        return self._saida.drenar()
+
+    def fechar(self) -> bytes:
+        self._writer.close()
+        return self._saida.drenar()
+
+
+def esquema_arrow(colunas: Sequence[Coluna]):
+    import pyarrow as pa
+
+    tipos = {
+        INTEIRO: pa.int64(),
+        TEXTO: pa.string(),
+        DATA: pa.date32(),
+        DATA_HORA: pa.timestamp("s"),
+        NUMERO: pa.float64(),
+    }
+    return pa.schema([(coluna.nome, tipos[coluna.tipo]) for coluna in colunas])
+
+
+def tabela_arrow(colunas: Sequence[Coluna], schema, linhas: Sequence[Sequence[Any]]):
+    import pyarrow as pa
+
+    return pa.Table.from_pydict(
+        {
+            coluna.nome: [_converter(linha[indice], coluna.tipo) for linha in linhas]
+            for indice, coluna in enumerate(colunas)
+        },
+        schema=schema,
+    )
+
+
+FORMATOS = {formato.extensao: formato for formato in (_Csv, _Ndjson, _Parquet)}
+
+
+async def exportar(
+    visao: VisaoExportavel, formato: str, where: str = "", params: Dict[str, Any] | None = None
+) -> AsyncIterator[bytes]:
+    # The generator owns its session: it outlives the request handler, and the
+    # server-side cursor keeps only one chunk of rows in memory at a time.
+    sql = select_longo(visao.nome, visao.colunas, where)
+    escritor = FORMATOS[formato](visao)
+    linhas_exportadas = 0
+    try:
+        async with SessionLocal() as session:
+            result = await session.stream(text(sql), params or {})
+            async for linhas in result.partitions(settings.export_chunk_rows):
+                linhas_exportadas += len(linhas)
+                dados = escritor.escrever(linhas)
+                if dados:
+                    yield dados
+        final = escritor.fechar()
+        if final:
+            yield final
+    except Exception:
+        logger.exception("Exportação de %s interrompida após %d linha(s)", visao.nome, linhas_exportadas)
+        raise
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import SessionLocal
+
+QueryJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+async def gather_queries(
+    session: AsyncSession, jobs: Dict[str, QueryJob], max_concurrency: int | None = None
+) -> Dict[str, Any]:
+    # Independent panel queries run at the same time, each one on its own pooled
+    # connection. With QUERY_CONCURRENCY <= 1 they run one after another on the
+    # request session, which is the previous behaviour.
+    limite = settings.query_concurrency if max_concurrency is None else max_concurrency
+    if limite <= 1 or len(jobs) <= 1:
+        return {nome: await job(session) for nome, job in jobs.items()}
+
+    semaphore = asyncio.Semaphore(limite)
+
+    async def run(job: QueryJob) -> Any:
+        async with semaphore:
+            async with SessionLocal() as job_session:
+                return await job(job_session)
+
+    tasks = [asyncio.ensure_future(run(job)) for job in jobs.values()]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return dict(zip(jobs, results))
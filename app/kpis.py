@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .fanout import QueryJob
+from .query_merge import ScalarQuery, count_of, gather_scalars, sum_of
+from .services.cubo_colunar import cubo_colunar
+from .services.resumo_mensal import execucao_source
+from .versioning import SUSPENSAO_SONDA
+
+logger = logging.getLogger(__name__)
+
+# Memoized values kept at most; each one is a (name, grain, version) key and a number.
+MAX_MEMORIZADOS = 4096
+
+RECEITA_SOURCE = execucao_source("view_mov_rec")
+DESPESA_SOURCE = execucao_source("view_desp_executada")
+PAGAMENTO_SOURCE = execucao_source("view_mov_pagamento")
+LICITACOES = "licit_processo lp JOIN licit_status ls ON ls.id = lp.status_id"
+
+
+@dataclass(frozen=True)
+class Kpi:
+    nome: str
+    origem: str
+    medida: str
+    filtro: str = ""
+    # Request parameters the value depends on; two requests with the same grain share it.
+    grao: Tuple[str, ...] = ("ano",)
+    # Tables whose MAX(id) versions the memoized value; the source itself when it is one table.
+    tabelas: Tuple[str, ...] = ()
+    tipo: Callable[[Any], Any] = float
+    # Measure of the in-memory columnar cube over `origem` that answers the same total per year.
+    medida_cubo: str | None = None
+
+    @property
+    def sondas(self) -> Tuple[str, ...]:
+        return self.tabelas or (self.origem,)
+
+    def consulta(self) -> ScalarQuery:
+        return ScalarQuery(self.nome, self.origem, self.medida, self.filtro, self.tipo)
+
+
+def _execucao(nome: str, origem: str, medida: str) -> Kpi:
+    return Kpi(nome, origem, sum_of(medida), "ano = :ano", medida_cubo=medida)
+
+
+KPIS: Dict[str, Kpi] = {}
+
+
+def registrar(*kpis: Kpi) -> None:
+    for kpi in kpis:
+        if kpi.nome in KPIS and KPIS[kpi.nome] != kpi:
+            raise ValueError(f"Indicador {kpi.nome} já registrado com outra definição")
+        KPIS[kpi.nome] = kpi
+
+
+registrar(
+    Kpi("receita_prevista", "receita_loa", sum_of("valor_previsto"), "ano = :ano"),
+    _execucao("receita_realizada", RECEITA_SOURCE, "valor_arrecadado"),
+    Kpi("despesa_dotacao_inicial", "view_loa_desp", sum_of("dotacao_inicial"), "ano = :ano"),
+    _execucao("despesa_dotacao_atualizada", DESPESA_SOURCE, "dotacao_atualizada"),
+    _execucao("despesa_empenhada", DESPESA_SOURCE, "empenhado"),
+    _execucao("despesa_liquidada", DESPESA_SOURCE, "liquidado"),
+    _execucao("despesa_paga", PAGAMENTO_SOURCE, "valor_pago"),
+    Kpi("caixa_disponivel", "ts_conta_banc_saldo_ano", sum_of("saldo_final"), "ano = :ano"),
+    Kpi("estoque_divida_ativa", "divida_ativa", sum_of("valor_atualizado"), "ano_referencia = :ano"),
+    Kpi("recuperacao_divida_ativa", "duam_baixa", sum_of("valor_pago"), "YEAR(data_baixa) = :ano"),
+    Kpi("acordos_parcelamento", "acordo_parcelamento", count_of(), "YEAR(data_acordo) = :ano", tipo=int),
+    # Adjust the launched-value column to the real schema, e.g. valor_total.
+    Kpi("iptu_lancado", "calculo_iptu_ano", sum_of("valor_lancado"), "ano = :ano"),
+    Kpi("iptu_arrecadado", "view_bci_iptu", sum_of("valor_pago"), "ano = :ano"),
+    Kpi("iss_declarado", "iss_mensal", sum_of("valor_declarado"), "ano = :ano"),
+    Kpi("iss_pago", "iss_mensal", sum_of("valor_pago"), "ano = :ano"),
+    Kpi(
+        "licitacoes_em_andamento",
+        LICITACOES,
+        count_of("ls.descricao IN ('em andamento', 'publicado', 'disputa')"),
+        "YEAR(lp.data_abertura) = :ano",
+        tabelas=("licit_processo",),
+        tipo=int,
+    ),
+    Kpi(
+        "licitacoes_homologadas",
+        LICITACOES,
+        count_of("ls.descricao = 'homologado'"),
+        "YEAR(lp.data_abertura) = :ano",
+        tabelas=("licit_processo",),
+        tipo=int,
+    ),
+    Kpi("obras_em_execucao", "obr_obra", count_of("situacao IN ('em execucao', 'execução')"), grao=(), tipo=int),
+    Kpi("obras_paralisadas", "obr_obra", count_of("LOWER(situacao) LIKE '%paralisada%'"), grao=(), tipo=int),
+)
+
+Chave = Tuple[str, Tuple[Any, ...], Tuple[str, ...] | None]
+
+
+class MotorKpis:
+    # Endpoints ask for indicators by name. Per call the ones the in-memory cube holds
+    # are read from it, the rest merged by source and filter (query_merge) into one
+    # SELECT each. Values are memoized under the versions of their own tables, and a
+    # computation already running for another request is awaited instead of repeated,
+    # so an overview and a finance page loaded together compute every indicator once.
+
+    def __init__(self) -> None:
+        self._memo: "OrderedDict[Chave, Tuple[float, Any]]" = OrderedDict()
+        # Futures belong to one event loop (the API one or the Dash background loop).
+        self._em_andamento: Dict[Tuple[int, Chave], "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self._sondas: Dict[Tuple[str, ...], str] = {}
+        self._sonda_falhou = False
+        self._sondas_suspensas: Dict[Tuple[str, ...], float] = {}
+
+    def limpar(self) -> int:
+        with self._lock:
+            removidos = len(self._memo)
+            self._memo.clear()
+            return removidos
+
+    async def _versoes(self, session: AsyncSession, tabelas: Sequence[str]) -> Dict[str, str] | None:
+        if not tabelas:
+            return {}
+        sql = self._sondas.get(tuple(tabelas))
+        if sql is None:
+            sql = "SELECT " + ", ".join(
+                f"(SELECT MAX(id) FROM {tabela}) AS v{indice}" for indice, tabela in enumerate(tabelas)
+            )
+            self._sondas[tuple(tabelas)] = sql
+        if time.monotonic() < self._sondas_suspensas.get(tuple(tabelas), 0.0):
+            return None
+        try:
+            valores = (await session.execute(text(sql))).one()
+        except SQLAlchemyError:
+            if not self._sonda_falhou:
+                logger.warning("Sonda de versão dos indicadores falhou; valores não serão memorizados", exc_info=True)
+                self._sonda_falhou = True
+            self._sondas_suspensas[tuple(tabelas)] = time.monotonic() + SUSPENSAO_SONDA
+            return None
+        return {tabela: str(valor) for tabela, valor in zip(tabelas, valores)}
+
+    def _do_cubo(self, kpis: Iterable[Kpi], params: Dict[str, Any]) -> Dict[str, Any]:
+        valores: Dict[str, Any] = {}
+        por_origem: Dict[str, List[Kpi]] = {}
+        for kpi in kpis:
+            if kpi.medida_cubo and "ano" in params:
+                por_origem.setdefault(kpi.origem, []).append(kpi)
+        for origem, lista in por_origem.items():
+            totais = cubo_colunar.totais(origem, [kpi.medida_cubo for kpi in lista], [params["ano"]])
+            if totais is not None:
+                valores.update({kpi.nome: kpi.tipo(totais[kpi.medida_cubo]) for kpi in lista})
+        return valores
+
+    def _memorizado(self, chave: Chave) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self._memo.get(chave)
+            if item is None:
+                return False, None
+            if item[0] <= time.monotonic():
+                del self._memo[chave]
+                return False, None
+            self._memo.move_to_end(chave)
+            return True, item[1]
+
+    def _memorizar(self, chave: Chave, valor: Any) -> None:
+        if settings.kpi_memo_ttl <= 0:
+            return
+        with self._lock:
+            self._memo[chave] = (time.monotonic() + settings.kpi_memo_ttl, valor)
+            self._memo.move_to_end(chave)
+            while len(self._memo) > MAX_MEMORIZADOS:
+                self._memo.popitem(last=False)
+
+    async def calcular(
+        self,
+        session: AsyncSession,
+        nomes: Sequence[str],
+        params: Dict[str, Any],
+        jobs: Dict[str, QueryJob] | None = None,
+    ) -> Dict[str, Any]:
+        kpis = [KPIS[nome] for nome in dict.fromkeys(nomes)]
+        valores = self._do_cubo(kpis, params)
+        restantes = [kpi for kpi in kpis if kpi.nome not in valores]
+
+        tabelas = list(dict.fromkeys(tabela for kpi in restantes for tabela in kpi.sondas))
+        versoes = await self._versoes(session, tabelas) if restantes else {}
+        loop = id(asyncio.get_running_loop())
+        chaves: Dict[str, Chave] = {}
+        aguardando: Dict[str, "asyncio.Future[Any]"] = {}
+        proprios: List[Kpi] = []
+        for kpi in restantes:
+            # Without versions a value is still shared with concurrent requests, never memoized.
+            chave = (
+                kpi.nome,
+                tuple(params.get(campo) for campo in kpi.grao),
+                None if versoes is None else tuple(versoes[tabela] for tabela in kpi.sondas),
+            )
+            chaves[kpi.nome] = chave
+            encontrado, valor = (False, None) if versoes is None else self._memorizado(chave)
+            if encontrado:
+                valores[kpi.nome] = valor
+            elif (loop, chave) in self._em_andamento:
+                aguardando[kpi.nome] = self._em_andamento[(loop, chave)]
+            else:
+                proprios.append(kpi)
+
+        futuros: Dict[str, "asyncio.Future[Any]"] = {}
+        for kpi in proprios:
+            futuro = asyncio.get_running_loop().create_future()
+            # A failure nobody else awaited must not be logged as never retrieved.
+            futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._em_andamento[(loop, chaves[kpi.nome])] = futuro
+            futuros[kpi.nome] = futuro
+        try:
+            resultados = await gather_scalars(session, [kpi.consulta() for kpi in proprios], params, jobs=jobs)
+        except BaseException as erro:
+            for nome, futuro in futuros.items():
+                self._em_andamento.pop((loop, chaves[nome]), None)
+                if isinstance(erro, Exception):
+                    futuro.set_exception(erro)
+                else:
+                    futuro.cancel()
+            raise
+        for kpi in proprios:
+            valores[kpi.nome] = resultados.pop(kpi.nome)
+            self._em_andamento.pop((loop, chaves[kpi.nome]), None)
+            futuros[kpi.nome].set_result(valores[kpi.nome])
+            if versoes is not None:
+                self._memorizar(chaves[kpi.nome], valores[kpi.nome])
+        valores.update(resultados)
+
+        if aguardando:
+            await asyncio.wait(aguardando.values())
+            # The request computing them was cancelled (client gone): compute them here.
+            cancelados = [KPIS[nome] for nome, futuro in aguardando.items() if futuro.cancelled()]
+            for nome, futuro in aguardando.items():
+                if not futuro.cancelled():
+                    valores[nome] = futuro.result()
+            if cancelados:
+                valores.update(await gather_scalars(session, [kpi.consulta() for kpi in cancelados], params))
+        return valores
+
+
+motor_kpis = MotorKpis()
+
+
+async def calcular_kpis(
+    session: AsyncSession,
+    nomes: Sequence[str],
+    params: Dict[str, Any],
+    jobs: Dict[str, QueryJob] | None = None,
+) -> Dict[str, Any]:
+    return await motor_kpis.calcular(session, nomes, params, jobs)
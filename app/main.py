@@ -1,6 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Request
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from . import metrics
+from .config import settings
+from .database import engine, pool_status, warm_up_pool
+from .responses import CompressaoMiddleware, OrjsonResponse, orjson_ativo
 from .routers import (
+    admin_cache,
+    admin_cubo,
     dashboard_frotas_transporte,
     dashboard_licitacoes_contratos,
     dashboard_obras_convenios,
@@ -10,9 +22,73 @@ from .routers import (
     dashboard_receita_despesa,
     dashboard_rh_pessoal,
     dashboard_tributos_divida_ativa,
+    dashboard_vencimentos,
+    export,
+)
+from .services import estoque_razao, iss_agregado, resumo_mensal
+from .services.cubo_colunar import cubo_colunar
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if settings.db_pool_warmup > 0:
+        await warm_up_pool(min(settings.db_pool_warmup, settings.db_pool_size))
+
+    tarefas = []
+    if settings.resumo_mensal_enabled and settings.resumo_mensal_refresh_interval > 0:
+        tarefas.append(
+            asyncio.create_task(resumo_mensal.refresh_periodically(settings.resumo_mensal_refresh_interval))
+        )
+    if settings.estoque_razao_enabled and settings.estoque_razao_refresh_interval > 0:
+        tarefas.append(
+            asyncio.create_task(estoque_razao.refresh_periodically(settings.estoque_razao_refresh_interval))
+        )
+    if settings.iss_agregado_enabled and settings.iss_agregado_refresh_interval > 0:
+        tarefas.append(
+            asyncio.create_task(iss_agregado.refresh_periodically(settings.iss_agregado_refresh_interval))
+        )
+    if settings.cubo_memoria_enabled:
+        # Loads in the background; requests fall back to SQL until the first load finishes.
+        tarefas.append(asyncio.create_task(cubo_colunar.refresh_periodically(settings.cubo_memoria_refresh_interval)))
+    yield
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    await engine.dispose()
+
+
+app = FastAPI(
+    title="Modulo Gestor",
+    version="0.1.0",
+    lifespan=lifespan,
+    # Wrapped in Default so routes with a response_model keep FastAPI's dump_json fast path.
+    default_response_class=Default(OrjsonResponse if orjson_ativo() else JSONResponse),
 )
 
-app = FastAPI(title="Modulo Gestor", version="0.1.0")
+if settings.compression_enabled:
+    # Added before the metrics middleware so request durations include compression.
+    app.add_middleware(
+        CompressaoMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
+if settings.metrics_enabled:
+
+    @app.middleware("http")
+    async def measure_request(request: Request, call_next):
+        token = metrics.request_scope.set(request.scope)
+        inicio = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.observe_request(request.scope, request.method, status, time.perf_counter() - inicio)
+            metrics.request_scope.reset(token)
+
 
 app.include_router(dashboard_overview.router)
 app.include_router(dashboard_receita_despesa.router)
@@ -23,8 +99,25 @@ app.include_router(dashboard_rh_pessoal.router)
 app.include_router(dashboard_patrimonio_almoxarifado.router)
 app.include_router(dashboard_frotas_transporte.router)
 app.include_router(dashboard_protocolo_transparencia.router)
+app.include_router(dashboard_vencimentos.router)
+app.include_router(admin_cache.router)
+app.include_router(admin_cubo.router)
+app.include_router(export.router)
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/pool")
+async def pool_health_check():
+    return pool_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    status = pool_status()
+    pool = {nome: status[nome] for nome in ("size", "checkedin", "checkedout", "overflow") if nome in status}
+    corpo = metrics.render({"db_pool_connections": ("Situação atual das conexões do pool.", pool)})
+    return PlainTextResponse(corpo, media_type="text/plain; version=0.0.4; charset=utf-8")
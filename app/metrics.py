@@ -0,0 +1,150 @@
+import hashlib
+import re
+import threading
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+SEM_REQUISICAO = "-"
+SEM_ROTA = "nao_roteado"
+
+# Holds the ASGI scope of the request being served. The route is resolved only after
+# the middleware hands the request on, so the endpoint label is read lazily from it.
+request_scope: ContextVar[Optional[MutableMapping[str, Any]]] = ContextVar("request_scope", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, valor: float, *labels: str) -> None:
+        # Layout per series: one counter per bucket, then sum and count.
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            series = {labels: list(valores) for labels, valores in self._series.items()}
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, valores in sorted(series.items()):
+            base = list(zip(self.labelnames, labels))
+            for limite, quantidade in zip(self.buckets, valores):
+                yield f"{self.name}_bucket{_labels(base + [('le', _numero(limite))])} {_numero(quantidade)}"
+            yield f"{self.name}_bucket{_labels(base + [('le', '+Inf')])} {_numero(valores[-1])}"
+            yield f"{self.name}_sum{_labels(base)} {_numero(valores[-2])}"
+            yield f"{self.name}_count{_labels(base)} {_numero(valores[-1])}"
+
+
+def _escape(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pares: Sequence[Tuple[str, str]]) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escape(str(valor))}"' for nome, valor in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return repr(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Tempo de resposta das requisições HTTP.",
+    ("endpoint", "method", "status"),
+    LATENCY_BUCKETS,
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Tempo de execução das consultas SQL.",
+    ("endpoint", "query"),
+    LATENCY_BUCKETS,
+)
+db_query_rows = Histogram(
+    "db_query_rows",
+    "Linhas retornadas ou afetadas por consulta SQL.",
+    ("endpoint", "query"),
+    ROWS_BUCKETS,
+)
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds",
+    "Tempo para obter uma conexão do pool.",
+    ("endpoint",),
+    POOL_WAIT_BUCKETS,
+)
+
+HISTOGRAMAS = (http_request_duration, db_query_duration, db_query_rows, db_pool_wait)
+
+_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?([A-Za-z_][\w.]*)`?", re.IGNORECASE)
+_ESPACOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def query_name(statement: str) -> str:
+    # Stable across processes: the first table touched plus a short hash of the
+    # whitespace-normalised SQL, e.g. "view_mov_rec:3f9c2a1b".
+    normalizado = _ESPACOS.sub(" ", statement).strip()
+    encontrado = _TABELA.search(normalizado)
+    tabela = encontrado.group(1) if encontrado else normalizado.split(" ", 1)[0].lower() or "sql"
+    return f"{tabela}:{hashlib.sha1(normalizado.encode('utf-8')).hexdigest()[:8]}"
+
+
+def current_endpoint() -> str:
+    scope = request_scope.get()
+    if scope is None:
+        return SEM_REQUISICAO
+    rota = scope.get("route")
+    return getattr(rota, "path", None) or SEM_ROTA
+
+
+def observe_request(scope: MutableMapping[str, Any], method: str, status: int, duracao: float) -> None:
+    rota = scope.get("route")
+    endpoint = getattr(rota, "path", None) or SEM_ROTA
+    http_request_duration.observe(duracao, endpoint, method, str(status))
+
+
+def observe_query(statement: str, duracao: float, linhas: int) -> None:
+    endpoint = current_endpoint()
+    nome = query_name(statement)
+    db_query_duration.observe(duracao, endpoint, nome)
+    # Drivers report -1 when the row count is unknown (e.g. unbuffered SELECTs).
+    if linhas >= 0:
+        db_query_rows.observe(linhas, endpoint, nome)
+
+
+def observe_pool_wait(duracao: float) -> None:
+    db_pool_wait.observe(duracao, current_endpoint())
+
+
+def render(gauges: Optional[Dict[str, Tuple[str, Dict[str, float]]]] = None) -> str:
+    linhas: List[str] = []
+    for histograma in HISTOGRAMAS:
+        linhas.extend(histograma.render())
+    for nome, (documentacao, valores) in (gauges or {}).items():
+        linhas.append(f"# HELP {nome} {documentacao}")
+        linhas.append(f"# TYPE {nome} gauge")
+        for estado, valor in sorted(valores.items()):
+            linhas.append(f"{nome}{_labels([('estado', estado)])} {_numero(valor)}")
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Annotated, Any, Callable, Dict, List, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .schemas.paginacao import Pagina
+
+# Annotated so the plain default also applies when the Dash app calls a route directly.
+Limite = Annotated[int, Query(ge=1, le=settings.pagination_max_limit, description="Itens por página")]
+Cursor = Annotated[str | None, Query(description="proximo_cursor devolvido pela página anterior")]
+
+
+@dataclass(frozen=True)
+class Ordenacao:
+    # SQL expression compared by the keyset filter (a column or an aggregate).
+    expressao: str
+    # Name of the same value in the result row, which feeds the next cursor.
+    coluna: str
+    # Rebuilds the value from the cursor: DECIMAL sums stay exact, so ties are not skipped.
+    converter: Callable[[str], Any] = int
+    decrescente: bool = False
+
+
+@dataclass(frozen=True)
+class ListaPaginada:
+    # SELECT with a {keyset} marker in its WHERE or HAVING clause.
+    sql: str
+    # Cheap COUNT over the same filters, without the label joins and the sort.
+    contagem: str
+    # Unique ordering: the last key is the row id.
+    chaves: Tuple[Ordenacao, ...]
+
+    def condicao(self) -> str:
+        # (k0 > :c0) OR (k0 = :c0 AND k1 > :c1) ... pushed into SQL, so every page is a
+        # bounded index range instead of an OFFSET that rereads the skipped rows.
+        alternativas = []
+        for indice, chave in enumerate(self.chaves):
+            iguais = [
+                f"{anterior.expressao} = :_cursor{posicao}" for posicao, anterior in enumerate(self.chaves[:indice])
+            ]
+            operador = "<" if chave.decrescente else ">"
+            alternativas.append(" AND ".join(iguais + [f"{chave.expressao} {operador} :_cursor{indice}"]))
+        return "(" + " OR ".join(f"({alternativa})" for alternativa in alternativas) + ")"
+
+    def ordem(self) -> str:
+        return ", ".join(f"{chave.expressao}{' DESC' if chave.decrescente else ''}" for chave in self.chaves)
+
+
+def data_cursor(valor: str) -> date:
+    # Converter for DATE and DATETIME keys: a cursor built from a DATETIME row carries
+    # the time, which the keyset comparison needs to keep.
+    return date.fromisoformat(valor) if len(valor) == 10 else datetime.fromisoformat(valor)
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    texto = json.dumps([str(valor) if isinstance(valor, (Decimal, date)) else valor for valor in valores])
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, chaves: Sequence[Ordenacao]) -> List[Any]:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(chaves):
+            raise ValueError(cursor)
+        return [chave.converter(valor) for chave, valor in zip(chaves, valores)]
+    except (ValueError, TypeError, binascii.Error, ArithmeticError):
+        raise HTTPException(status_code=422, detail="cursor inválido") from None
+
+
+async def buscar_pagina(
+    session: AsyncSession, lista: ListaPaginada, params: Dict[str, Any], limit: int, cursor: str | None = None
+) -> Tuple[List[Row], Pagina]:
+    valores = decodificar_cursor(cursor, lista.chaves) if cursor else []
+    sql = lista.sql.replace("{keyset}", lista.condicao() if cursor else "1 = 1")
+    sql += f"\nORDER BY {lista.ordem()}\nLIMIT :_limite"
+    parametros = {**params, **{f"_cursor{indice}": valor for indice, valor in enumerate(valores)}}
+    # One extra row tells whether a next page exists without counting.
+    linhas = (await session.execute(text(sql), {**parametros, "_limite": limit + 1})).all()
+
+    proximo = None
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        proximo = codificar_cursor([linhas[-1]._mapping[chave.coluna] for chave in lista.chaves])
+    total = None
+    if cursor is None:
+        total = int((await session.execute(text(lista.contagem), params)).scalar() or 0)
+    return linhas, Pagina(limite=limit, total=total, proximo_cursor=proximo)
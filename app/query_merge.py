@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .fanout import QueryJob, gather_queries
+
+
+@dataclass(frozen=True)
+class ScalarQuery:
+    name: str
+    source: str
+    expression: str
+    where: str = ""
+    cast: Callable[[Any], Any] = float
+
+
+@dataclass(frozen=True)
+class MergedQuery:
+    sql: str
+    columns: Tuple[ScalarQuery, ...]
+
+
+def sum_of(column: str, when: str | None = None) -> str:
+    if when:
+        return f"SUM(CASE WHEN {when} THEN {column} ELSE 0 END)"
+    return f"SUM({column})"
+
+
+def count_of(when: str | None = None) -> str:
+    if when:
+        return f"SUM(CASE WHEN {when} THEN 1 ELSE 0 END)"
+    return "COUNT(*)"
+
+
+def merge_scalars(queries: Iterable[ScalarQuery]) -> List[MergedQuery]:
+    # Scalars reading the same source with the same WHERE clause become columns of a
+    # single SELECT, so the table is scanned once instead of once per indicator.
+    groups: "OrderedDict[Tuple[str, str], List[ScalarQuery]]" = OrderedDict()
+    for query in queries:
+        groups.setdefault((query.source.strip(), query.where.strip()), []).append(query)
+
+    merged = []
+    for (source, where), columns in groups.items():
+        select_list = ",\n       ".join(
+            f"COALESCE({column.expression}, 0) AS {column.name}" for column in columns
+        )
+        sql = f"SELECT {select_list}\nFROM {source}"
+        if where:
+            sql += f"\nWHERE {where}"
+        merged.append(MergedQuery(sql=sql, columns=tuple(columns)))
+    return merged
+
+
+async def fetch_merged(session: AsyncSession, merged: MergedQuery, params: Dict[str, Any]) -> Dict[str, Any]:
+    result = await session.execute(text(merged.sql), params)
+    row = result.one()
+    return {
+        column.name: column.cast(value or 0)
+        for column, value in zip(merged.columns, row)
+    }
+
+
+async def gather_scalars(
+    session: AsyncSession,
+    scalars: Iterable[ScalarQuery],
+    params: Dict[str, Any],
+    jobs: Dict[str, QueryJob] | None = None,
+) -> Dict[str, Any]:
+    merged = merge_scalars(scalars)
+    merged_keys = [f"__merged_{index}" for index in range(len(merged))]
+
+    all_jobs: Dict[str, QueryJob] = {
+        key: partial(fetch_merged, merged=query, params=params)
+        for key, query in zip(merged_keys, merged)
+    }
+    all_jobs.update(jobs or {})
+
+    results = await gather_queries(session, all_jobs)
+    valores: Dict[str, Any] = {}
+    for key in merged_keys:
+        valores.update(results.pop(key))
+    valores.update(results)
+    return valores
@@ -0,0 +1,120 @@
+from decimal import Decimal
+from typing import Any, Dict, Tuple
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Parquet pages are already snappy-compressed; a second pass only burns CPU.
+EXCLUDED_CONTENT_TYPES = DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/vnd.apache.parquet",)
+
+
+class OrjsonResponse(JSONResponse):
+    # Routes declaring a response_model keep FastAPI's pydantic-core dump_json path,
+    # which is faster still; this class renders everything else (plain dicts, lists).
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _orjson_default(valor: Any) -> Any:
+    if hasattr(valor, "model_dump"):
+        return valor.model_dump(mode="json")
+    # Decimal from the MySQL driver, as in the standard JSON path.
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def orjson_ativo() -> bool:
+    return settings.orjson_enabled and orjson is not None
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, thread_minimum_size: int = 128 * 1024) -> None:
+        super().__init__(app, minimum_size, exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        self.quality = quality
+        self.thread_minimum_size = thread_minimum_size
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= self.thread_minimum_size:
+            # Same rule as the gzip responder: large chunks would block the event loop.
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.quality)
+        dados = self._compressor.process(body)
+        # Streamed exports flush every chunk so the client can decode as it downloads.
+        return dados + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+def _qualidades(accept_encoding: str) -> Dict[str, float]:
+    qualidades = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        qualidade = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    qualidade = float(valor)
+                except ValueError:
+                    qualidade = 0.0
+        if nome:
+            qualidades[nome.strip().lower()] = qualidade
+    return qualidades
+
+
+def negociar(accept_encoding: str) -> str | None:
+    qualidades = _qualidades(accept_encoding)
+    curinga = qualidades.get("*", 0.0)
+    candidatos: Tuple[Tuple[str, float], ...] = tuple(
+        (codificacao, qualidades.get(codificacao, curinga))
+        for codificacao in (("br", "gzip") if brotli is not None else ("gzip",))
+    )
+    # Ties go to brotli: smaller for the same CPU on JSON.
+    codificacao, qualidade = max(candidatos, key=lambda candidato: candidato[1])
+    return codificacao if qualidade > 0 else None
+
+
+class CompressaoMiddleware:
+    # Starlette's GZipMiddleware with brotli negotiated next to gzip.
+    def __init__(self, app: ASGIApp, minimum_size: int, gzip_level: int, brotli_quality: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = negociar(Headers(scope=scope).get("Accept-Encoding", ""))
+        if codificacao == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif codificacao == "gzip":
+            responder = GZipResponder(
+                self.app, self.minimum_size, self.gzip_level, exclude_content_types=EXCLUDED_CONTENT_TYPES
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        await responder(scope, receive, send)
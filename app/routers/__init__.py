@@ -1,4 +1,6 @@
 from . import (
+    admin_cache,
+    admin_cubo,
     dashboard_licitacoes_contratos,
     dashboard_frotas_transporte,
     dashboard_obras_convenios,
@@ -8,6 +10,8 @@ from . import (
     dashboard_receita_despesa,
     dashboard_rh_pessoal,
     dashboard_tributos_divida_ativa,
+    dashboard_vencimentos,
+    export,
 )
 
 __all__ = [
@@ -20,4 +24,8 @@ __all__ = [
     "dashboard_patrimonio_almoxarifado",
     "dashboard_frotas_transporte",
     "dashboard_protocolo_transparencia",
+    "dashboard_vencimentos",
+    "admin_cache",
+    "admin_cubo",
+    "export",
 ]
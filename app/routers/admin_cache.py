@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+
+from ..admin import exigir_token_admin
+from ..cache import response_cache
+from ..kpis import motor_kpis
+from ..schemas.admin_cache import CacheInvalidacaoResponse, CacheStatsResponse
+
+router = APIRouter(prefix="/admin/cache", tags=["admin-cache"], dependencies=[Depends(exigir_token_admin)])
+
+
+@router.get("", response_model=CacheStatsResponse)
+async def get_cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(**response_cache.stats())
+
+
+@router.delete("", response_model=CacheInvalidacaoResponse)
+async def invalidate_cache(
+    endpoint: str | None = Query(None, description="Endpoint a invalidar, ex: overview, receita_resumo"),
+    ano: int | None = Query(None, description="Remove apenas as entradas deste ano"),
+) -> CacheInvalidacaoResponse:
+    removidos = response_cache.invalidate(endpoint=endpoint, ano=ano)
+    if endpoint is None and ano is None:
+        # A full flush also drops the indicators memoized for the endpoints.
+        motor_kpis.limpar()
+    return CacheInvalidacaoResponse(endpoint=endpoint, ano=ano, removidos=removidos)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..admin import exigir_token_admin
+from ..config import settings
+from ..database import get_session
+from ..schemas.admin_cubo import CuboAtualizacaoResponse, CuboAtualizacaoTabela, CuboMemoriaResponse
+from ..services.cubo_colunar import cubo_colunar
+
+router = APIRouter(prefix="/admin/cubo", tags=["admin-cubo"], dependencies=[Depends(exigir_token_admin)])
+
+
+@router.get("", response_model=CuboMemoriaResponse)
+async def get_cubo_memoria() -> CuboMemoriaResponse:
+    return CuboMemoriaResponse(**cubo_colunar.relatorio())
+
+
+@router.post("/atualizar", response_model=CuboAtualizacaoResponse)
+async def atualizar_cubo(
+    forcar: bool = Query(False, description="Recarrega todos os meses, mesmo sem alteração"),
+    session: AsyncSession = Depends(get_session),
+) -> CuboAtualizacaoResponse:
+    if not settings.cubo_memoria_enabled:
+        raise HTTPException(status_code=409, detail="Cubo em memória desligado (CUBO_MEMORIA_ENABLED=false)")
+    resultados = await cubo_colunar.atualizar(session, forcar=forcar)
+    return CuboAtualizacaoResponse(
+        tabelas=[
+            CuboAtualizacaoTabela(
+                tabela=resultado.tabela,
+                meses_verificados=resultado.meses_verificados,
+                meses_carregados=[f"{ano}-{mes:02d}" for ano, mes in resultado.meses_recalculados],
+                meses_removidos=[f"{ano}-{mes:02d}" for ano, mes in resultado.meses_removidos],
+            )
+            for resultado in resultados
+        ],
+        memoria=CuboMemoriaResponse(**cubo_colunar.relatorio()),
+    )
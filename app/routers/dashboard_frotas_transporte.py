@@ -1,17 +1,29 @@
-from datetime import datetime
-from typing import Any, Dict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..config import settings
 from ..database import get_session
+from ..pagination import Cursor, Limite
 from ..schemas.frotas_transporte import (
+    AbastecimentoAnomalo,
+    FrotaMes,
+    FrotasAnaliticoResponse,
     FrotasResponse,
     LicenciamentoStatus,
+    LicenciamentosResponse,
     TransporteEscolarResponse,
+    VeiculoAnalitico,
     VeiculoConsumo,
 )
+from ..schemas.paginacao import Pagina
+from ..services.frotas_analitico import analisar_frota, primeiro_dia
+from ..services.vencimentos import indices_vencimentos, paginar
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-frotas-transporte"])
 
@@ -21,40 +33,75 @@ async def fetch_list(session: AsyncSession, query: str, params: Dict[str, Any])
     return [VeiculoConsumo(veiculo=row[0], valor=float(row[1] or 0)) for row in result]
 
 
+def status_licenciamento(vencimento: date, hoje: date) -> str:
+    if vencimento < hoje:
+        return "vencido"
+    if vencimento <= hoje + timedelta(days=60):
+        return "a vencer"
+    return "vigente"
+
+
+async def fetch_licenciamentos(
+    session: AsyncSession, limit: int, cursor: str | None = None
+) -> Tuple[List[LicenciamentoStatus], Pagina]:
+    hoje = datetime.utcnow().date()
+    indice = await indices_vencimentos.indice(session, "licenciamento")
+    itens, pagina = paginar(indice, hoje - timedelta(days=30), hoje + timedelta(days=120), limit, cursor)
+    veiculos_licenciamento = [
+        LicenciamentoStatus(
+            veiculo=item.descricao,
+            data_vencimento=item.data.isoformat(),
+            status=status_licenciamento(item.data, hoje),
+        )
+        for item in itens
+    ]
+    return veiculos_licenciamento, pagina
+
+
 @router.get("/frotas/resumo", response_model=FrotasResponse)
+@cached(
+    "frotas_resumo",
+    versao=VersaoDados(
+        "veiculos",
+        "ctrl_combustivel",
+        "ctrl_combustivel_item",
+        "viagens",
+        "ctrl_licenciamento",
+        locais=(indices_vencimentos.versao,),
+    ),
+)
 async def get_frotas_resumo(
     mes: int = Query(default_factory=lambda: datetime.utcnow().month, ge=1, le=12),
     ano: int = Query(default_factory=lambda: datetime.utcnow().year),
+    limit: Limite = settings.pagination_default_limit,
     session: AsyncSession = Depends(get_session),
 ) -> FrotasResponse:
-    consumo_combustivel = await fetch_list(
-        session,
-        """
-        SELECT COALESCE(v.placa, 'Veículo') AS veiculo, COALESCE(SUM(cci.valor_total), 0) AS valor
-        FROM ctrl_combustivel_item cci
-        JOIN ctrl_combustivel cc ON cc.id = cci.ctrl_combustivel_id
-        LEFT JOIN veiculos v ON v.id = cc.veiculo_id
-        WHERE MONTH(cc.data_abastecimento) = :mes AND YEAR(cc.data_abastecimento) = :ano
-        GROUP BY veiculo
-        ORDER BY valor DESC
-        """,
-        {"mes": mes, "ano": ano},
-    )
-
-    custo_por_km = await fetch_list(
-        session,
-        """
-        SELECT COALESCE(v.placa, 'Veículo') AS veiculo,
-               COALESCE(SUM(cci.valor_total) / NULLIF(SUM(cci.km_rodado), 0), 0) AS valor
-        FROM ctrl_combustivel_item cci
-        JOIN ctrl_combustivel cc ON cc.id = cci.ctrl_combustivel_id
-        LEFT JOIN veiculos v ON v.id = cc.veiculo_id
-        WHERE MONTH(cc.data_abastecimento) = :mes AND YEAR(cc.data_abastecimento) = :ano
-        GROUP BY veiculo
-        ORDER BY valor DESC
-        """,
-        {"mes": mes, "ano": ano},
+    inicio, fim = primeiro_dia(ano * 12 + mes - 1), primeiro_dia(ano * 12 + mes)
+    # Spending and cost per km come from the same join, so it is read once.
+    combustivel_result = await session.execute(
+        text(
+            """
+            SELECT COALESCE(v.placa, 'Veículo') AS veiculo,
+                   COALESCE(SUM(cci.valor_total), 0) AS valor,
+                   COALESCE(SUM(cci.valor_total) / NULLIF(SUM(cci.km_rodado), 0), 0) AS custo_por_km
+            FROM ctrl_combustivel_item cci
+            JOIN ctrl_combustivel cc ON cc.id = cci.ctrl_combustivel_id
+            LEFT JOIN veiculos v ON v.id = cc.veiculo_id
+            WHERE cc.data_abastecimento >= :inicio AND cc.data_abastecimento < :fim
+            GROUP BY veiculo
+            """
+        ),
+        {"inicio": inicio, "fim": fim},
     )
+    combustivel = combustivel_result.all()
+    consumo_combustivel = [
+        VeiculoConsumo(veiculo=row.veiculo, valor=float(row.valor or 0))
+        for row in sorted(combustivel, key=lambda row: row.valor or 0, reverse=True)
+    ]
+    custo_por_km = [
+        VeiculoConsumo(veiculo=row.veiculo, valor=float(row.custo_por_km or 0))
+        for row in sorted(combustivel, key=lambda row: row.custo_por_km or 0, reverse=True)
+    ]
 
     viagens_por_veiculo = await fetch_list(
         session,
@@ -62,38 +109,14 @@ async def get_frotas_resumo(
         SELECT COALESCE(v.placa, 'Veículo') AS veiculo, COUNT(*) AS valor
         FROM viagens vi
         LEFT JOIN veiculos v ON v.id = vi.veiculo_id
-        WHERE MONTH(vi.data_viagem) = :mes AND YEAR(vi.data_viagem) = :ano
+        WHERE vi.data_viagem >= :inicio AND vi.data_viagem < :fim
         GROUP BY veiculo
         ORDER BY valor DESC
         """,
-        {"mes": mes, "ano": ano},
+        {"inicio": inicio, "fim": fim},
     )
 
-    licenciamento_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(v.placa, 'Veículo') AS veiculo,
-                   cl.data_vencimento,
-                   CASE
-                        WHEN cl.data_vencimento < CURRENT_DATE THEN 'vencido'
-                        WHEN cl.data_vencimento BETWEEN CURRENT_DATE AND (CURRENT_DATE + INTERVAL 60 DAY) THEN 'a vencer'
-                        ELSE 'vigente'
-                   END AS status
-            FROM ctrl_licenciamento cl
-            LEFT JOIN veiculos v ON v.id = cl.veiculo_id
-            WHERE cl.data_vencimento BETWEEN CURRENT_DATE - INTERVAL 30 DAY AND CURRENT_DATE + INTERVAL 120 DAY
-            ORDER BY cl.data_vencimento
-            """
-        )
-    )
-    veiculos_licenciamento = [
-        LicenciamentoStatus(
-            veiculo=row.veiculo,
-            data_vencimento=row.data_vencimento.isoformat() if row.data_vencimento else None,
-            status=row.status,
-        )
-        for row in licenciamento_result
-    ]
+    veiculos_licenciamento, licenciamento_pagina = await fetch_licenciamentos(session, limit)
 
     observacao = "Confirme colunas km_rodado, valor_total e data_abastecimento em ctrl_combustivel_item." \
         " Ajuste data_vencimento em ctrl_licenciamento se necessário."
@@ -105,11 +128,59 @@ async def get_frotas_resumo(
         custo_por_km_por_veiculo=custo_por_km,
         viagens_por_veiculo=viagens_por_veiculo,
         veiculos_com_licenciamento_vencido_ou_a_vencer=veiculos_licenciamento,
+        veiculos_com_licenciamento_pagina=licenciamento_pagina,
         observacao=observacao,
     )
 
 
+@router.get("/frotas/analitico", response_model=FrotasAnaliticoResponse)
+@cached("frotas_analitico", versao=VersaoDados("veiculos", "ctrl_combustivel", "ctrl_combustivel_item"))
+async def get_frotas_analitico(
+    mes: int = Query(default_factory=lambda: datetime.utcnow().month, ge=1, le=12),
+    ano: int = Query(default_factory=lambda: datetime.utcnow().year),
+    meses: int = Query(12, ge=1, le=24, description="Meses analisados, terminando em mes/ano"),
+    janela: int = Query(3, ge=1, le=12, description="Meses das médias móveis de km/l e custo/km"),
+    limiar_z: float = Query(3.0, gt=0, description="|z| a partir do qual um abastecimento do mês é sinalizado"),
+    session: AsyncSession = Depends(get_session),
+) -> FrotasAnaliticoResponse:
+    analise = await analisar_frota(session, ano, mes, meses, janela, limiar_z)
+
+    observacao = "Confirme colunas quantidade (litros), km_rodado e valor_total em ctrl_combustivel_item." \
+        " O z-score compara cada abastecimento do mês com os do mesmo veículo em todo o período."
+
+    return FrotasAnaliticoResponse(
+        mes=mes,
+        ano=ano,
+        meses=meses,
+        janela=janela,
+        limiar_z=limiar_z,
+        veiculos=[
+            VeiculoAnalitico(**{**vars(item), "meses": [FrotaMes(**vars(mes_item)) for mes_item in item.meses]})
+            for item in analise.veiculos
+        ],
+        abastecimentos_anomalos=[AbastecimentoAnomalo(**vars(item)) for item in analise.anomalias],
+        observacao=observacao,
+    )
+
+
+@router.get("/frotas/licenciamentos", response_model=LicenciamentosResponse)
+@cached(
+    "frotas_licenciamentos",
+    versao=VersaoDados("veiculos", "ctrl_licenciamento", locais=(indices_vencimentos.versao,)),
+)
+async def get_frotas_licenciamentos(
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
+    session: AsyncSession = Depends(get_session),
+) -> LicenciamentosResponse:
+    veiculos_licenciamento, pagina = await fetch_licenciamentos(session, limit, cursor)
+    return LicenciamentosResponse(
+        veiculos_com_licenciamento_vencido_ou_a_vencer=veiculos_licenciamento, pagina=pagina
+    )
+
+
 @router.get("/transporte-escolar/resumo", response_model=TransporteEscolarResponse)
+@cached("transporte_escolar_resumo", versao=VersaoDados("transporte_escolar", "rota"))
 async def get_transporte_escolar_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year),
     session: AsyncSession = Depends(get_session),
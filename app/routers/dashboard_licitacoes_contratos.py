@@ -5,7 +5,10 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..config import settings
 from ..database import get_session
+from ..pagination import Cursor, Limite
 from ..schemas.licitacoes_contratos import (
     ContratoProximoVencimento,
     ContratosProximosVencimentosResponse,
@@ -13,6 +16,8 @@ from ..schemas.licitacoes_contratos import (
     LicitacaoStatusResumo,
     LicitacoesResumoResponse,
 )
+from ..services.vencimentos import indices_vencimentos, paginar
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-licitacoes-contratos"])
 
@@ -41,6 +46,7 @@ async def fetch_modalidade_list(
 
 
 @router.get("/licitacoes/resumo", response_model=LicitacoesResumoResponse)
+@cached("licitacoes_resumo", versao=VersaoDados("licit_processo", "licit_contrato"))
 async def get_licitacoes_resumo(
     ano: int = Query(..., description="Ano de referência"),
     session: AsyncSession = Depends(get_session),
@@ -114,42 +120,33 @@ async def get_licitacoes_resumo(
 
 
 @router.get("/contratos/proximos-vencimentos", response_model=ContratosProximosVencimentosResponse)
+@cached(
+    "contratos_proximos_vencimentos",
+    versao=VersaoDados("licit_contrato", "fornecedor", locais=(indices_vencimentos.versao,)),
+)
 async def get_contratos_proximos_vencimentos(
     dias: int = Query(90, description="Quantidade de dias para o corte de vencimento"),
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
     session: AsyncSession = Depends(get_session),
 ) -> ContratosProximosVencimentosResponse:
     hoje = datetime.utcnow().date()
     limite = hoje + timedelta(days=dias)
 
-    result = await session.execute(
-        text(
-            """
-            SELECT lc.id,
-                   lc.numero,
-                   f.nome AS fornecedor,
-                   lc.valor_global AS valor,
-                   lc.data_fim,
-                   COALESCE(ls.descricao, 'vigente') AS status
-            FROM licit_contrato lc
-            LEFT JOIN fornecedor f ON f.id = lc.fornecedor_id
-            LEFT JOIN licit_status ls ON ls.id = lc.status_id
-            WHERE lc.data_fim BETWEEN :hoje AND :limite
-            ORDER BY lc.data_fim
-            """
-        ),
-        {"hoje": hoje, "limite": limite},
-    )
+    # Any window is a binary search over the in-memory index, with the supplier already joined.
+    indice = await indices_vencimentos.indice(session, "contrato")
+    itens, pagina = paginar(indice, hoje, limite, limit, cursor)
 
     contratos = [
         ContratoProximoVencimento(
-            id=row.id,
-            numero=row.numero,
-            fornecedor=row.fornecedor,
-            valor=float(row.valor or 0),
-            data_fim=row.data_fim,
-            status=row.status,
+            id=item.id,
+            numero=item.descricao,
+            fornecedor=item.detalhe or "Fornecedor",
+            valor=item.valor or 0,
+            data_fim=item.data,
+            status=item.situacao,
         )
-        for row in result.all()
+        for item in itens
     ]
 
-    return ContratosProximosVencimentosResponse(dias=dias, contratos=contratos)
+    return ContratosProximosVencimentosResponse(dias=dias, contratos=contratos, pagina=pagina)
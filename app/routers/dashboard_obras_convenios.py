@@ -1,25 +1,73 @@
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..config import settings
 from ..database import get_session
+from ..pagination import Cursor, Limite, ListaPaginada, Ordenacao, buscar_pagina, data_cursor
 from ..schemas.obras_convenios import (
     ConvenioPorOrgao,
     ConveniosResumoResponse,
     ExecucaoFinanceiraConvenio,
     ObraAtrasada,
+    ObrasAtrasadasResponse,
     ObrasPorSituacao,
     ObrasResumoResponse,
 )
+from ..schemas.paginacao import Pagina
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-obras-convenios"])
 
 
+OBRAS_ATRASADAS = ListaPaginada(
+    sql="""
+        SELECT id, descricao, data_fim_prevista, situacao
+        FROM obr_obra
+        WHERE data_fim_prevista < :hoje AND situacao NOT IN ('concluida', 'concluída') AND {keyset}
+        """,
+    contagem="""
+        SELECT COUNT(*)
+        FROM obr_obra
+        WHERE data_fim_prevista < :hoje AND situacao NOT IN ('concluida', 'concluída')
+        """,
+    chaves=(Ordenacao("data_fim_prevista", "data_fim_prevista", data_cursor), Ordenacao("id", "id")),
+)
+
+
+async def fetch_obras_atrasadas(
+    session: AsyncSession, limit: int, cursor: str | None = None
+) -> Tuple[List[ObraAtrasada], Pagina]:
+    linhas, pagina = await buscar_pagina(
+        session, OBRAS_ATRASADAS, {"hoje": datetime.utcnow().date()}, limit, cursor
+    )
+    obras_atrasadas = [
+        ObraAtrasada(
+            id=row.id,
+            descricao=row.descricao,
+            # The cursor keeps a DATETIME's time; the response shows the day.
+            data_fim_prevista=(
+                row.data_fim_prevista.date()
+                if isinstance(row.data_fim_prevista, datetime)
+                else row.data_fim_prevista
+            ),
+            situacao=row.situacao,
+        )
+        for row in linhas
+    ]
+    return obras_atrasadas, pagina
+
+
 @router.get("/obras/resumo", response_model=ObrasResumoResponse)
-async def get_obras_resumo(session: AsyncSession = Depends(get_session)) -> ObrasResumoResponse:
+@cached("obras_resumo", versao=VersaoDados("obr_obra", "obr_medicao"))
+async def get_obras_resumo(
+    limit: Limite = settings.pagination_default_limit,
+    session: AsyncSession = Depends(get_session),
+) -> ObrasResumoResponse:
     situacao_result = await session.execute(
         text(
             """
@@ -49,35 +97,29 @@ async def get_obras_resumo(session: AsyncSession = Depends(get_session)) -> Obra
     )
     execucao_fisica_media = float(execucao_fisica_media_result.scalar() or 0)
 
-    obras_atrasadas_result = await session.execute(
-        text(
-            """
-            SELECT id, descricao, data_fim_prevista, situacao
-            FROM obr_obra
-            WHERE data_fim_prevista < :hoje AND situacao NOT IN ('concluida', 'concluída')
-            ORDER BY data_fim_prevista
-            """
-        ),
-        {"hoje": datetime.utcnow().date()},
-    )
-    obras_atrasadas = [
-        ObraAtrasada(
-            id=row.id,
-            descricao=row.descricao,
-            data_fim_prevista=row.data_fim_prevista,
-            situacao=row.situacao,
-        )
-        for row in obras_atrasadas_result.all()
-    ]
+    obras_atrasadas, pagina = await fetch_obras_atrasadas(session, limit)
 
     return ObrasResumoResponse(
         qtde_obras_por_situacao=qtde_obras_por_situacao,
         execucao_fisica_media=execucao_fisica_media,
         obras_atrasadas=obras_atrasadas,
+        obras_atrasadas_pagina=pagina,
     )
 
 
+@router.get("/obras/atrasadas", response_model=ObrasAtrasadasResponse)
+@cached("obras_atrasadas", versao=VersaoDados("obr_obra"))
+async def get_obras_atrasadas(
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
+    session: AsyncSession = Depends(get_session),
+) -> ObrasAtrasadasResponse:
+    obras_atrasadas, pagina = await fetch_obras_atrasadas(session, limit, cursor)
+    return ObrasAtrasadasResponse(obras_atrasadas=obras_atrasadas, pagina=pagina)
+
+
 @router.get("/convenios/resumo", response_model=ConveniosResumoResponse)
+@cached("convenios_resumo", versao=VersaoDados("cont_convenio", "ct_conv_movimento"))
 async def get_convenios_resumo(
     session: AsyncSession = Depends(get_session),
 ) -> ConveniosResumoResponse:
@@ -1,183 +1,68 @@
 from datetime import datetime
-from typing import Any, Dict
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
 from ..database import get_session
+from ..kpis import calcular_kpis
 from ..schemas.overview import OverviewCards, OverviewResponse
+from ..services.cubo_colunar import cubo_colunar
+from ..services.resumo_mensal import execucao_source
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-overview"])
 
-
-async def fetch_scalar(session: AsyncSession, query: str, params: Dict[str, Any]) -> float:
-    result = await session.execute(text(query), params)
-    value = result.scalar()
-    return float(value or 0)
-
-
-async def fetch_count(session: AsyncSession, query: str, params: Dict[str, Any]) -> int:
-    result = await session.execute(text(query), params)
-    value = result.scalar()
-    return int(value or 0)
+RECEITA_SOURCE = execucao_source("view_mov_rec")
+DESPESA_SOURCE = execucao_source("view_desp_executada")
+PAGAMENTO_SOURCE = execucao_source("view_mov_pagamento")
+
+# Card -> registered indicator; the same indicators back the finance and debt routes.
+OVERVIEW_KPIS = {
+    "receita_prevista_ano": "receita_prevista",
+    "receita_realizada_ano": "receita_realizada",
+    "despesa_dotacao_atualizada_ano": "despesa_dotacao_atualizada",
+    "despesa_empenhada_ano": "despesa_empenhada",
+    "despesa_liquidada_ano": "despesa_liquidada",
+    "despesa_paga_ano": "despesa_paga",
+    "caixa_disponivel": "caixa_disponivel",
+    "estoque_divida_ativa_total": "estoque_divida_ativa",
+    "recuperacao_divida_ativa_ano": "recuperacao_divida_ativa",
+    "qtde_licitacoes_em_andamento": "licitacoes_em_andamento",
+    "qtde_licitacoes_homologadas_ano": "licitacoes_homologadas",
+    "qtde_obras_em_execucao": "obras_em_execucao",
+    "qtde_obras_paralisadas": "obras_paralisadas",
+}
+
+OVERVIEW_VERSAO = VersaoDados(
+    "receita_loa",
+    RECEITA_SOURCE,
+    DESPESA_SOURCE,
+    PAGAMENTO_SOURCE,
+    "ts_conta_banc_saldo_ano",
+    "divida_ativa",
+    "duam_baixa",
+    "licit_processo",
+    "obr_obra",
+    locais=(cubo_colunar.versao,),
+)
 
 
 @router.get("/overview", response_model=OverviewResponse)
+@cached("overview", ttl=60, versao=OVERVIEW_VERSAO)
 async def get_dashboard_overview(
     ano: int | None = None, session: AsyncSession = Depends(get_session)
 ) -> OverviewResponse:
     ano_ref = ano or datetime.utcnow().year
 
-    receita_prevista_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_previsto), 0)
-        FROM receita_loa
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    receita_realizada_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_arrecadado), 0)
-        FROM view_mov_rec
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    despesa_dotacao_atualizada_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(dotacao_atualizada), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    despesa_empenhada_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(empenhado), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    despesa_liquidada_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(liquidado), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    despesa_paga_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_pago), 0)
-        FROM view_mov_pagamento
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    caixa_disponivel = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(saldo_final), 0)
-        FROM ts_conta_banc_saldo_ano
-        WHERE ano = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    estoque_divida_ativa_total = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_atualizado), 0)
-        FROM divida_ativa
-        WHERE ano_referencia = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    recuperacao_divida_ativa_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_pago), 0)
-        FROM duam_baixa
-        WHERE YEAR(data_baixa) = :ano
-        """,
-        {"ano": ano_ref},
-    )
-
-    qtde_licitacoes_em_andamento = await fetch_count(
-        session,
-        """
-        SELECT COUNT(*)
-        FROM licit_processo lp
-        JOIN licit_status ls ON ls.id = lp.status_id
-        WHERE YEAR(lp.data_abertura) = :ano AND ls.descricao IN ('em andamento', 'publicado', 'disputa')
-        """,
-        {"ano": ano_ref},
-    )
-
-    qtde_licitacoes_homologadas_ano = await fetch_count(
-        session,
-        """
-        SELECT COUNT(*)
-        FROM licit_processo lp
-        JOIN licit_status ls ON ls.id = lp.status_id
-        WHERE YEAR(lp.data_abertura) = :ano AND ls.descricao = 'homologado'
-        """,
-        {"ano": ano_ref},
-    )
-
-    qtde_obras_em_execucao = await fetch_count(
-        session,
-        """
-        SELECT COUNT(*)
-        FROM obr_obra
-        WHERE situacao IN ('em execucao', 'execução')
-        """,
-        {},
-    )
-
-    qtde_obras_paralisadas = await fetch_count(
-        session,
-        """
-        SELECT COUNT(*)
-        FROM obr_obra
-        WHERE LOWER(situacao) LIKE '%paralisada%'
-        """,
-        {},
-    )
+    kpis = await calcular_kpis(session, OVERVIEW_KPIS.values(), {"ano": ano_ref})
+    valores = {card: kpis[nome] for card, nome in OVERVIEW_KPIS.items()}
 
-    resultado_primario_simplificado = receita_realizada_ano - despesa_empenhada_ano
+    resultado_primario_simplificado = valores["receita_realizada_ano"] - valores["despesa_empenhada_ano"]
 
     cards = OverviewCards(
-        receita_prevista_ano=receita_prevista_ano,
-        receita_realizada_ano=receita_realizada_ano,
-        despesa_dotacao_atualizada_ano=despesa_dotacao_atualizada_ano,
-        despesa_empenhada_ano=despesa_empenhada_ano,
-        despesa_liquidada_ano=despesa_liquidada_ano,
-        despesa_paga_ano=despesa_paga_ano,
+        **valores,
         resultado_primario_simplificado=resultado_primario_simplificado,
-        caixa_disponivel=caixa_disponivel,
-        estoque_divida_ativa_total=estoque_divida_ativa_total,
-        recuperacao_divida_ativa_ano=recuperacao_divida_ativa_ano,
-        qtde_licitacoes_em_andamento=qtde_licitacoes_em_andamento,
-        qtde_licitacoes_homologadas_ano=qtde_licitacoes_homologadas_ano,
-        qtde_obras_em_execucao=qtde_obras_em_execucao,
-        qtde_obras_paralisadas=qtde_obras_paralisadas,
     )
 
     observacao = (
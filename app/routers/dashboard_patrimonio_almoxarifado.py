@@ -1,18 +1,29 @@
-from datetime import datetime
-from typing import Any, Dict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..config import settings
 from ..database import get_session
+from ..pagination import Cursor, Limite, ListaPaginada, Ordenacao, buscar_pagina
 from ..schemas.patrimonio_almoxarifado import (
     AlmoxarifadoResponse,
+    ConsumoProdutoResponse,
     ConsumoResumo,
     EstoqueProduto,
+    EstoqueResponse,
     PatrimonioResponse,
+    PatrimonioValuationResponse,
     ResumoValor,
+    ValuationGrupo,
 )
+from ..schemas.paginacao import Pagina
+from ..services.depreciacao import motor_depreciacao
+from ..versioning import Sonda, VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-patrimonio-almoxarifado"])
 
@@ -24,6 +35,7 @@ async def fetch_scalar(session: AsyncSession, query: str, params: Dict[str, Any]
 
 
 @router.get("/patrimonio/resumo", response_model=PatrimonioResponse)
+@cached("patrimonio_resumo", versao=VersaoDados("patrimonio", "patrimonio_responsavel", "ptr_depreciacao"))
 async def get_patrimonio_resumo(
     session: AsyncSession = Depends(get_session),
 ) -> PatrimonioResponse:
@@ -86,10 +98,164 @@ async def get_patrimonio_resumo(
     )
 
 
+@router.get("/patrimonio/valuation", response_model=PatrimonioValuationResponse)
+@cached(
+    "patrimonio_valuation",
+    versao=VersaoDados("patrimonio", "patrimonio_responsavel", locais=(motor_depreciacao.versao,)),
+)
+async def get_patrimonio_valuation(
+    data: date = Query(default_factory=lambda: datetime.utcnow().date(), description="Data de referência (YYYY-MM-DD)"),
+    session: AsyncSession = Depends(get_session),
+) -> PatrimonioValuationResponse:
+    avaliacao = await motor_depreciacao.avaliar(session, data)
+
+    def grupos(itens) -> List[ValuationGrupo]:
+        return [ValuationGrupo(**vars(item)) for item in itens]
+
+    observacao = (
+        "Ajuste colunas: data_aquisicao, data_baixa, vida_util_meses, valor_residual e metodo_depreciacao "
+        "(linear, saldo_decrescente, soma_digitos) conforme o schema real."
+    )
+
+    return PatrimonioValuationResponse(
+        data=data,
+        referencia=avaliacao.referencia,
+        quantidade_bens=avaliacao.quantidade,
+        valor_aquisicao=avaliacao.valor_aquisicao,
+        depreciacao_acumulada=avaliacao.depreciacao_acumulada,
+        depreciacao_no_mes=avaliacao.depreciacao_no_mes,
+        valor_contabil=avaliacao.valor_contabil,
+        por_orgao=grupos(avaliacao.por_orgao),
+        por_natureza=grupos(avaliacao.por_natureza),
+        observacao=observacao,
+    )
+
+
+CONSUMO_POR_PRODUTO = ListaPaginada(
+    sql="""
+        SELECT COALESCE(si.produto_id, 0) AS produto_id,
+               COALESCE(p.nome, 'Produto') AS item,
+               COALESCE(SUM(si.valor_total), 0) AS valor
+        FROM saida_item si
+        JOIN saida_estoque se ON se.id = si.saida_id
+        LEFT JOIN produto p ON p.id = si.produto_id
+        WHERE MONTH(se.data_saida) = :mes AND YEAR(se.data_saida) = :ano
+        GROUP BY COALESCE(si.produto_id, 0), p.nome
+        HAVING {keyset}
+        """,
+    contagem="""
+        SELECT COUNT(DISTINCT COALESCE(si.produto_id, 0))
+        FROM saida_item si
+        JOIN saida_estoque se ON se.id = si.saida_id
+        WHERE MONTH(se.data_saida) = :mes AND YEAR(se.data_saida) = :ano
+        """,
+    chaves=(
+        Ordenacao("COALESCE(SUM(si.valor_total), 0)", "valor", Decimal, decrescente=True),
+        Ordenacao("COALESCE(si.produto_id, 0)", "produto_id"),
+    ),
+)
+
+
+def _estoque(saldos: str) -> ListaPaginada:
+    # Every product, with its balance taken from a derived table (produto_id, quantidade).
+    return ListaPaginada(
+        sql=f"""
+            SELECT p.id,
+                   COALESCE(p.nome, 'Produto') AS produto,
+                   COALESCE(s.quantidade, 0) AS quantidade
+            FROM produto p
+            LEFT JOIN ({saldos}) s ON s.produto_id = p.id
+            WHERE {{keyset}}
+            """,
+        contagem="SELECT COUNT(*) FROM produto",
+        chaves=(
+            Ordenacao("COALESCE(s.quantidade, 0)", "quantidade", Decimal, decrescente=True),
+            Ordenacao("p.id", "id"),
+        ),
+    )
+
+
+# Entries and exits are summed apart and only then joined to produto: joining both item
+# tables at once multiplied every entry by every exit of the same product.
+ESTOQUE_ATUAL = _estoque(
+    """
+    SELECT produto_id, SUM(quantidade) AS quantidade
+    FROM (
+        SELECT ei.produto_id, ei.quantidade FROM entrada_item ei
+        UNION ALL
+        SELECT si.produto_id, -si.quantidade FROM saida_item si
+    ) movimento
+    GROUP BY produto_id
+    """
+)
+
+ESTOQUE_NA_DATA = _estoque(
+    """
+    SELECT produto_id, SUM(quantidade) AS quantidade
+    FROM (
+        SELECT ei.produto_id, ei.quantidade
+        FROM entrada_item ei
+        JOIN entrada_estoque ee ON ee.id = ei.entrada_id
+        WHERE ee.data_entrada < :ate
+        UNION ALL
+        SELECT si.produto_id, -si.quantidade
+        FROM saida_item si
+        JOIN saida_estoque se ON se.id = si.saida_id
+        WHERE se.data_saida < :ate
+    ) movimento
+    GROUP BY produto_id
+    """
+)
+
+# With the ledger (sql/estoque_razao.sql) the current stock is one row per product and a
+# past date is the last daily balance up to that day, read through the primary key.
+ESTOQUE_RAZAO_ATUAL = _estoque("SELECT produto_id, quantidade FROM estoque_saldo")
+
+ESTOQUE_RAZAO_NA_DATA = _estoque(
+    """
+    SELECT m.produto_id, m.saldo_acumulado AS quantidade
+    FROM estoque_movimento_diario m
+    JOIN (
+        SELECT produto_id, MAX(data) AS data
+        FROM estoque_movimento_diario
+        WHERE data <= :data
+        GROUP BY produto_id
+    ) ultimo ON ultimo.produto_id = m.produto_id AND ultimo.data = m.data
+    """
+)
+
+if settings.estoque_razao_enabled:
+    ESTOQUE_VERSAO = VersaoDados("produto", Sonda("estoque_razao_controle", "MAX(atualizado_em)"))
+else:
+    ESTOQUE_VERSAO = VersaoDados("produto", "entrada_estoque", "entrada_item", "saida_estoque", "saida_item")
+
+
+async def fetch_consumo_por_produto(
+    session: AsyncSession, mes: int, ano: int, limit: int, cursor: str | None = None
+) -> Tuple[List[ConsumoResumo], Pagina]:
+    linhas, pagina = await buscar_pagina(session, CONSUMO_POR_PRODUTO, {"mes": mes, "ano": ano}, limit, cursor)
+    return [ConsumoResumo(item=row.item, valor=float(row.valor or 0)) for row in linhas], pagina
+
+
+async def fetch_estoque_atual(
+    session: AsyncSession, limit: int, cursor: str | None = None, data: date | None = None
+) -> Tuple[List[EstoqueProduto], Pagina]:
+    if data is None:
+        lista, params = (ESTOQUE_RAZAO_ATUAL if settings.estoque_razao_enabled else ESTOQUE_ATUAL), {}
+    elif settings.estoque_razao_enabled:
+        lista, params = ESTOQUE_RAZAO_NA_DATA, {"data": data}
+    else:
+        lista, params = ESTOQUE_NA_DATA, {"ate": data + timedelta(days=1)}
+    linhas, pagina = await buscar_pagina(session, lista, params, limit, cursor)
+    return [EstoqueProduto(produto=row.produto, quantidade=float(row.quantidade or 0)) for row in linhas], pagina
+
+
 @router.get("/almoxarifado/resumo", response_model=AlmoxarifadoResponse)
+@cached("almoxarifado_resumo", versao=VersaoDados(*ESTOQUE_VERSAO.sondas, "saida_estoque", "saida_item"))
 async def get_almoxarifado_resumo(
     mes: int = Query(default_factory=lambda: datetime.utcnow().month, ge=1, le=12),
     ano: int = Query(default_factory=lambda: datetime.utcnow().year),
+    limit: Limite = settings.pagination_default_limit,
     session: AsyncSession = Depends(get_session),
 ) -> AlmoxarifadoResponse:
     consumo_orgao_result = await session.execute(
@@ -109,41 +275,8 @@ async def get_almoxarifado_resumo(
         ConsumoResumo(item=row.item, valor=float(row.valor or 0)) for row in consumo_orgao_result
     ]
 
-    consumo_produto_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(p.nome, 'Produto') AS item, COALESCE(SUM(si.valor_total), 0) AS valor
-            FROM saida_item si
-            JOIN saida_estoque se ON se.id = si.saida_id
-            LEFT JOIN produto p ON p.id = si.produto_id
-            WHERE MONTH(se.data_saida) = :mes AND YEAR(se.data_saida) = :ano
-            GROUP BY item
-            ORDER BY valor DESC
-            """
-        ),
-        {"mes": mes, "ano": ano},
-    )
-    consumo_por_produto = [
-        ConsumoResumo(item=row.item, valor=float(row.valor or 0)) for row in consumo_produto_result
-    ]
-
-    estoque_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(p.nome, 'Produto') AS produto,
-                   COALESCE(SUM(ei.quantidade), 0) - COALESCE(SUM(si.quantidade), 0) AS quantidade
-            FROM produto p
-            LEFT JOIN entrada_item ei ON ei.produto_id = p.id
-            LEFT JOIN saida_item si ON si.produto_id = p.id
-            GROUP BY produto
-            ORDER BY quantidade DESC
-            """
-        ),
-    )
-    estoque_atual = [
-        EstoqueProduto(produto=row.produto, quantidade=float(row.quantidade or 0))
-        for row in estoque_result
-    ]
+    consumo_por_produto, consumo_pagina = await fetch_consumo_por_produto(session, mes, ano, limit)
+    estoque_atual, estoque_pagina = await fetch_estoque_atual(session, limit)
 
     observacao = (
         "Confirme colunas de valor_total em saida_estoque/saida_item e quantidade em entrada_item/saida_item."
@@ -154,6 +287,33 @@ async def get_almoxarifado_resumo(
         ano=ano,
         consumo_por_orgao_no_mes=consumo_por_orgao,
         consumo_por_produto=consumo_por_produto,
+        consumo_por_produto_pagina=consumo_pagina,
         estoque_atual_por_produto=estoque_atual,
+        estoque_atual_por_produto_pagina=estoque_pagina,
         observacao=observacao,
     )
+
+
+@router.get("/almoxarifado/consumo-por-produto", response_model=ConsumoProdutoResponse)
+@cached("almoxarifado_consumo_por_produto", versao=VersaoDados("produto", "saida_estoque", "saida_item"))
+async def get_almoxarifado_consumo_por_produto(
+    mes: int = Query(default_factory=lambda: datetime.utcnow().month, ge=1, le=12),
+    ano: int = Query(default_factory=lambda: datetime.utcnow().year),
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
+    session: AsyncSession = Depends(get_session),
+) -> ConsumoProdutoResponse:
+    consumo_por_produto, pagina = await fetch_consumo_por_produto(session, mes, ano, limit, cursor)
+    return ConsumoProdutoResponse(mes=mes, ano=ano, consumo_por_produto=consumo_por_produto, pagina=pagina)
+
+
+@router.get("/almoxarifado/estoque", response_model=EstoqueResponse)
+@cached("almoxarifado_estoque", versao=ESTOQUE_VERSAO)
+async def get_almoxarifado_estoque(
+    data: date | None = Query(None, description="Saldo ao fim deste dia (YYYY-MM-DD); omitido, o saldo atual"),
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
+    session: AsyncSession = Depends(get_session),
+) -> EstoqueResponse:
+    estoque_atual, pagina = await fetch_estoque_atual(session, limit, cursor, data)
+    return EstoqueResponse(data=data, estoque_atual_por_produto=estoque_atual, pagina=pagina)
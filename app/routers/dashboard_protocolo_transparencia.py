@@ -5,8 +5,11 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
 from ..database import get_session
+from ..query_merge import ScalarQuery, count_of, gather_scalars
 from ..schemas.protocolo_transparencia import EsicResponse, ProtocoloResponse, ResumoQuantidade
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-protocolo-transparencia"])
 
@@ -17,6 +20,7 @@ async def fetch_quantidades(session: AsyncSession, query: str, params: Dict[str,
 
 
 @router.get("/protocolo/resumo", response_model=ProtocoloResponse)
+@cached("protocolo_resumo", versao=VersaoDados("prot_protocolo"))
 async def get_protocolo_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year),
     session: AsyncSession = Depends(get_session),
@@ -84,71 +88,42 @@ async def get_protocolo_resumo(
     )
 
 
+ESIC_PEDIDOS = "esic_registrar_pedidos erp"
+ESIC_RESPONDIDO = "erp.data_resposta IS NOT NULL"
+
+ESIC_SCALARS = [
+    ScalarQuery("pedidos_informacao_recebidos", ESIC_PEDIDOS, count_of(), "YEAR(erp.data_pedido) = :ano", int),
+    ScalarQuery(
+        "respondidos_no_prazo",
+        ESIC_PEDIDOS,
+        count_of(f"{ESIC_RESPONDIDO} AND DATEDIFF(erp.data_resposta, erp.data_pedido) <= erp.prazo_dias"),
+        "YEAR(erp.data_pedido) = :ano",
+        int,
+    ),
+    ScalarQuery(
+        "respondidos_fora_do_prazo",
+        ESIC_PEDIDOS,
+        count_of(f"{ESIC_RESPONDIDO} AND DATEDIFF(erp.data_resposta, erp.data_pedido) > erp.prazo_dias"),
+        "YEAR(erp.data_pedido) = :ano",
+        int,
+    ),
+    ScalarQuery("em_andamento", ESIC_PEDIDOS, count_of("erp.data_resposta IS NULL"), "YEAR(erp.data_pedido) = :ano", int),
+]
+
+
 @router.get("/esic/resumo", response_model=EsicResponse)
+@cached("esic_resumo", versao=VersaoDados("esic_registrar_pedidos"))
 async def get_esic_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year),
     session: AsyncSession = Depends(get_session),
 ) -> EsicResponse:
-    recebidos_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM esic_registrar_pedidos
-            WHERE YEAR(data_pedido) = :ano
-            """
-        ),
-        {"ano": ano},
-    )
-    pedidos_informacao_recebidos = int(recebidos_result.scalar() or 0)
-
-    respondidos_no_prazo_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM esic_registrar_pedidos erp
-            WHERE YEAR(erp.data_pedido) = :ano
-              AND erp.data_resposta IS NOT NULL
-              AND DATEDIFF(erp.data_resposta, erp.data_pedido) <= prazo_dias
-            """
-        ),
-        {"ano": ano},
-    )
-    respondidos_no_prazo = int(respondidos_no_prazo_result.scalar() or 0)
-
-    respondidos_fora_prazo_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM esic_registrar_pedidos erp
-            WHERE YEAR(erp.data_pedido) = :ano
-              AND erp.data_resposta IS NOT NULL
-              AND DATEDIFF(erp.data_resposta, erp.data_pedido) > prazo_dias
-            """
-        ),
-        {"ano": ano},
-    )
-    respondidos_fora_do_prazo = int(respondidos_fora_prazo_result.scalar() or 0)
-
-    em_andamento_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM esic_registrar_pedidos erp
-            WHERE YEAR(erp.data_pedido) = :ano AND erp.data_resposta IS NULL
-            """
-        ),
-        {"ano": ano},
-    )
-    em_andamento = int(em_andamento_result.scalar() or 0)
+    valores = await gather_scalars(session, ESIC_SCALARS, {"ano": ano})
 
     observacao = "Ajuste nomes das colunas de datas/prazo na tabela esic_registrar_pedidos conforme o schema." \
         " Se usar tabelas de histórico, alinhe a query."
 
     return EsicResponse(
         ano=ano,
-        pedidos_informacao_recebidos=pedidos_informacao_recebidos,
-        respondidos_no_prazo=respondidos_no_prazo,
-        respondidos_fora_do_prazo=respondidos_fora_do_prazo,
-        em_andamento=em_andamento,
+        **valores,
         observacao=observacao,
     )
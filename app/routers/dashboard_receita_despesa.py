@@ -1,281 +1,331 @@
-from typing import Any, Dict, List
+from functools import partial
+from typing import Any, Dict, List, Literal, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import bindparam, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..cube import Agregado, CuboSpec, Dimensao, conjuntos_de_agrupamento, fetch_cubo
 from ..database import get_session
+from ..kpis import calcular_kpis
 from ..schemas.receita_despesa import (
+    CuboLinha,
+    CuboResponse,
     DespesaMensal,
     DespesaPorCategoria,
     DespesaResumoResponse,
     ReceitaMensal,
     ReceitaPorCategoria,
     ReceitaResumoResponse,
+    ReceitaSerieMensal,
+    ReceitaSerieResponse,
 )
+from ..services.cubo_colunar import cubo_colunar
+from ..services.resumo_mensal import execucao_source
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-receita-despesa"])
 
+RECEITA_SOURCE = execucao_source("view_mov_rec")
+DESPESA_SOURCE = execucao_source("view_desp_executada")
+PAGAMENTO_SOURCE = execucao_source("view_mov_pagamento")
 
-async def fetch_scalar(session: AsyncSession, query: str, params: Dict[str, Any]) -> float:
-    result = await session.execute(text(query), params)
-    value = result.scalar()
-    return float(value or 0)
+MAX_ANOS_SERIE = 20
 
+RECEITA_CUBO = CuboSpec(
+    origem=RECEITA_SOURCE,
+    dimensoes={
+        "orgao": Dimensao("orgao_id", "orgao"),
+        "origem": Dimensao("origem_id", "origem_receita"),
+        "natureza": Dimensao("natureza_id", "natureza"),
+        "fonte": Dimensao("fonte_id", "fonte"),
+        "mes": Dimensao("mes"),
+    },
+    medidas=("valor_arrecadado",),
+)
+DESPESA_CUBO = CuboSpec(
+    origem=DESPESA_SOURCE,
+    dimensoes={
+        "orgao": Dimensao("orgao_id", "orgao"),
+        "funcao": Dimensao("funcao_id", "funcao"),
+        "programa": Dimensao("programa_id", "programa"),
+        "fonte": Dimensao("fonte_id", "fonte"),
+        "natureza": Dimensao("natureza_id", "natureza"),
+        "mes": Dimensao("mes"),
+    },
+    medidas=("empenhado", "liquidado", "valor_pago", "dotacao_atualizada"),
+)
+RECEITA_SERIE = CuboSpec(
+    origem=RECEITA_SOURCE,
+    dimensoes={"ano": Dimensao("ano"), "mes": Dimensao("mes")},
+    medidas=("valor_arrecadado",),
+)
+cubo_colunar.registrar(RECEITA_CUBO)
+cubo_colunar.registrar(DESPESA_CUBO)
+
+# Execution routes may answer from the in-memory cube, whose own version joins the probes.
+RECEITA_VERSAO = VersaoDados(RECEITA_SOURCE, locais=(cubo_colunar.versao,))
+DESPESA_VERSAO = VersaoDados(DESPESA_SOURCE, locais=(cubo_colunar.versao,))
 
-async def fetch_category_list(
-    session: AsyncSession, query: str, params: Dict[str, Any]
-) -> List[ReceitaPorCategoria]:
-    result = await session.execute(text(query), params)
+
+def _categorias(agregados: List[Agregado], dimensao: str, medida: str, modelo: type) -> List[Any]:
     return [
-        ReceitaPorCategoria(categoria=row[0], valor=float(row[1] or 0))
-        for row in result.all()
+        modelo(categoria=agregado.chaves[dimensao], valor=agregado.valores[medida])
+        for agregado in agregados
+        if agregado.conjunto == (dimensao,)
     ]
 
 
-@router.get("/receita/resumo", response_model=ReceitaResumoResponse)
-async def get_receita_resumo(
-    ano: int = Query(..., description="Ano de referência, ex: 2024"),
-    session: AsyncSession = Depends(get_session),
-) -> ReceitaResumoResponse:
-    receita_prevista = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_previsto), 0)
-        FROM receita_loa
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
+async def fetch_execucao_cubo(
+    session: AsyncSession,
+    spec: CuboSpec,
+    dimensoes: Sequence[str],
+    medidas: Sequence[str],
+    agrupamento: str,
+    ano: int,
+) -> List[Agregado]:
+    # Served from the in-memory columnar cube when it holds the year; SQL otherwise.
+    agregados = cubo_colunar.agregar(
+        spec, dimensoes, medidas, conjuntos_de_agrupamento(dimensoes, agrupamento), [ano]
+    )
+    if agregados is not None:
+        return agregados
+    return await fetch_cubo(
+        session, spec, dimensoes, medidas, agrupamento, where="t.ano = :ano", params={"ano": ano}
     )
 
-    receita_realizada = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_arrecadado), 0)
-        FROM view_mov_rec
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
+
+def _parse_lista(valor: str | None, permitidos: Sequence[str], campo: str) -> List[str]:
+    if not valor:
+        return list(permitidos)
+    itens = list(dict.fromkeys(parte.strip() for parte in valor.split(",") if parte.strip()))
+    invalidos = [item for item in itens if item not in permitidos]
+    if invalidos or not itens:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{campo} inválido(s): {', '.join(invalidos) or '-'}; use {', '.join(permitidos)}",
+        )
+    return itens
+
+
+async def fetch_cubo_ano(
+    session: AsyncSession,
+    spec: CuboSpec,
+    ano: int,
+    dimensoes: str | None,
+    medidas: str | None,
+    agrupamento: str,
+) -> CuboResponse:
+    lista_dimensoes = _parse_lista(dimensoes, list(spec.dimensoes), "dimensoes")
+    lista_medidas = _parse_lista(medidas, spec.medidas, "medidas")
+    agregados = await fetch_execucao_cubo(session, spec, lista_dimensoes, lista_medidas, agrupamento, ano)
+    return CuboResponse(
+        ano=ano,
+        dimensoes=lista_dimensoes,
+        medidas=lista_medidas,
+        agrupamento=agrupamento,
+        linhas=[
+            CuboLinha(agrupamento=list(agregado.conjunto), chaves=agregado.chaves, valores=agregado.valores)
+            for agregado in agregados
+        ],
     )
 
-    serie_result = await session.execute(
+
+def parse_anos(
+    anos: str = Query(..., description="Anos separados por vírgula, ex: 2021,2022,2023,2024"),
+) -> List[int]:
+    try:
+        valores = sorted({int(parte) for parte in anos.split(",") if parte.strip()})
+    except ValueError:
+        raise HTTPException(status_code=422, detail="anos deve conter anos separados por vírgula, ex: 2023,2024")
+    if not valores or len(valores) > MAX_ANOS_SERIE:
+        raise HTTPException(status_code=422, detail=f"Informe entre 1 e {MAX_ANOS_SERIE} anos")
+    return valores
+
+
+async def _receita_por_ano_mes(session: AsyncSession, anos: Sequence[int]) -> List[Tuple[int, int, float]]:
+    agregados = cubo_colunar.agregar(RECEITA_SERIE, ["ano", "mes"], ["valor_arrecadado"], [("ano", "mes")], anos)
+    if agregados is not None:
+        return [
+            (agregado.chaves["ano"], agregado.chaves["mes"], agregado.valores["valor_arrecadado"])
+            for agregado in agregados
+        ]
+    result = await session.execute(
         text(
+            f"""
+            SELECT ano, mes, COALESCE(SUM(valor_arrecadado), 0) AS valor
+            FROM {RECEITA_SOURCE}
+            WHERE ano IN :anos
+            GROUP BY ano, mes
             """
-            SELECT vr.mes,
-                   COALESCE(SUM(vr.valor_arrecadado), 0) AS receita_realizada_mes,
-                   COALESCE(
-                       (
-                           SELECT SUM(vra.valor_arrecadado)
-                           FROM view_mov_rec vra
-                           WHERE vra.ano = :ano_anterior AND vra.mes = vr.mes
-                       ),
-                       0
-                   ) AS receita_mes_ano_anterior
-            FROM view_mov_rec vr
-            WHERE vr.ano = :ano
-            GROUP BY vr.mes
-            ORDER BY vr.mes
-            """
-        ),
-        {"ano": ano, "ano_anterior": ano - 1},
+        ).bindparams(bindparam("anos", expanding=True)),
+        {"anos": list(anos)},
     )
-    serie_mensal = [
-        ReceitaMensal(
-            mes=row.mes,
-            receita_realizada_mes=float(row.receita_realizada_mes or 0),
-            receita_mes_ano_anterior=float(row.receita_mes_ano_anterior or 0),
-        )
-        for row in serie_result.all()
-    ]
+    return [(int(row.ano), int(row.mes), float(row.valor or 0)) for row in result.all()]
 
-    receita_por_origem = await fetch_category_list(
-        session,
-        """
-        SELECT orc.descricao AS categoria, COALESCE(SUM(r.valor_arrecadado), 0) AS valor
-        FROM view_mov_rec r
-        JOIN origem_receita orc ON orc.id = r.origem_id
-        WHERE r.ano = :ano
-        GROUP BY orc.descricao
-        ORDER BY valor DESC
-        """,
-        {"ano": ano},
-    )
 
-    receita_por_natureza = await fetch_category_list(
-        session,
-        """
-        SELECT n.descricao AS categoria, COALESCE(SUM(r.valor_arrecadado), 0) AS valor
-        FROM view_mov_rec r
-        JOIN natureza n ON n.id = r.natureza_id
-        WHERE r.ano = :ano
-        GROUP BY n.descricao
-        ORDER BY valor DESC
-        """,
-        {"ano": ano},
+async def fetch_receita_serie(session: AsyncSession, anos: Sequence[int]) -> ReceitaSerieResponse:
+    # One grouped scan over every requested year, pivoted to month rows in Python.
+    por_mes: Dict[int, Dict[int, float]] = {}
+    total_por_ano = {ano: 0.0 for ano in anos}
+    for ano, mes, valor in await _receita_por_ano_mes(session, anos):
+        por_mes.setdefault(mes, {})[ano] = valor
+        total_por_ano[ano] += valor
+
+    return ReceitaSerieResponse(
+        anos=list(anos),
+        total_por_ano=total_por_ano,
+        serie_mensal=[
+            ReceitaSerieMensal(mes=mes, valores=dict(sorted(valores.items())))
+            for mes, valores in sorted(por_mes.items())
+        ],
     )
 
-    receita_por_fonte = await fetch_category_list(
+
+@router.get("/receita/serie", response_model=ReceitaSerieResponse)
+@cached("receita_serie", versao=RECEITA_VERSAO)
+async def get_receita_serie(
+    anos: List[int] = Depends(parse_anos),
+    session: AsyncSession = Depends(get_session),
+) -> ReceitaSerieResponse:
+    return await fetch_receita_serie(session, anos)
+
+
+@router.get("/receita/resumo", response_model=ReceitaResumoResponse)
+@cached(
+    "receita_resumo",
+    versao=VersaoDados(RECEITA_SOURCE, "receita_loa", locais=(cubo_colunar.versao,)),
+)
+async def get_receita_resumo(
+    ano: int = Query(..., description="Ano de referência, ex: 2024"),
+    session: AsyncSession = Depends(get_session),
+) -> ReceitaResumoResponse:
+    valores = await calcular_kpis(
         session,
-        """
-        SELECT f.descricao AS categoria, COALESCE(SUM(r.valor_arrecadado), 0) AS valor
-        FROM view_mov_rec r
-        JOIN fonte f ON f.id = r.fonte_id
-        WHERE r.ano = :ano
-        GROUP BY f.descricao
-        ORDER BY valor DESC
-        """,
+        ["receita_prevista"],
         {"ano": ano},
+        jobs={
+            "serie": partial(fetch_receita_serie, anos=[ano - 1, ano]),
+            "categorias": partial(
+                fetch_execucao_cubo,
+                spec=RECEITA_CUBO,
+                dimensoes=["origem", "natureza", "fonte"],
+                medidas=["valor_arrecadado"],
+                agrupamento="separado",
+                ano=ano,
+            ),
+        },
     )
 
+    serie: ReceitaSerieResponse = valores["serie"]
+    serie_mensal = [
+        ReceitaMensal(
+            mes=item.mes,
+            receita_realizada_mes=item.valores[ano],
+            receita_mes_ano_anterior=item.valores.get(ano - 1, 0.0),
+        )
+        for item in serie.serie_mensal
+        if ano in item.valores
+    ]
+
     return ReceitaResumoResponse(
         ano=ano,
-        receita_prevista=receita_prevista,
-        receita_realizada=receita_realizada,
+        receita_prevista=valores["receita_prevista"],
+        receita_realizada=serie.total_por_ano[ano],
         serie_mensal=serie_mensal,
-        receita_por_origem=receita_por_origem,
-        receita_por_natureza=receita_por_natureza,
-        receita_por_fonte=receita_por_fonte,
+        receita_por_origem=_categorias(valores["categorias"], "origem", "valor_arrecadado", ReceitaPorCategoria),
+        receita_por_natureza=_categorias(valores["categorias"], "natureza", "valor_arrecadado", ReceitaPorCategoria),
+        receita_por_fonte=_categorias(valores["categorias"], "fonte", "valor_arrecadado", ReceitaPorCategoria),
     )
 
 
-def _build_despesa_categoria_list(rows) -> List[DespesaPorCategoria]:
-    return [
-        DespesaPorCategoria(categoria=row[0], valor=float(row[1] or 0))
-        for row in rows
-    ]
-
-
 @router.get("/despesa/resumo", response_model=DespesaResumoResponse)
+@cached(
+    "despesa_resumo",
+    versao=VersaoDados(DESPESA_SOURCE, PAGAMENTO_SOURCE, "view_loa_desp", locais=(cubo_colunar.versao,)),
+)
 async def get_despesa_resumo(
     ano: int = Query(..., description="Ano de referência, ex: 2024"),
     session: AsyncSession = Depends(get_session),
 ) -> DespesaResumoResponse:
-    dotacao_inicial = await fetch_scalar(
+    # Monthly series, totals and the orgão/função/programa rankings all come from
+    # one pass over the execution view.
+    valores = await calcular_kpis(
         session,
-        """
-        SELECT COALESCE(SUM(dotacao_inicial), 0)
-        FROM view_loa_desp
-        WHERE ano = :ano
-        """,
+        ["despesa_dotacao_inicial", "despesa_paga"],
         {"ano": ano},
+        jobs={
+            "cubo": partial(
+                fetch_execucao_cubo,
+                spec=DESPESA_CUBO,
+                dimensoes=["mes", "orgao", "funcao", "programa"],
+                medidas=["empenhado", "liquidado", "valor_pago", "dotacao_atualizada"],
+                agrupamento="separado",
+                ano=ano,
+            ),
+        },
     )
 
-    dotacao_atualizada = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(dotacao_atualizada), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
+    cubo: List[Agregado] = valores["cubo"]
+    total = next(agregado.valores for agregado in cubo if not agregado.conjunto)
+    serie_mensal = sorted(
+        (
+            DespesaMensal(
+                mes=int(agregado.chaves["mes"]),
+                empenhado=agregado.valores["empenhado"],
+                liquidado=agregado.valores["liquidado"],
+                pago=agregado.valores["valor_pago"],
+            )
+            for agregado in cubo
+            if agregado.conjunto == ("mes",)
+        ),
+        key=lambda item: item.mes,
     )
 
-    empenhado = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(empenhado), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
+    return DespesaResumoResponse(
+        ano=ano,
+        dotacao_inicial=valores["despesa_dotacao_inicial"],
+        dotacao_atualizada=total["dotacao_atualizada"],
+        empenhado=total["empenhado"],
+        liquidado=total["liquidado"],
+        pago=valores["despesa_paga"],
+        serie_mensal=serie_mensal,
+        despesa_por_orgao=_categorias(cubo, "orgao", "empenhado", DespesaPorCategoria),
+        despesa_por_funcao=_categorias(cubo, "funcao", "empenhado", DespesaPorCategoria),
+        despesa_por_programa=_categorias(cubo, "programa", "empenhado", DespesaPorCategoria),
     )
 
-    liquidado = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(liquidado), 0)
-        FROM view_desp_executada
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
 
-    pago = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_pago), 0)
-        FROM view_mov_pagamento
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
+AGRUPAMENTO_QUERY = Query(
+    "rollup",
+    description="rollup: subtotais na ordem das dimensões; cubo: todas as combinações; separado: cada dimensão isolada",
+)
 
-    serie_result = await session.execute(
-        text(
-            """
-            SELECT mes,
-                   COALESCE(SUM(empenhado), 0) AS empenhado,
-                   COALESCE(SUM(liquidado), 0) AS liquidado,
-                   COALESCE(SUM(valor_pago), 0) AS pago
-            FROM view_desp_executada
-            WHERE ano = :ano
-            GROUP BY mes
-            ORDER BY mes
-            """
-        ),
-        {"ano": ano},
-    )
-    serie_mensal = [
-        DespesaMensal(
-            mes=row.mes,
-            empenhado=float(row.empenhado or 0),
-            liquidado=float(row.liquidado or 0),
-            pago=float(row.pago or 0),
-        )
-        for row in serie_result.all()
-    ]
 
-    orgao_result = await session.execute(
-        text(
-            """
-            SELECT o.descricao AS categoria, COALESCE(SUM(vd.empenhado), 0) AS valor
-            FROM view_desp_executada vd
-            JOIN orgao o ON o.id = vd.orgao_id
-            WHERE vd.ano = :ano
-            GROUP BY o.descricao
-            ORDER BY valor DESC
-            """
-        ),
-        {"ano": ano},
-    )
-
-    funcao_result = await session.execute(
-        text(
-            """
-            SELECT f.descricao AS categoria, COALESCE(SUM(vd.empenhado), 0) AS valor
-            FROM view_desp_executada vd
-            JOIN funcao f ON f.id = vd.funcao_id
-            WHERE vd.ano = :ano
-            GROUP BY f.descricao
-            ORDER BY valor DESC
-            """
-        ),
-        {"ano": ano},
-    )
+@router.get("/receita/cubo", response_model=CuboResponse)
+@cached("receita_cubo", versao=RECEITA_VERSAO)
+async def get_receita_cubo(
+    ano: int = Query(..., description="Ano de referência, ex: 2024"),
+    dimensoes: str | None = Query(None, description="Dimensões separadas por vírgula: orgao,origem,natureza,fonte,mes"),
+    medidas: str | None = Query(None, description="Medidas separadas por vírgula: valor_arrecadado"),
+    agrupamento: Literal["rollup", "cubo", "separado"] = AGRUPAMENTO_QUERY,
+    session: AsyncSession = Depends(get_session),
+) -> CuboResponse:
+    return await fetch_cubo_ano(session, RECEITA_CUBO, ano, dimensoes, medidas, agrupamento)
 
-    programa_result = await session.execute(
-        text(
-            """
-            SELECT p.descricao AS categoria, COALESCE(SUM(vd.empenhado), 0) AS valor
-            FROM view_desp_executada vd
-            JOIN programa p ON p.id = vd.programa_id
-            WHERE vd.ano = :ano
-            GROUP BY p.descricao
-            ORDER BY valor DESC
-            """
-        ),
-        {"ano": ano},
-    )
 
-    return DespesaResumoResponse(
-        ano=ano,
-        dotacao_inicial=dotacao_inicial,
-        dotacao_atualizada=dotacao_atualizada,
-        empenhado=empenhado,
-        liquidado=liquidado,
-        pago=pago,
-        serie_mensal=serie_mensal,
-        despesa_por_orgao=_build_despesa_categoria_list(orgao_result.all()),
-        despesa_por_funcao=_build_despesa_categoria_list(funcao_result.all()),
-        despesa_por_programa=_build_despesa_categoria_list(programa_result.all()),
-    )
+@router.get("/despesa/cubo", response_model=CuboResponse)
+@cached("despesa_cubo", versao=DESPESA_VERSAO)
+async def get_despesa_cubo(
+    ano: int = Query(..., description="Ano de referência, ex: 2024"),
+    dimensoes: str | None = Query(
+        None, description="Dimensões separadas por vírgula: orgao,funcao,programa,fonte,natureza,mes"
+    ),
+    medidas: str | None = Query(
+        None, description="Medidas separadas por vírgula: empenhado,liquidado,valor_pago,dotacao_atualizada"
+    ),
+    agrupamento: Literal["rollup", "cubo", "separado"] = AGRUPAMENTO_QUERY,
+    session: AsyncSession = Depends(get_session),
+) -> CuboResponse:
+    return await fetch_cubo_ano(session, DESPESA_CUBO, ano, dimensoes, medidas, agrupamento)
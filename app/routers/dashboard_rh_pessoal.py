@@ -1,12 +1,16 @@
 from datetime import datetime
-from typing import Any, Dict
+from functools import partial
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
 from ..database import get_session
+from ..query_merge import ScalarQuery, count_of, gather_scalars, sum_of
 from ..schemas.rh_pessoal import HeadcountResumo, RHPessoalResponse, SerieMensal
+from ..versioning import VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-rh-pessoal"])
 
@@ -17,121 +21,97 @@ async def fetch_scalar(session: AsyncSession, query: str, params: Dict[str, Any]
     return float(value or 0)
 
 
+async def fetch_rows(session: AsyncSession, query: str, params: Dict[str, Any]) -> List[Any]:
+    result = await session.execute(text(query), params)
+    return result.all()
+
+
+RH_SCALARS = [
+    ScalarQuery("gasto_pessoal_ano", "rh_calculo", sum_of("valor_total"), "ano = :ano"),
+    ScalarQuery("qtde_ferias", "rh_calculo_item", count_of("LOWER(tipo_evento) LIKE '%ferias%'"), "ano = :ano", int),
+    ScalarQuery("qtde_licencas", "rh_calculo_item", count_of("LOWER(tipo_evento) LIKE '%licenca%'"), "ano = :ano", int),
+    ScalarQuery("qtde_rescisoes", "rh_calculo_item", count_of("LOWER(tipo_evento) LIKE '%rescis%'"), "ano = :ano", int),
+]
+
+
 @router.get("/rh/resumo", response_model=RHPessoalResponse)
+@cached(
+    "rh_resumo",
+    versao=VersaoDados("rh_calculo", "rh_calculo_item", "rh_funcionario", "funcionarios", "dclrf"),
+)
 async def get_rh_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year, description="Ano de referência"),
     session: AsyncSession = Depends(get_session),
 ) -> RHPessoalResponse:
-    gasto_pessoal_ano = await fetch_scalar(
+    params = {"ano": ano}
+    valores = await gather_scalars(
         session,
-        """
-        SELECT COALESCE(SUM(valor_total), 0)
-        FROM rh_calculo
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
+        RH_SCALARS,
+        params,
+        jobs={
+            "gasto_mensal": partial(
+                fetch_rows,
+                query="""
+                SELECT mes, COALESCE(SUM(valor_total), 0) AS valor
+                FROM rh_calculo
+                WHERE ano = :ano
+                GROUP BY mes
+                ORDER BY mes
+                """,
+                params=params,
+            ),
+            "rcl": partial(
+                fetch_scalar,
+                query="""
+                -- Se não existir a view dclrf com receita corrente líquida, ajuste a origem
+                SELECT COALESCE(SUM(valor_rcl), 0)
+                FROM dclrf
+                WHERE ano = :ano
+                """,
+                params=params,
+            ),
+            "headcount_tipo": partial(
+                fetch_rows,
+                query="""
+                SELECT COALESCE(rv.descricao, 'Tipo') AS categoria, COUNT(*) AS quantidade
+                FROM rh_funcionario rf
+                LEFT JOIN rh_vinculo rv ON rv.id = rf.vinculo_id
+                WHERE rf.ano = :ano
+                GROUP BY categoria
+                """,
+                params=params,
+            ),
+            "headcount_orgao": partial(
+                fetch_rows,
+                query="""
+                SELECT COALESCE(o.nome, 'Orgão') AS categoria, COUNT(*) AS quantidade
+                FROM funcionarios f
+                LEFT JOIN orgao o ON o.id = f.orgao_id
+                WHERE f.ano = :ano
+                GROUP BY categoria
+                """,
+                params=params,
+            ),
+        },
     )
 
-    gasto_mensal_result = await session.execute(
-        text(
-            """
-            SELECT mes, COALESCE(SUM(valor_total), 0) AS valor
-            FROM rh_calculo
-            WHERE ano = :ano
-            GROUP BY mes
-            ORDER BY mes
-            """
-        ),
-        {"ano": ano},
-    )
+    gasto_pessoal_ano = valores["gasto_pessoal_ano"]
     gasto_pessoal_mensal = [
-        SerieMensal(mes=int(row.mes), valor=float(row.valor or 0)) for row in gasto_mensal_result
+        SerieMensal(mes=int(row.mes), valor=float(row.valor or 0)) for row in valores["gasto_mensal"]
     ]
 
-    rcl_result = await session.execute(
-        text(
-            """
-            -- Se não existir a view dclrf com receita corrente líquida, ajuste a origem
-            SELECT COALESCE(SUM(valor_rcl), 0)
-            FROM dclrf
-            WHERE ano = :ano
-            """
-        ),
-        {"ano": ano},
-    )
-    rcl = float(rcl_result.scalar() or 0)
+    rcl = valores["rcl"]
     percentual_rcl = (gasto_pessoal_ano / rcl * 100) if rcl else None
 
-    headcount_tipo_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(rv.descricao, 'Tipo') AS categoria, COUNT(*) AS quantidade
-            FROM rh_funcionario rf
-            LEFT JOIN rh_vinculo rv ON rv.id = rf.vinculo_id
-            WHERE rf.ano = :ano
-            GROUP BY categoria
-            """
-        ),
-        {"ano": ano},
-    )
     headcount_por_tipo_vinculo = [
         HeadcountResumo(categoria=row.categoria, quantidade=int(row.quantidade or 0))
-        for row in headcount_tipo_result
+        for row in valores["headcount_tipo"]
     ]
-
-    headcount_orgao_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(o.nome, 'Orgão') AS categoria, COUNT(*) AS quantidade
-            FROM funcionarios f
-            LEFT JOIN orgao o ON o.id = f.orgao_id
-            WHERE f.ano = :ano
-            GROUP BY categoria
-            """
-        ),
-        {"ano": ano},
-    )
     headcount_por_orgao = [
         HeadcountResumo(categoria=row.categoria, quantidade=int(row.quantidade or 0))
-        for row in headcount_orgao_result
+        for row in valores["headcount_orgao"]
     ]
 
-    ferias_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM rh_calculo_item
-            WHERE ano = :ano AND LOWER(tipo_evento) LIKE '%ferias%'
-            """
-        ),
-        {"ano": ano},
-    )
-    qtde_ferias = int(ferias_result.scalar() or 0)
-
-    licencas_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM rh_calculo_item
-            WHERE ano = :ano AND LOWER(tipo_evento) LIKE '%licenca%'
-            """
-        ),
-        {"ano": ano},
-    )
-    qtde_licencas = int(licencas_result.scalar() or 0)
-
-    rescisao_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM rh_calculo_item
-            WHERE ano = :ano AND LOWER(tipo_evento) LIKE '%rescis%'
-            """
-        ),
-        {"ano": ano},
-    )
-    qtde_rescisoes = int(rescisao_result.scalar() or 0)
-
     observacao = (
         "Confirme colunas: valor_total em rh_calculo, tipo_evento em rh_calculo_item, ano em funcionarios/rh_funcionario."
     )
@@ -143,8 +123,8 @@ async def get_rh_resumo(
         percentual_despesa_pessoal_sobre_rcl=percentual_rcl,
         headcount_por_tipo_vinculo=headcount_por_tipo_vinculo,
         headcount_por_orgao=headcount_por_orgao,
-        qtde_ferias_no_periodo=qtde_ferias,
-        qtde_licencas=qtde_licencas,
-        qtde_rescisoes=qtde_rescisoes,
+        qtde_ferias_no_periodo=valores["qtde_ferias"],
+        qtde_licencas=valores["qtde_licencas"],
+        qtde_rescisoes=valores["qtde_rescisoes"],
         observacao=observacao,
     )
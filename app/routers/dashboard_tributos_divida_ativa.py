@@ -1,11 +1,15 @@
-from datetime import datetime
-from typing import Any, Dict, List
+from datetime import date, datetime
+from functools import partial
+from typing import Any, Dict, List, Tuple
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..cache import cached
+from ..config import settings
 from ..database import get_session
+from ..kpis import calcular_kpis
 from ..schemas.tributos_divida_ativa import (
     AtividadeResumo,
     BairroArrecadacao,
@@ -15,41 +19,21 @@ from ..schemas.tributos_divida_ativa import (
     IPTUResponse,
     ISSResponse,
 )
+from ..services.iss_agregado import RAMO_PRINCIPAL
+from ..versioning import Sonda, VersaoDados
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard-tributos-divida-ativa"])
 
 
-async def fetch_scalar(session: AsyncSession, query: str, params: Dict[str, Any]) -> float:
-    result = await session.execute(text(query), params)
-    value = result.scalar()
-    return float(value or 0)
-
-
 @router.get("/tributos/iptu", response_model=IPTUResponse)
+@cached("iptu", versao=VersaoDados("calculo_iptu_ano", "view_bci_iptu", "view_iptu"))
 async def get_iptu_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year, description="Ano de referência"),
     session: AsyncSession = Depends(get_session),
 ) -> IPTUResponse:
-    iptu_lancado_ano = await fetch_scalar(
-        session,
-        """
-        -- Ajuste o nome da coluna com o valor lançado, por exemplo valor_total
-        SELECT COALESCE(SUM(valor_lancado), 0)
-        FROM calculo_iptu_ano
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
-
-    iptu_arrecadado_ano = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_pago), 0)
-        FROM view_bci_iptu
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
+    kpis = await calcular_kpis(session, ["iptu_lancado", "iptu_arrecadado"], {"ano": ano})
+    iptu_lancado_ano = kpis["iptu_lancado"]
+    iptu_arrecadado_ano = kpis["iptu_arrecadado"]
 
     result = await session.execute(
         text(
@@ -86,76 +70,83 @@ async def get_iptu_resumo(
     )
 
 
+if settings.iss_agregado_enabled:
+    ISS_VERSAO = VersaoDados("iss_mensal", Sonda("iss_agregado_controle", "MAX(atualizado_em)"))
+    ISS_NOTAS = """
+        SELECT economico_id, ramo_id, valor_total AS valor
+        FROM iss_nota_mensal
+        WHERE ano = :ano
+    """
+else:
+    ISS_VERSAO = VersaoDados("nota_iss", "iss_mensal", "economico_atividades")
+    # Half-open range on data_emissao so an index on it can be used; each note counts
+    # once, in the same activity the aggregate assigns it to.
+    ISS_NOTAS = f"""
+        SELECT COALESCE(ni.economico_id, 0) AS economico_id, COALESCE(ea.ramo_id, 0) AS ramo_id, ni.valor_total AS valor
+        FROM nota_iss ni
+        LEFT JOIN ({RAMO_PRINCIPAL}) ea ON ea.economico_id = ni.economico_id
+        WHERE ni.data_emissao >= :inicio AND ni.data_emissao < :fim
+    """
+
+# Top 10 ids first, names joined only for them.
+ISS_POR_ATIVIDADE = f"""
+    SELECT COALESCE(r.descricao, 'Não informado') AS nome, t.valor
+    FROM (
+        SELECT ramo_id, COALESCE(SUM(valor), 0) AS valor
+        FROM ({ISS_NOTAS}) n
+        GROUP BY ramo_id
+        ORDER BY valor DESC, ramo_id
+        LIMIT 10
+    ) t
+    LEFT JOIN ramopertinente r ON r.id = t.ramo_id
+    ORDER BY t.valor DESC, t.ramo_id
+"""
+ISS_POR_CONTRIBUINTE = f"""
+    SELECT COALESCE(e.nome_fantasia, 'Contribuinte') AS nome, t.valor
+    FROM (
+        SELECT economico_id, COALESCE(SUM(valor), 0) AS valor
+        FROM ({ISS_NOTAS}) n
+        GROUP BY economico_id
+        ORDER BY valor DESC, economico_id
+        LIMIT 10
+    ) t
+    LEFT JOIN economico e ON e.id = t.economico_id
+    ORDER BY t.valor DESC, t.economico_id
+"""
+
+
+async def fetch_ranking(session: AsyncSession, query: str, params: Dict[str, Any]) -> List[Tuple[str, float]]:
+    result = await session.execute(text(query), params)
+    return [(row.nome, float(row.valor or 0)) for row in result.all()]
+
+
 @router.get("/tributos/iss", response_model=ISSResponse)
+@cached("iss", versao=ISS_VERSAO)
 async def get_iss_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year, description="Ano de referência"),
     session: AsyncSession = Depends(get_session),
 ) -> ISSResponse:
-    iss_declarado = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_declarado), 0)
-        FROM iss_mensal
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
-
-    iss_pago = await fetch_scalar(
+    params = {"ano": ano, "inicio": date(ano, 1, 1), "fim": date(ano + 1, 1, 1)}
+    valores = await calcular_kpis(
         session,
-        """
-        SELECT COALESCE(SUM(valor_pago), 0)
-        FROM iss_mensal
-        WHERE ano = :ano
-        """,
-        {"ano": ano},
-    )
-
-    atividade_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(r.descricao, 'Não informado') AS atividade, COALESCE(SUM(ni.valor_total), 0) AS valor
-            FROM nota_iss ni
-            LEFT JOIN economico e ON e.id = ni.economico_id
-            LEFT JOIN economico_atividades ea ON ea.economico_id = e.id
-            LEFT JOIN ramopertinente r ON r.id = ea.ramo_id
-            WHERE YEAR(ni.data_emissao) = :ano
-            GROUP BY atividade
-            ORDER BY valor DESC
-            LIMIT 10
-            """
-        ),
-        {"ano": ano},
-    )
-    notas_por_atividade = [
-        AtividadeResumo(atividade=row.atividade, valor=float(row.valor or 0)) for row in atividade_result
-    ]
-
-    contribuintes_result = await session.execute(
-        text(
-            """
-            SELECT COALESCE(e.nome_fantasia, 'Contribuinte') AS contribuinte, COALESCE(SUM(ni.valor_total), 0) AS valor
-            FROM nota_iss ni
-            LEFT JOIN economico e ON e.id = ni.economico_id
-            WHERE YEAR(ni.data_emissao) = :ano
-            GROUP BY contribuinte
-            ORDER BY valor DESC
-            LIMIT 10
-            """
-        ),
-        {"ano": ano},
+        ["iss_declarado", "iss_pago"],
+        params,
+        jobs={
+            "atividades": partial(fetch_ranking, query=ISS_POR_ATIVIDADE, params=params),
+            "contribuintes": partial(fetch_ranking, query=ISS_POR_CONTRIBUINTE, params=params),
+        },
     )
+    notas_por_atividade = [AtividadeResumo(atividade=nome, valor=valor) for nome, valor in valores["atividades"]]
     top_contribuintes = [
-        ContribuinteResumo(contribuinte=row.contribuinte, valor=float(row.valor or 0))
-        for row in contribuintes_result
+        ContribuinteResumo(contribuinte=nome, valor=valor) for nome, valor in valores["contribuintes"]
     ]
 
     observacao = "Ajuste nomes de colunas de notas ISS conforme o schema (valor_total, data_emissao)."
 
     return ISSResponse(
         ano=ano,
-        iss_declarado_ano=iss_declarado,
-        iss_pago_ano=iss_pago,
+        iss_declarado_ano=valores["iss_declarado"],
+        iss_pago_ano=valores["iss_pago"],
         notas_por_atividade=notas_por_atividade,
         top_contribuintes_iss=top_contribuintes,
         observacao=observacao,
@@ -163,18 +154,16 @@ async def get_iss_resumo(
 
 
 @router.get("/divida-ativa/resumo", response_model=DividaAtivaResponse)
+@cached(
+    "divida_ativa_resumo",
+    versao=VersaoDados("divida_ativa", "divida_ativa_itens", "duam_baixa", "acordo_parcelamento"),
+)
 async def get_divida_ativa_resumo(
     ano: int = Query(default_factory=lambda: datetime.utcnow().year, description="Ano de referência"),
     session: AsyncSession = Depends(get_session),
 ) -> DividaAtivaResponse:
-    estoque_total = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(valor_atualizado), 0)
-        FROM divida_ativa
-        WHERE ano_referencia = :ano
-        """,
-        {"ano": ano},
+    kpis = await calcular_kpis(
+        session, ["estoque_divida_ativa", "recuperacao_divida_ativa", "acordos_parcelamento"], {"ano": ano}
     )
 
     estoque_result = await session.execute(
@@ -195,37 +184,15 @@ async def get_divida_ativa_resumo(
         for row in estoque_result
     ]
 
-    valor_recuperado = await fetch_scalar(
-        session,
-        """
-        SELECT COALESCE(SUM(db.valor_pago), 0)
-        FROM duam_baixa db
-        WHERE YEAR(db.data_baixa) = :ano
-        """,
-        {"ano": ano},
-    )
-
-    acordos_result = await session.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM acordo_parcelamento ap
-            WHERE YEAR(ap.data_acordo) = :ano
-            """
-        ),
-        {"ano": ano},
-    )
-    quantidade_acordos = int(acordos_result.scalar() or 0)
-
     observacao = (
         "Confirme colunas: tributo em divida_ativa, data_acordo em acordo_parcelamento, valor_pago em duam_baixa."
     )
 
     return DividaAtivaResponse(
         ano=ano,
-        estoque_divida_ativa_total=estoque_total,
+        estoque_divida_ativa_total=kpis["estoque_divida_ativa"],
         estoque_por_tributo=estoque_por_tributo,
-        valor_recuperado_ano=valor_recuperado,
-        quantidade_acordos_parcelamento_ano=quantidade_acordos,
+        valor_recuperado_ano=kpis["recuperacao_divida_ativa"],
+        quantidade_acordos_parcelamento_ano=kpis["acordos_parcelamento"],
         observacao=observacao,
     )
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import cached
+from ..config import settings
+from ..database import get_session
+from ..pagination import Cursor, Limite
+from ..schemas.vencimentos import VencimentoItem, VencimentosResponse
+from ..services.vencimentos import TIPOS, indices_vencimentos, paginar_geral
+from ..versioning import VersaoDados
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard-vencimentos"])
+
+Tipo = Literal["contrato", "licenciamento", "convenio"]
+
+
+@router.get("/vencimentos", response_model=VencimentosResponse)
+@cached(
+    "vencimentos",
+    versao=VersaoDados(
+        "licit_contrato", "ctrl_licenciamento", "cont_convenio", locais=(indices_vencimentos.versao,)
+    ),
+)
+async def get_vencimentos(
+    dias: int = Query(90, ge=0, description="Vencimentos de hoje até hoje + dias"),
+    tipos: List[Tipo] = Query(list(TIPOS), description="Fontes incluídas (repita o parâmetro para várias)"),
+    limit: Limite = settings.pagination_default_limit,
+    cursor: Cursor = None,
+    session: AsyncSession = Depends(get_session),
+) -> VencimentosResponse:
+    hoje = datetime.utcnow().date()
+    tipos = sorted(set(tipos))
+    indices = await indices_vencimentos.indices(session, tipos)
+    itens, totais, pagina = paginar_geral(indices, hoje, hoje + timedelta(days=dias), limit, cursor)
+    return VencimentosResponse(
+        dias=dias,
+        tipos=tipos,
+        total_por_tipo=totais,
+        vencimentos=[VencimentoItem(**vars(item)) for item in itens],
+        pagina=pagina,
+    )
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_session
+from ..exports import FORMATOS, VISOES, VisaoExportavel, exportar
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+FORMATO_QUERY = Query("csv", description="csv, ndjson ou parquet")
+
+
+def _visao(nome: str) -> VisaoExportavel:
+    definicao = VISOES.get(nome)
+    if definicao is None:
+        raise HTTPException(status_code=404, detail=f"View não exportável: {nome}; use {', '.join(VISOES)}")
+    return definicao
+
+
+def _resposta(corpo, formato: str, nome: str, headers: dict | None = None) -> StreamingResponse:
+    return StreamingResponse(
+        corpo,
+        media_type=FORMATOS[formato].media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{nome}.{FORMATOS[formato].extensao}"',
+            **(headers or {}),
+        },
+    )
+
+
+@router.get("/{visao}")
+async def export_visao(
+    visao: str = Path(..., description="View de sql/, ex: vw_execucao_despesa_mensal"),
+    formato: Literal["csv", "ndjson", "parquet"] = FORMATO_QUERY,
+    ano: int | None = Query(None, description="Ano de referência, ex: 2024"),
+    mes: int | None = Query(None, ge=1, le=12, description="Mês de referência (exige ano)"),
+) -> StreamingResponse:
+    definicao = _visao(visao)
+    if mes is not None and ano is None:
+        raise HTTPException(status_code=422, detail="mes exige ano")
+
+    where, params = definicao.filtro(ano, mes)
+    nome = "_".join(str(parte) for parte in (visao, ano, f"{mes:02d}" if mes else None) if parte is not None)
+    return _resposta(exportar(definicao, formato, where, params), formato, nome)
+
+
+@router.get("/{visao}/delta")
+async def export_visao_delta(
+    visao: str = Path(..., description="View de fatos de sql/, ex: vw_execucao_receita_mensal"),
+    desde: datetime = Query(..., description="Marca d'água devolvida pela chamada anterior (X-Watermark)"),
+    formato: Literal["csv", "ndjson", "parquet"] = FORMATO_QUERY,
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    definicao = _visao(visao)
+    # Watermarks are wall-clock values of the database session, without time zone.
+    desde = desde.replace(tzinfo=None)
+    if definicao.coluna_atualizacao is None:
+        raise HTTPException(status_code=404, detail=f"{visao} não tem coluna de atualização para consultas delta")
+
+    # The upper bound comes from the database clock (the one stamping atualizado_em),
+    # held back by a lag so rows from transactions still open are picked up next time.
+    agora = (await session.execute(text("SELECT CURRENT_TIMESTAMP"))).scalar()
+    agora = agora if isinstance(agora, datetime) else datetime.fromisoformat(str(agora))
+    ate = agora - timedelta(seconds=settings.export_delta_lag_seconds)
+    if ate <= desde:
+        ate = desde
+
+    where, params = definicao.filtro_delta(desde, ate)
+    return _resposta(
+        exportar(definicao, formato, where, params),
+        formato,
+        f"{visao}_delta",
+        headers={"X-Watermark": ate.isoformat(), "X-Watermark-Desde": desde.isoformat()},
+    )
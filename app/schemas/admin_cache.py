@@ -0,0 +1,24 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class CacheEndpointStats(BaseModel):
+    hits: int
+    misses: int
+    ttl: int
+    entries: int
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    endpoints: Dict[str, CacheEndpointStats]
+
+
+class CacheInvalidacaoResponse(BaseModel):
+    endpoint: str | None = None
+    ano: int | None = None
+    removidos: int
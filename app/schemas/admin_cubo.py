@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class CuboTabelaMemoria(BaseModel):
+    linhas: int
+    particoes: int
+    bytes: int
+    bytes_por_coluna: Dict[str, int]
+    cardinalidade: Dict[str, int]
+
+
+class CuboMemoriaResponse(BaseModel):
+    enabled: bool
+    pronto: bool
+    anos: List[int]
+    atualizado_em: datetime | None = None
+    ultima_duracao_ms: float | None = None
+    bytes_total: int
+    tabelas: Dict[str, CuboTabelaMemoria]
+    rotulos: Dict[str, int]
+
+
+class CuboAtualizacaoTabela(BaseModel):
+    tabela: str
+    meses_verificados: int
+    meses_carregados: List[str]
+    meses_removidos: List[str]
+
+
+class CuboAtualizacaoResponse(BaseModel):
+    tabelas: List[CuboAtualizacaoTabela]
+    memoria: CuboMemoriaResponse
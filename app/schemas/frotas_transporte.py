@@ -1,7 +1,10 @@
+from datetime import date
 from typing import List
 
 from pydantic import BaseModel
 
+from .paginacao import Pagina
+
 
 class VeiculoConsumo(BaseModel):
     veiculo: str
@@ -21,6 +24,56 @@ class FrotasResponse(BaseModel):
     custo_por_km_por_veiculo: List[VeiculoConsumo]
     viagens_por_veiculo: List[VeiculoConsumo]
     veiculos_com_licenciamento_vencido_ou_a_vencer: List[LicenciamentoStatus]
+    veiculos_com_licenciamento_pagina: Pagina
+    observacao: str | None = None
+
+
+class LicenciamentosResponse(BaseModel):
+    veiculos_com_licenciamento_vencido_ou_a_vencer: List[LicenciamentoStatus]
+    pagina: Pagina
+
+
+class FrotaMes(BaseModel):
+    mes: str
+    litros: float
+    valor: float
+    km: float
+    # Rolling over the `janela` months ending in this one.
+    km_por_litro: float | None = None
+    custo_por_km: float | None = None
+
+
+class VeiculoAnalitico(BaseModel):
+    veiculo: str
+    abastecimentos: int
+    litros: float
+    valor: float
+    km: float
+    km_por_litro: float | None = None
+    custo_por_km: float | None = None
+    meses: List[FrotaMes]
+
+
+class AbastecimentoAnomalo(BaseModel):
+    veiculo: str
+    data: date
+    litros: float
+    valor: float
+    km: float
+    km_por_litro: float | None = None
+    z_km_por_litro: float | None = None
+    custo_por_km: float | None = None
+    z_custo_por_km: float | None = None
+
+
+class FrotasAnaliticoResponse(BaseModel):
+    mes: int
+    ano: int
+    meses: int
+    janela: int
+    limiar_z: float
+    veiculos: List[VeiculoAnalitico]
+    abastecimentos_anomalos: List[AbastecimentoAnomalo]
     observacao: str | None = None
 
 
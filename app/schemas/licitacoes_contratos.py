@@ -3,6 +3,8 @@ from typing import List
 
 from pydantic import BaseModel
 
+from .paginacao import Pagina
+
 
 class LicitacaoStatusResumo(BaseModel):
     status: str
@@ -35,3 +37,4 @@ class ContratoProximoVencimento(BaseModel):
 class ContratosProximosVencimentosResponse(BaseModel):
     dias: int
     contratos: List[ContratoProximoVencimento]
+    pagina: Pagina
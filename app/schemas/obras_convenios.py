@@ -3,6 +3,8 @@ from typing import List
 
 from pydantic import BaseModel
 
+from .paginacao import Pagina
+
 
 class ObrasPorSituacao(BaseModel):
     situacao: str
@@ -21,6 +23,12 @@ class ObrasResumoResponse(BaseModel):
     qtde_obras_por_situacao: List[ObrasPorSituacao]
     execucao_fisica_media: float
     obras_atrasadas: List[ObraAtrasada]
+    obras_atrasadas_pagina: Pagina
+
+
+class ObrasAtrasadasResponse(BaseModel):
+    obras_atrasadas: List[ObraAtrasada]
+    pagina: Pagina
 
 
 class ConvenioPorOrgao(BaseModel):
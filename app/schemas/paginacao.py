@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class Pagina(BaseModel):
+    limite: int
+    # Counted on the first page only (no cursor); later pages skip the count query.
+    total: int | None = None
+    proximo_cursor: str | None = None
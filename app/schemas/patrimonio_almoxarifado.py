@@ -1,7 +1,10 @@
+from datetime import date
 from typing import List
 
 from pydantic import BaseModel
 
+from .paginacao import Pagina
+
 
 class ResumoValor(BaseModel):
     categoria: str
@@ -16,6 +19,28 @@ class PatrimonioResponse(BaseModel):
     observacao: str | None = None
 
 
+class ValuationGrupo(BaseModel):
+    categoria: str
+    quantidade: int
+    valor_aquisicao: float
+    depreciacao_acumulada: float
+    valor_contabil: float
+
+
+class PatrimonioValuationResponse(BaseModel):
+    data: date
+    # Valuation is monthly: every date of a month is valued at its last day.
+    referencia: date
+    quantidade_bens: int
+    valor_aquisicao: float
+    depreciacao_acumulada: float
+    depreciacao_no_mes: float
+    valor_contabil: float
+    por_orgao: List[ValuationGrupo]
+    por_natureza: List[ValuationGrupo]
+    observacao: str | None = None
+
+
 class ConsumoResumo(BaseModel):
     item: str
     valor: float
@@ -31,5 +56,21 @@ class AlmoxarifadoResponse(BaseModel):
     ano: int
     consumo_por_orgao_no_mes: List[ConsumoResumo]
     consumo_por_produto: List[ConsumoResumo]
+    consumo_por_produto_pagina: Pagina
     estoque_atual_por_produto: List[EstoqueProduto]
+    estoque_atual_por_produto_pagina: Pagina
     observacao: str | None = None
+
+
+class ConsumoProdutoResponse(BaseModel):
+    mes: int
+    ano: int
+    consumo_por_produto: List[ConsumoResumo]
+    pagina: Pagina
+
+
+class EstoqueResponse(BaseModel):
+    # Absent for the current stock; otherwise the balance at the end of this day.
+    data: date | None = None
+    estoque_atual_por_produto: List[EstoqueProduto]
+    pagina: Pagina
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List
 
 from pydantic import BaseModel
 
@@ -24,6 +24,18 @@ class ReceitaResumoResponse(BaseModel):
     receita_por_fonte: List[ReceitaPorCategoria]
 
 
+class ReceitaSerieMensal(BaseModel):
+    mes: int
+    # Only years with arrecadação in the month are present.
+    valores: Dict[int, float]
+
+
+class ReceitaSerieResponse(BaseModel):
+    anos: List[int]
+    total_por_ano: Dict[int, float]
+    serie_mensal: List[ReceitaSerieMensal]
+
+
 class DespesaMensal(BaseModel):
     mes: int
     empenhado: float
@@ -47,3 +59,18 @@ class DespesaResumoResponse(BaseModel):
     despesa_por_orgao: List[DespesaPorCategoria]
     despesa_por_funcao: List[DespesaPorCategoria]
     despesa_por_programa: List[DespesaPorCategoria]
+
+
+class CuboLinha(BaseModel):
+    # Dimensions of the grouping set this row belongs to; an empty list is the grand total.
+    agrupamento: List[str]
+    chaves: Dict[str, Any]
+    valores: Dict[str, float]
+
+
+class CuboResponse(BaseModel):
+    ano: int
+    dimensoes: List[str]
+    medidas: List[str]
+    agrupamento: str
+    linhas: List[CuboLinha]
@@ -0,0 +1,25 @@
+from datetime import date
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from .paginacao import Pagina
+
+
+class VencimentoItem(BaseModel):
+    tipo: str
+    id: int
+    data: date
+    descricao: str
+    detalhe: str | None = None
+    valor: float | None = None
+    situacao: str | None = None
+
+
+class VencimentosResponse(BaseModel):
+    dias: int
+    tipos: List[str]
+    # Per type over the whole window; first page only, like pagina.total.
+    total_por_tipo: Dict[str, int] | None = None
+    vencimentos: List[VencimentoItem]
+    pagina: Pagina
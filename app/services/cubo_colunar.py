@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import response_cache
+from ..config import settings
+from ..cube import Agregado, CuboSpec, Dimensao
+from ..database import SessionLocal
+from .resumo_mensal import RESUMOS, Mes, RefreshResult, ResumoSpec, assinaturas_por_mes, execucao_source
+
+logger = logging.getLogger(__name__)
+
+# Marks a NULL dimension id; sorts before every real id so it is easy to drop after np.unique.
+NULO = np.iinfo(np.int64).min
+
+
+def _codificar(valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    distintos, codigos = np.unique(valores, return_inverse=True)
+    if distintos.size and distintos[0] == NULO:
+        distintos, codigos = distintos[1:], codigos - 1
+    tipo = np.int16 if distintos.size < np.iinfo(np.int16).max else np.int32
+    return distintos, codigos.astype(tipo)
+
+
+def _chave_mes(ano: np.ndarray, mes: np.ndarray) -> np.ndarray:
+    return ano.astype(np.int32) * 100 + mes.astype(np.int32)
+
+
+class Colunas:
+    # Immutable columnar snapshot of one execution source, sorted by (ano, mes).
+    # Dimensions are stored as small integer codes into an array of distinct ids;
+    # measures are float64. Readers only ever see a fully built snapshot.
+
+    def __init__(self, ids: Mapping[str, np.ndarray], medidas: Mapping[str, np.ndarray]) -> None:
+        ordem = np.lexsort((ids["mes"], ids["ano"]))
+        self.ano = ids["ano"][ordem].astype(np.int16)
+        self.valores: Dict[str, np.ndarray] = {}
+        self.codigos: Dict[str, np.ndarray] = {}
+        for coluna, valores in ids.items():
+            self.valores[coluna], self.codigos[coluna] = _codificar(valores[ordem])
+        self.medidas = {medida: valores[ordem].astype(np.float64) for medida, valores in medidas.items()}
+        self._mapas: Dict[Tuple[str, str, str, int], Tuple[np.ndarray, List[Any]]] = {}
+
+    @property
+    def linhas(self) -> int:
+        return int(self.ano.size)
+
+    def ids(self, coluna: str) -> np.ndarray:
+        # Trailing NULO so code -1 decodes back to a NULL id.
+        return np.append(self.valores[coluna], NULO)[self.codigos[coluna]]
+
+    def meses(self) -> Dict[Mes, int]:
+        chaves, contagens = np.unique(_chave_mes(self.ano, self.ids("mes")), return_counts=True)
+        return {(int(chave) // 100, int(chave) % 100): int(contagem) for chave, contagem in zip(chaves, contagens)}
+
+    def recorte(self, anos: Sequence[int]) -> slice | np.ndarray:
+        anos = sorted(set(anos))
+        if anos == list(range(anos[0], anos[-1] + 1)):
+            # Rows are sorted by year, so a contiguous range of years is a plain slice.
+            return slice(
+                int(np.searchsorted(self.ano, anos[0], side="left")),
+                int(np.searchsorted(self.ano, anos[-1], side="right")),
+            )
+        return np.isin(self.ano, anos)
+
+    def rotulados(
+        self, dimensao: Dimensao, rotulos: Mapping[Tuple[str, str], Dict[int, str]], linhas: Any
+    ) -> Optional[Tuple[np.ndarray, List[Any]]]:
+        codigos = self.codigos.get(dimensao.coluna)
+        if codigos is None:
+            return None
+        if dimensao.tabela is None:
+            return codigos[linhas], self.valores[dimensao.coluna].tolist()
+
+        por_id = rotulos.get((dimensao.tabela, dimensao.rotulo))
+        if por_id is None:
+            return None
+        chave = (dimensao.coluna, dimensao.tabela, dimensao.rotulo, id(por_id))
+        if chave not in self._mapas:
+            # Ids sharing a label collapse into one group, like GROUP BY on the label column.
+            nomes_por_id = [por_id.get(int(valor)) for valor in self.valores[dimensao.coluna]]
+            nomes = sorted({nome_id for nome_id in nomes_por_id if nome_id is not None})
+            indice = {nome_rotulo: posicao for posicao, nome_rotulo in enumerate(nomes)}
+            mapa = np.array([indice.get(nome_id, -1) for nome_id in nomes_por_id] + [-1], dtype=np.int32)
+            self._mapas[chave] = (mapa, nomes)
+        mapa, nomes = self._mapas[chave]
+        return mapa[codigos[linhas]], nomes
+
+    def bytes_por_coluna(self) -> Dict[str, int]:
+        tamanhos = {"ano": int(self.ano.nbytes)}
+        for coluna in self.codigos:
+            tamanhos[coluna] = tamanhos.get(coluna, 0) + int(self.codigos[coluna].nbytes + self.valores[coluna].nbytes)
+        for medida, valores in self.medidas.items():
+            tamanhos[medida] = int(valores.nbytes)
+        return tamanhos
+
+
+@dataclass
+class _Tabela:
+    spec: ResumoSpec
+    colunas: Colunas
+    assinaturas: Dict[Mes, str] = field(default_factory=dict)
+
+
+class CuboColunar:
+    def __init__(self) -> None:
+        self._tabelas: Dict[str, _Tabela] = {}
+        self._rotulos: Dict[Tuple[str, str], Dict[int, str]] = {}
+        self._lookups: Set[Tuple[str, str]] = set()
+        self._anos: Set[int] = set()
+        self._lock = asyncio.Lock()
+        self.atualizado_em: datetime | None = None
+        self.ultima_duracao: float | None = None
+        self._versao = ""
+
+    @property
+    def pronto(self) -> bool:
+        return settings.cubo_memoria_enabled and self.atualizado_em is not None
+
+    def registrar(self, spec: CuboSpec) -> None:
+        # Routers register their cube specs so the label lookups they need are loaded too.
+        for dimensao in spec.dimensoes.values():
+            if dimensao.tabela is not None:
+                self._lookups.add((dimensao.tabela, dimensao.rotulo))
+
+    def versao(self) -> str:
+        return self._versao if self.pronto else ""
+
+    def cobre(self, anos: Sequence[int]) -> bool:
+        return self.pronto and bool(anos) and set(anos) <= self._anos
+
+    def agregar(
+        self,
+        spec: CuboSpec,
+        dimensoes: Sequence[str],
+        medidas: Sequence[str],
+        conjuntos: Sequence[Tuple[str, ...]],
+        anos: Sequence[int],
+    ) -> Optional[List[Agregado]]:
+        # Same result as cube.agregar over the SQL rows, or None when the snapshot
+        # cannot answer (not loaded, year outside the window, unknown column).
+        tabela = self._tabelas.get(spec.origem)
+        if tabela is None or not self.cobre(anos):
+            return None
+        colunas = tabela.colunas
+        if any(medida not in colunas.medidas for medida in medidas):
+            return None
+
+        linhas = colunas.recorte(anos)
+        rotulados = {}
+        for nome in dimensoes:
+            rotulado = colunas.rotulados(spec.dimensoes[nome], self._rotulos, linhas)
+            if rotulado is None:
+                return None
+            rotulados[nome] = rotulado
+        valores = [colunas.medidas[medida][linhas] for medida in medidas]
+
+        agregados: List[Agregado] = []
+        for conjunto in conjuntos:
+            if not conjunto:
+                agregados.append(
+                    Agregado(conjunto=(), chaves={}, valores={m: float(v.sum()) for m, v in zip(medidas, valores)})
+                )
+                continue
+            codigos = [rotulados[nome][0] for nome in conjunto]
+            validos = np.logical_and.reduce([codigo >= 0 for codigo in codigos])
+            forma = tuple(len(rotulados[nome][1]) for nome in conjunto)
+            chave = np.ravel_multi_index([codigo[validos] for codigo in codigos], forma)
+            grupos, inversa = np.unique(chave, return_inverse=True)
+            somas = [np.bincount(inversa, weights=v[validos], minlength=grupos.size) for v in valores]
+            posicoes = np.unravel_index(grupos, forma)
+            ordem = np.argsort(-somas[0], kind="stable") if somas else np.arange(grupos.size)
+            for indice in ordem:
+                agregados.append(
+                    Agregado(
+                        conjunto=conjunto,
+                        chaves={nome: rotulados[nome][1][posicoes[i][indice]] for i, nome in enumerate(conjunto)},
+                        valores={medida: float(soma[indice]) for medida, soma in zip(medidas, somas)},
+                    )
+                )
+        return agregados
+
+    def totais(self, origem: str, medidas: Sequence[str], anos: Sequence[int]) -> Optional[Dict[str, float]]:
+        agregados = self.agregar(CuboSpec(origem=origem, dimensoes={}, medidas=tuple(medidas)), [], medidas, [()], anos)
+        return None if agregados is None else agregados[0].valores
+
+    async def _carregar_meses(self, session: AsyncSession, spec: ResumoSpec, ano: int, meses: Sequence[int]):
+        dimensoes = ", ".join(spec.dimensoes)
+        somas = ", ".join(f"COALESCE(SUM({medida}), 0)" for medida in spec.medidas)
+        result = await session.execute(
+            text(
+                f"""
+                SELECT mes, {dimensoes}, {somas}
+                FROM {spec.origem}
+                WHERE ano = :ano AND mes IN :meses
+                GROUP BY mes, {dimensoes}
+                """
+            ).bindparams(bindparam("meses", expanding=True)),
+            {"ano": ano, "meses": list(meses)},
+        )
+        linhas = result.all()
+        quantidade = len(linhas)
+        ids = {"ano": np.full(quantidade, ano, dtype=np.int64)}
+        for posicao, coluna in enumerate(("mes",) + spec.dimensoes):
+            ids[coluna] = np.fromiter(
+                (NULO if linha[posicao] is None else int(linha[posicao]) for linha in linhas),
+                dtype=np.int64,
+                count=quantidade,
+            )
+        inicio = 1 + len(spec.dimensoes)
+        medidas = {
+            medida: np.fromiter((float(linha[inicio + i] or 0) for linha in linhas), dtype=np.float64, count=quantidade)
+            for i, medida in enumerate(spec.medidas)
+        }
+        return ids, medidas
+
+    async def _atualizar_tabela(
+        self, session: AsyncSession, spec: ResumoSpec, anos: Sequence[int], forcar: bool
+    ) -> RefreshResult:
+        origem = await assinaturas_por_mes(session, spec, anos)
+        atual = self._tabelas.get(spec.origem)
+        salvas = atual.assinaturas if atual and not forcar else {}
+        presentes = atual.colunas.meses() if atual else {}
+
+        alterados = sorted(mes for mes, assinatura in origem.items() if salvas.get(mes) != assinatura)
+        removidos = sorted(mes for mes in presentes if mes not in origem)
+        if atual is not None and not alterados and not removidos:
+            return RefreshResult(spec.origem, len(origem), [], [])
+
+        partes_ids: List[Mapping[str, np.ndarray]] = []
+        partes_medidas: List[Mapping[str, np.ndarray]] = []
+        if atual is not None:
+            descartados = np.array([ano * 100 + mes for ano, mes in alterados + removidos], dtype=np.int32)
+            colunas = atual.colunas
+            manter = ~np.isin(_chave_mes(colunas.ano, colunas.ids("mes")), descartados)
+            partes_ids.append({coluna: colunas.ids(coluna)[manter] for coluna in colunas.codigos})
+            partes_medidas.append({medida: valores[manter] for medida, valores in colunas.medidas.items()})
+
+        por_ano: Dict[int, List[int]] = {}
+        for ano, mes in alterados:
+            por_ano.setdefault(ano, []).append(mes)
+        for ano, meses in sorted(por_ano.items()):
+            ids, medidas = await self._carregar_meses(session, spec, ano, meses)
+            partes_ids.append(ids)
+            partes_medidas.append(medidas)
+
+        colunas_ids = ("ano", "mes") + spec.dimensoes
+        novas = Colunas(
+            {coluna: np.concatenate([parte[coluna] for parte in partes_ids]) for coluna in colunas_ids},
+            {medida: np.concatenate([parte[medida] for parte in partes_medidas]) for medida in spec.medidas},
+        )
+        self._tabelas[spec.origem] = _Tabela(spec=spec, colunas=novas, assinaturas=origem)
+        return RefreshResult(spec.origem, len(origem), alterados, removidos)
+
+    async def _carregar_rotulos(self, session: AsyncSession) -> None:
+        rotulos = {}
+        for tabela, rotulo in sorted(self._lookups):
+            result = await session.execute(text(f"SELECT id, {rotulo} FROM {tabela}"))
+            rotulos[(tabela, rotulo)] = {int(row[0]): row[1] for row in result.all() if row[0] is not None}
+        # Keep the previous dictionaries (and the label maps cached on them) when nothing changed.
+        self._rotulos = {
+            chave: self._rotulos[chave] if self._rotulos.get(chave) == valores else valores
+            for chave, valores in rotulos.items()
+        }
+
+    async def atualizar(
+        self, session: AsyncSession, anos: Sequence[int] | None = None, forcar: bool = False
+    ) -> List[RefreshResult]:
+        if anos is None:
+            ano_atual = datetime.utcnow().year
+            anos = list(range(ano_atual - settings.cubo_memoria_anos + 1, ano_atual + 1))
+        async with self._lock:
+            inicio = time.perf_counter()
+            # Months that left the window are dropped as if they had been removed at the source.
+            resultados = [
+                await self._atualizar_tabela(session, replace(spec, origem=execucao_source(spec.origem)), anos, forcar)
+                for spec in RESUMOS
+            ]
+            await self._carregar_rotulos(session)
+            self._anos = set(anos)
+            # Derived from the month signatures rather than the load time, so workers
+            # holding the same data agree on the version (and on the ETags built on it).
+            conteudo = (
+                sorted(self._anos),
+                sorted((origem, sorted(tabela.assinaturas.items())) for origem, tabela in self._tabelas.items()),
+                sorted((chave, sorted(valores.items())) for chave, valores in self._rotulos.items()),
+            )
+            self._versao = hashlib.sha1(repr(conteudo).encode("utf-8")).hexdigest()
+            self.atualizado_em = datetime.utcnow()
+            self.ultima_duracao = time.perf_counter() - inicio
+
+        anos_alterados = {
+            ano
+            for resultado in resultados
+            for ano, _ in resultado.meses_recalculados + resultado.meses_removidos
+        }
+        for ano in anos_alterados:
+            response_cache.invalidate(ano=ano)
+        return resultados
+
+    def relatorio(self) -> Dict[str, Any]:
+        tabelas = {}
+        for origem, tabela in self._tabelas.items():
+            colunas = tabela.colunas.bytes_por_coluna()
+            tabelas[origem] = {
+                "linhas": tabela.colunas.linhas,
+                "particoes": len(tabela.assinaturas),
+                "bytes": sum(colunas.values()),
+                "bytes_por_coluna": colunas,
+                "cardinalidade": {coluna: int(valores.size) for coluna, valores in tabela.colunas.valores.items()},
+            }
+        rotulos = {f"{tabela}.{rotulo}": len(valores) for (tabela, rotulo), valores in self._rotulos.items()}
+        return {
+            "enabled": settings.cubo_memoria_enabled,
+            "pronto": self.pronto,
+            "anos": sorted(self._anos),
+            "atualizado_em": self.atualizado_em,
+            "ultima_duracao_ms": None if self.ultima_duracao is None else round(self.ultima_duracao * 1000, 2),
+            "bytes_total": sum(tabela["bytes"] for tabela in tabelas.values()),
+            "tabelas": tabelas,
+            "rotulos": rotulos,
+        }
+
+    async def refresh_periodically(self, intervalo: int) -> None:
+        while True:
+            try:
+                async with SessionLocal() as session:
+                    resultados = await self.atualizar(session)
+                for resultado in resultados:
+                    if resultado.meses_recalculados or resultado.meses_removidos:
+                        logger.info(
+                            "Cubo em memória %s: %d mes(es) carregado(s), %d removido(s)",
+                            resultado.tabela,
+                            len(resultado.meses_recalculados),
+                            len(resultado.meses_removidos),
+                        )
+            except Exception:  # noqa: BLE001
+                logger.exception("Falha ao atualizar o cubo de execução em memória")
+            if intervalo <= 0:
+                return
+            await asyncio.sleep(intervalo)
+
+
+cubo_colunar = CuboColunar()
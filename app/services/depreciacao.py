@@ -0,0 +1,240 @@
+import asyncio
+import calendar
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, List, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Reference months kept per loaded asset base (three years of monthly closings).
+MESES_EM_CACHE = 36
+
+METODOS = {"linear": 0, "saldo_decrescente": 1, "soma_digitos": 2}
+LINEAR, SALDO_DECRESCENTE, SOMA_DIGITOS = 0, 1, 2
+
+# Months are counted as ano * 12 + (mes - 1); assets without a disposal get a month
+# that never arrives.
+SEM_BAIXA = np.iinfo(np.int32).max
+
+# One row per asset: an asset with several patrimonio_responsavel rows counts once.
+BENS = """
+    SELECT p.valor_aquisicao,
+           p.valor_residual,
+           p.data_aquisicao,
+           p.data_baixa,
+           p.vida_util_meses,
+           p.metodo_depreciacao,
+           COALESCE(p.natureza, 'Natureza') AS natureza,
+           COALESCE(o.nome, 'Orgão') AS orgao
+    FROM patrimonio p
+    LEFT JOIN (
+        SELECT patrimonio_id, MAX(orgao_id) AS orgao_id
+        FROM patrimonio_responsavel
+        GROUP BY patrimonio_id
+    ) pr ON pr.patrimonio_id = p.id
+    LEFT JOIN orgao o ON o.id = pr.orgao_id
+"""
+
+# Checksums over every column BENS reads, as in the Parquet snapshots, so edits and
+# back-dated disposals are seen too; a change reloads the whole base.
+ASSINATURA = """
+    SELECT COUNT(*),
+           MAX(id),
+           BIT_XOR(CRC32(CONCAT_WS('|', id, valor_aquisicao, valor_residual, data_aquisicao, data_baixa,
+                                   vida_util_meses, metodo_depreciacao, natureza))),
+           (SELECT CONCAT_WS('|', COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', patrimonio_id, orgao_id))))
+            FROM patrimonio_responsavel),
+           (SELECT BIT_XOR(CRC32(CONCAT_WS('|', id, nome))) FROM orgao)
+    FROM patrimonio
+"""
+
+
+def _mes(valor: Any) -> int | None:
+    if valor is None:
+        return None
+    if not isinstance(valor, date):
+        valor = date.fromisoformat(str(valor)[:10])
+    return valor.year * 12 + valor.month - 1
+
+
+def _fim_do_mes(mes: int) -> date:
+    ano, mes_do_ano = divmod(mes, 12)
+    return date(ano, mes_do_ano + 1, calendar.monthrange(ano, mes_do_ano + 1)[1])
+
+
+@dataclass
+class GrupoAvaliado:
+    categoria: str
+    quantidade: int
+    valor_aquisicao: float
+    depreciacao_acumulada: float
+    valor_contabil: float
+
+
+@dataclass
+class Avaliacao:
+    referencia: date
+    quantidade: int
+    valor_aquisicao: float
+    depreciacao_acumulada: float
+    depreciacao_no_mes: float
+    valor_contabil: float
+    por_orgao: List[GrupoAvaliado]
+    por_natureza: List[GrupoAvaliado]
+
+
+class BaseDepreciavel:
+    # Immutable columnar snapshot of the asset base. Labels are stored as integer codes
+    # into sorted arrays of distinct names, so grouping is a bincount.
+
+    def __init__(self, linhas: List[Any]) -> None:
+        quantidade = len(linhas)
+
+        def coluna(posicao: int, converter, dtype) -> np.ndarray:
+            return np.fromiter((converter(linha[posicao]) for linha in linhas), dtype=dtype, count=quantidade)
+
+        self.custo = coluna(0, lambda valor: float(valor or 0), np.float64)
+        residual = coluna(1, lambda valor: float(valor or 0), np.float64)
+        self.residual = np.clip(residual, 0, self.custo)
+        # Without an acquisition date the asset is carried at cost and never depreciated.
+        self.sem_aquisicao = coluna(2, lambda valor: valor is None, np.bool_)
+        self.aquisicao = coluna(2, lambda valor: SEM_BAIXA - 1 if valor is None else _mes(valor), np.int32)
+        self.baixa = coluna(3, lambda valor: SEM_BAIXA if valor is None else _mes(valor), np.int32)
+        # No useful life (land, works of art): not depreciated.
+        self.vida = coluna(4, lambda valor: max(int(valor or 0), 0), np.int32)
+        self.metodo = coluna(5, lambda valor: METODOS.get(str(valor or "").strip().lower(), LINEAR), np.int8)
+        self.naturezas, self.cod_natureza = np.unique(
+            np.array([linha[6] for linha in linhas], dtype=object), return_inverse=True
+        )
+        self.orgaos, self.cod_orgao = np.unique(
+            np.array([linha[7] for linha in linhas], dtype=object), return_inverse=True
+        )
+
+    @property
+    def linhas(self) -> int:
+        return int(self.custo.size)
+
+    def depreciacao(self, mes: int) -> np.ndarray:
+        # Accumulated depreciation of every asset at the end of `mes`, in one pass.
+        # Depreciation starts in the month after the acquisition and stops at the
+        # residual value once the useful life is over.
+        decorridos = np.clip(mes - self.aquisicao.astype(np.int64), 0, None)
+        vida = np.maximum(self.vida, 1).astype(np.float64)
+        meses = np.minimum(decorridos, self.vida).astype(np.float64)
+        base = self.custo - self.residual
+
+        fracao = meses / vida
+        soma_digitos = meses * (2 * vida - meses + 1) / (vida * (vida + 1))
+        fracao = np.where(self.metodo == SOMA_DIGITOS, soma_digitos, fracao)
+        depreciacao = base * fracao
+
+        # Double declining balance on the monthly rate, floored at the residual value
+        # and closed at it when the useful life ends.
+        taxa = np.minimum(2.0 / vida, 1.0)
+        saldo = np.maximum(self.custo * (1 - taxa) ** meses, self.residual)
+        saldo = np.where(meses >= self.vida, self.residual, saldo)
+        depreciacao = np.where(self.metodo == SALDO_DECRESCENTE, self.custo - saldo, depreciacao)
+
+        return np.where(self.vida > 0, depreciacao, 0.0)
+
+    def avaliar(self, mes: int) -> Avaliacao:
+        ativos = ((self.aquisicao <= mes) | self.sem_aquisicao) & (self.baixa > mes)
+        acumulada = self.depreciacao(mes)
+        no_mes = acumulada - self.depreciacao(mes - 1)
+        custo = np.where(ativos, self.custo, 0.0)
+        acumulada = np.where(ativos, acumulada, 0.0)
+
+        def grupos(codigos: np.ndarray, nomes: np.ndarray) -> List[GrupoAvaliado]:
+            tamanho = nomes.size
+            quantidades = np.bincount(codigos, weights=ativos, minlength=tamanho)
+            custos = np.bincount(codigos, weights=custo, minlength=tamanho)
+            depreciacoes = np.bincount(codigos, weights=acumulada, minlength=tamanho)
+            contabil = custos - depreciacoes
+            return [
+                GrupoAvaliado(
+                    categoria=str(nomes[indice]),
+                    quantidade=int(quantidades[indice]),
+                    valor_aquisicao=float(custos[indice]),
+                    depreciacao_acumulada=float(depreciacoes[indice]),
+                    valor_contabil=float(contabil[indice]),
+                )
+                for indice in np.argsort(-contabil, kind="stable")
+                if quantidades[indice] > 0
+            ]
+
+        total_custo = float(custo.sum())
+        total_depreciacao = float(acumulada.sum())
+        return Avaliacao(
+            referencia=_fim_do_mes(mes),
+            quantidade=int(ativos.sum()),
+            valor_aquisicao=total_custo,
+            depreciacao_acumulada=total_depreciacao,
+            depreciacao_no_mes=float(no_mes[ativos].sum()),
+            valor_contabil=total_custo - total_depreciacao,
+            por_orgao=grupos(self.cod_orgao, self.orgaos),
+            por_natureza=grupos(self.cod_natureza, self.naturezas),
+        )
+
+
+class MotorDepreciacao:
+    def __init__(self) -> None:
+        self._base: BaseDepreciavel | None = None
+        self._assinatura: Tuple[Any, ...] | None = None
+        self._avaliacoes: "OrderedDict[int, Avaliacao]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._verificado_em = 0.0
+        self._versao = ""
+        self.atualizado_em: datetime | None = None
+        self.ultima_duracao: float | None = None
+
+    def versao(self) -> str:
+        return self._versao
+
+    async def _garantir(self, session: AsyncSession) -> BaseDepreciavel:
+        async with self._lock:
+            agora = time.monotonic()
+            if self._base is not None and agora - self._verificado_em < settings.depreciacao_refresh_interval:
+                return self._base
+            assinatura = tuple(str(valor) for valor in (await session.execute(text(ASSINATURA))).one())
+            if self._base is None or assinatura != self._assinatura:
+                inicio = time.perf_counter()
+                linhas = (await session.execute(text(BENS))).all()
+                self._base = BaseDepreciavel(linhas)
+                self._assinatura = assinatura
+                self._avaliacoes.clear()
+                self._versao = hashlib.sha1(repr(assinatura).encode("utf-8")).hexdigest()
+                self.atualizado_em = datetime.utcnow()
+                self.ultima_duracao = time.perf_counter() - inicio
+                logger.info(
+                    "Base de depreciação carregada: %d bem(ns) em %.0f ms",
+                    self._base.linhas,
+                    self.ultima_duracao * 1000,
+                )
+            self._verificado_em = agora
+            return self._base
+
+    async def avaliar(self, session: AsyncSession, data: date) -> Avaliacao:
+        base = await self._garantir(session)
+        mes = _mes(data)
+        avaliacao = self._avaliacoes.get(mes)
+        if avaliacao is None:
+            avaliacao = base.avaliar(mes)
+            self._avaliacoes[mes] = avaliacao
+            while len(self._avaliacoes) > MESES_EM_CACHE:
+                self._avaliacoes.popitem(last=False)
+        else:
+            self._avaliacoes.move_to_end(mes)
+        return avaliacao
+
+
+motor_depreciacao = MotorDepreciacao()
@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import response_cache
+from ..config import settings
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+Chave = Tuple[int, date]
+
+# Endpoints whose answers come from the ledger once it is enabled.
+ENDPOINTS = ("almoxarifado_resumo", "almoxarifado_estoque")
+
+
+@dataclass(frozen=True)
+class OrigemMovimento:
+    # Item table; its id is the watermark of the incremental load.
+    tabela: str
+    # Ledger column the quantities go to.
+    coluna: str
+    # Quantities of the item ids in (:desde, :ate], summed per product and day.
+    movimentos: str
+
+    @property
+    def sinal(self) -> int:
+        return 1 if self.coluna == "entradas" else -1
+
+
+ORIGENS = (
+    OrigemMovimento(
+        tabela="entrada_item",
+        coluna="entradas",
+        movimentos="""
+            SELECT ei.produto_id, DATE(ee.data_entrada) AS data, SUM(ei.quantidade) AS quantidade
+            FROM entrada_item ei
+            JOIN entrada_estoque ee ON ee.id = ei.entrada_id
+            WHERE ei.id > :desde AND ei.id <= :ate
+              AND ei.produto_id IS NOT NULL AND ee.data_entrada IS NOT NULL
+            GROUP BY ei.produto_id, DATE(ee.data_entrada)
+            """,
+    ),
+    OrigemMovimento(
+        tabela="saida_item",
+        coluna="saidas",
+        movimentos="""
+            SELECT si.produto_id, DATE(se.data_saida) AS data, SUM(si.quantidade) AS quantidade
+            FROM saida_item si
+            JOIN saida_estoque se ON se.id = si.saida_id
+            WHERE si.id > :desde AND si.id <= :ate
+              AND si.produto_id IS NOT NULL AND se.data_saida IS NOT NULL
+            GROUP BY si.produto_id, DATE(se.data_saida)
+            """,
+    ),
+)
+
+
+@dataclass
+class RazaoResult:
+    origem: str
+    ultimo_id: int
+    itens_lancados: int
+    dias_lancados: int
+
+
+@dataclass
+class Marca:
+    ultimo_id: int
+    # Highest id seen at observado_em; the watermark only reaches it ESTOQUE_RAZAO_ATRASO
+    # seconds later, so items whose transactions were still open then are not skipped.
+    id_observado: int
+    observado_em: datetime | None
+
+
+def _data(valor) -> date:
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+async def _marcas(session: AsyncSession) -> Dict[str, Marca]:
+    # Locks the control rows until the caller commits, serializing writers (API workers,
+    # the periodic task, the CLI): a second one waits and then reads the committed marks.
+    result = await session.execute(
+        text("SELECT origem, ultimo_id, id_observado, observado_em FROM estoque_razao_controle FOR UPDATE")
+    )
+    marcas = {}
+    for row in result.all():
+        observado_em = row.observado_em
+        if observado_em is not None and not isinstance(observado_em, datetime):
+            observado_em = datetime.fromisoformat(str(observado_em))
+        marcas[row.origem] = Marca(int(row.ultimo_id), int(row.id_observado or 0), observado_em)
+    return marcas
+
+
+async def _ultimo_id(session: AsyncSession, origem: OrigemMovimento) -> int:
+    return int((await session.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {origem.tabela}"))).scalar() or 0)
+
+
+async def _movimentos(session: AsyncSession, origem: OrigemMovimento, desde: int, ate: int) -> Dict[Chave, Decimal]:
+    result = await session.execute(text(origem.movimentos), {"desde": desde, "ate": ate})
+    return {(int(row.produto_id), _data(row.data)): Decimal(str(row.quantidade or 0)) for row in result.all()}
+
+
+async def _gravar_marca(session: AsyncSession, origem: OrigemMovimento, marca: Marca, agora: datetime) -> None:
+    params = {
+        "origem": origem.tabela,
+        "ultimo_id": marca.ultimo_id,
+        "id_observado": marca.id_observado,
+        "observado_em": marca.observado_em,
+        "atualizado_em": agora,
+    }
+    await session.execute(text("DELETE FROM estoque_razao_controle WHERE origem = :origem"), params)
+    await session.execute(
+        text(
+            """
+            INSERT INTO estoque_razao_controle (origem, ultimo_id, id_observado, observado_em, atualizado_em)
+            VALUES (:origem, :ultimo_id, :id_observado, :observado_em, :atualizado_em)
+            """
+        ),
+        params,
+    )
+
+
+def _limite(marca: Marca | None, agora: datetime) -> int | None:
+    # Highest id safe to read: the id observed ESTOQUE_RAZAO_ATRASO seconds ago, else the
+    # watermark itself (nothing yet, on a first load). None means no lag: MAX(id).
+    atraso = timedelta(seconds=settings.estoque_razao_atraso)
+    if atraso <= timedelta(0):
+        return None
+    if marca is None:
+        return 0
+    if marca.observado_em is not None and agora - marca.observado_em >= atraso:
+        return max(marca.ultimo_id, marca.id_observado)
+    return marca.ultimo_id
+
+
+async def _observar(session: AsyncSession, origem: OrigemMovimento, marca: Marca, agora: datetime) -> None:
+    # Once the observed id is reached, observe the current MAX(id) for a later run.
+    if marca.ultimo_id >= marca.id_observado:
+        ultimo = await _ultimo_id(session, origem)
+        if ultimo > marca.ultimo_id:
+            marca.id_observado, marca.observado_em = ultimo, agora
+
+
+async def _lancar(
+    session: AsyncSession, origem: OrigemMovimento, movimentos: Dict[Chave, Decimal], agora: datetime
+) -> None:
+    por_produto: Dict[int, Decimal] = {}
+    for (produto_id, dia), quantidade in sorted(movimentos.items()):
+        params = {"produto_id": produto_id, "data": dia}
+        existe = await session.execute(
+            text("SELECT 1 FROM estoque_movimento_diario WHERE produto_id = :produto_id AND data = :data"), params
+        )
+        if existe.first() is None:
+            # A new day opens with the balance of the product's previous day.
+            anterior = await session.execute(
+                text(
+                    """
+                    SELECT saldo_acumulado
+                    FROM estoque_movimento_diario
+                    WHERE produto_id = :produto_id AND data < :data
+                    ORDER BY data DESC
+                    LIMIT 1
+                    """
+                ),
+                params,
+            )
+            await session.execute(
+                text(
+                    """
+                    INSERT INTO estoque_movimento_diario (produto_id, data, entradas, saidas, saldo_acumulado)
+                    VALUES (:produto_id, :data, 0, 0, :saldo)
+                    """
+                ),
+                {**params, "saldo": anterior.scalar() or 0},
+            )
+        liquido = quantidade * origem.sinal
+        # The movement shifts the running balance of its day and of every later day;
+        # movements are usually recent, so this touches few rows.
+        await session.execute(
+            text(
+                f"""
+                UPDATE estoque_movimento_diario
+                SET {origem.coluna} = {origem.coluna} + CASE WHEN data = :data THEN :quantidade ELSE 0 END,
+                    saldo_acumulado = saldo_acumulado + :liquido
+                WHERE produto_id = :produto_id AND data >= :data
+                """
+            ),
+            {**params, "quantidade": quantidade, "liquido": liquido},
+        )
+        por_produto[produto_id] = por_produto.get(produto_id, Decimal(0)) + liquido
+
+    for produto_id, liquido in sorted(por_produto.items()):
+        params = {"produto_id": produto_id, "liquido": liquido, "atualizado_em": agora}
+        atualizado = await session.execute(
+            text(
+                """
+                UPDATE estoque_saldo
+                SET quantidade = quantidade + :liquido, atualizado_em = :atualizado_em
+                WHERE produto_id = :produto_id
+                """
+            ),
+            params,
+        )
+        if atualizado.rowcount == 0:
+            await session.execute(
+                text(
+                    """
+                    INSERT INTO estoque_saldo (produto_id, quantidade, atualizado_em)
+                    VALUES (:produto_id, :liquido, :atualizado_em)
+                    """
+                ),
+                params,
+            )
+
+
+async def reconstruir(session: AsyncSession) -> List[RazaoResult]:
+    # Full rebuild: every movement read once, running balances computed in one pass
+    # per product. Also the way to pick up edited or deleted items, which the id
+    # watermark of the incremental load cannot see. It stops at the same lagged ids as
+    # the incremental load and leaves the rest to it.
+    anteriores = await _marcas(session)
+    agora = datetime.utcnow()
+    ultimos = {}
+    for origem in ORIGENS:
+        limite = _limite(anteriores.get(origem.tabela), agora)
+        ultimos[origem.tabela] = await _ultimo_id(session, origem) if limite is None else limite
+    dias: Dict[Chave, List[Decimal]] = {}
+    lancados: Dict[str, int] = {}
+    for indice, origem in enumerate(ORIGENS):
+        movimentos = await _movimentos(session, origem, 0, ultimos[origem.tabela])
+        lancados[origem.tabela] = len(movimentos)
+        for chave, quantidade in movimentos.items():
+            dias.setdefault(chave, [Decimal(0), Decimal(0)])[indice] += quantidade
+
+    for tabela in ("estoque_movimento_diario", "estoque_saldo", "estoque_razao_controle"):
+        await session.execute(text(f"DELETE FROM {tabela}"))
+
+    linhas, saldos = [], {}
+    for (produto_id, dia), (entradas, saidas) in sorted(dias.items()):
+        saldo = saldos.get(produto_id, Decimal(0)) + entradas - saidas
+        saldos[produto_id] = saldo
+        linhas.append(
+            {"produto_id": produto_id, "data": dia, "entradas": entradas, "saidas": saidas, "saldo": saldo}
+        )
+    if linhas:
+        await session.execute(
+            text(
+                """
+                INSERT INTO estoque_movimento_diario (produto_id, data, entradas, saidas, saldo_acumulado)
+                VALUES (:produto_id, :data, :entradas, :saidas, :saldo)
+                """
+            ),
+            linhas,
+        )
+    if saldos:
+        await session.execute(
+            text(
+                """
+                INSERT INTO estoque_saldo (produto_id, quantidade, atualizado_em)
+                VALUES (:produto_id, :quantidade, :atualizado_em)
+                """
+            ),
+            [
+                {"produto_id": produto_id, "quantidade": saldo, "atualizado_em": agora}
+                for produto_id, saldo in sorted(saldos.items())
+            ],
+        )
+    for origem in ORIGENS:
+        marca = Marca(ultimos[origem.tabela], 0, None)
+        anterior = anteriores.get(origem.tabela)
+        if anterior is not None:
+            marca.id_observado, marca.observado_em = anterior.id_observado, anterior.observado_em
+        await _observar(session, origem, marca, agora)
+        await _gravar_marca(session, origem, marca, agora)
+    # One transaction: readers keep seeing the previous ledger until the new one is complete.
+    await session.commit()
+    _invalidar_cache()
+    return [
+        RazaoResult(origem.tabela, ultimos[origem.tabela], ultimos[origem.tabela], lancados[origem.tabela])
+        for origem in ORIGENS
+    ]
+
+
+async def atualizar(session: AsyncSession) -> List[RazaoResult]:
+    if not await _marcas(session):
+        await session.rollback()
+        return await reconstruir(session)
+    await session.commit()
+
+    resultados = []
+    for origem in ORIGENS:
+        ultimo = await _ultimo_id(session, origem)
+        itens = dias = 0
+        # Bounded batches, each committed with its watermark, so a long catch-up
+        # neither holds one huge transaction nor restarts from scratch if interrupted.
+        # The watermark is re-read under the lock for every batch.
+        while True:
+            marca = (await _marcas(session)).get(origem.tabela) or Marca(0, 0, None)
+            agora = datetime.utcnow()
+            limite = _limite(marca, agora)
+            if limite is None:
+                limite = ultimo
+            desde = marca.ultimo_id
+            if desde >= limite:
+                observado = marca.id_observado
+                await _observar(session, origem, marca, agora)
+                if marca.id_observado != observado:
+                    await _gravar_marca(session, origem, marca, agora)
+                await session.commit()
+                break
+            ate = min(desde + settings.estoque_razao_lote, limite)
+            movimentos = await _movimentos(session, origem, desde, ate)
+            await _lancar(session, origem, movimentos, agora)
+            marca.ultimo_id = ate
+            await _gravar_marca(session, origem, marca, agora)
+            await session.commit()
+            itens += ate - desde
+            dias += len(movimentos)
+        resultados.append(RazaoResult(origem.tabela, desde, itens, dias))
+
+    if any(resultado.dias_lancados for resultado in resultados):
+        _invalidar_cache()
+    return resultados
+
+
+def _invalidar_cache() -> None:
+    for endpoint in ENDPOINTS:
+        response_cache.invalidate(endpoint=endpoint)
+
+
+async def refresh_periodically(intervalo: int) -> None:
+    while True:
+        try:
+            async with SessionLocal() as session:
+                resultados = await atualizar(session)
+            for resultado in resultados:
+                if resultado.dias_lancados:
+                    logger.info(
+                        "Razão de estoque, %s: %d produto-dia(s) lançado(s) até o id %d",
+                        resultado.origem,
+                        resultado.dias_lancados,
+                        resultado.ultimo_id,
+                    )
+        except Exception:  # noqa: BLE001
+            logger.exception("Falha ao atualizar o razão de estoque")
+        await asyncio.sleep(intervalo)
+
+
+async def _main(reconstruir_tudo: bool) -> None:
+    async with SessionLocal() as session:
+        resultados = await (reconstruir(session) if reconstruir_tudo else atualizar(session))
+    for resultado in resultados:
+        print(
+            f"{resultado.origem}: até o id {resultado.ultimo_id}; "
+            f"{resultado.dias_lancados} produto-dia(s) lançado(s)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Atualiza o razão de estoque do almoxarifado.")
+    parser.add_argument(
+        "--reconstruir", action="store_true", help="Refaz o razão do zero (necessário após editar ou excluir itens)"
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.reconstruir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, List, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Fewer refuellings than this in the window give no baseline to compare against.
+MIN_ABASTECIMENTOS = 5
+
+# One row per refuelling (ctrl_combustivel), its items summed; the whole window in one scan.
+ABASTECIMENTOS = """
+    SELECT COALESCE(cc.veiculo_id, 0) AS veiculo_id,
+           COALESCE(v.placa, 'Veículo') AS veiculo,
+           cc.data_abastecimento AS data,
+           COALESCE(SUM(cci.quantidade), 0) AS litros,
+           COALESCE(SUM(cci.valor_total), 0) AS valor,
+           COALESCE(SUM(cci.km_rodado), 0) AS km
+    FROM ctrl_combustivel_item cci
+    JOIN ctrl_combustivel cc ON cc.id = cci.ctrl_combustivel_id
+    LEFT JOIN veiculos v ON v.id = cc.veiculo_id
+    WHERE cc.data_abastecimento >= :inicio AND cc.data_abastecimento < :fim
+    GROUP BY cc.id, cc.veiculo_id, v.placa, cc.data_abastecimento
+"""
+
+
+def primeiro_dia(mes: int) -> date:
+    # Months are counted as ano * 12 + (mes - 1).
+    return date(mes // 12, mes % 12 + 1, 1)
+
+
+def _razao(numerador: np.ndarray, denominador: np.ndarray) -> np.ndarray:
+    return np.divide(numerador, denominador, out=np.full(numerador.shape, np.nan), where=denominador > 0)
+
+
+def _valor(numero: float) -> float | None:
+    return None if np.isnan(numero) else float(numero)
+
+
+def _zscore(valores: np.ndarray, grupos: np.ndarray, quantidade_grupos: int) -> np.ndarray:
+    # z of every value against the other values of its group (vehicle), ignoring NaNs;
+    # NaN where the group is too small or the others do not vary. Leaving the value out
+    # matters: counted in its own baseline, |z| can never exceed sqrt(n - 1).
+    validos = ~np.isnan(valores)
+    contagem = np.bincount(grupos[validos], minlength=quantidade_grupos)
+    soma = np.bincount(grupos[validos], weights=valores[validos], minlength=quantidade_grupos)
+    media = _razao(soma, contagem.astype(np.float64))
+    desvios = np.where(validos, valores - media[grupos], 0.0)
+    quadrados = np.bincount(grupos, weights=desvios**2, minlength=quantidade_grupos)
+    # Mean and spread of the group without the value: n - 1 values, their squared
+    # deviations taken from the full-group sum so nothing is recomputed per value.
+    outros = contagem[grupos].astype(np.float64) - 1
+    media_outros = media[grupos] - _razao(desvios, outros)
+    variancia_outros = _razao(quadrados[grupos] - desvios**2 * _razao(outros + 1, outros), outros)
+    desvio_padrao = np.sqrt(np.maximum(variancia_outros, 0.0))
+    desvio_padrao[(contagem[grupos] < MIN_ABASTECIMENTOS) | ~(desvio_padrao > 0)] = np.nan
+    return (valores - media_outros) / desvio_padrao
+
+
+@dataclass
+class MesVeiculo:
+    mes: str
+    litros: float
+    valor: float
+    km: float
+    # Over the rolling window ending in this month.
+    km_por_litro: float | None
+    custo_por_km: float | None
+
+
+@dataclass
+class VeiculoAnalise:
+    veiculo: str
+    abastecimentos: int
+    litros: float
+    valor: float
+    km: float
+    km_por_litro: float | None
+    custo_por_km: float | None
+    meses: List[MesVeiculo]
+
+
+@dataclass
+class Anomalia:
+    veiculo: str
+    data: date
+    litros: float
+    valor: float
+    km: float
+    km_por_litro: float | None
+    z_km_por_litro: float | None
+    custo_por_km: float | None
+    z_custo_por_km: float | None
+
+
+@dataclass
+class AnaliseFrota:
+    veiculos: List[VeiculoAnalise]
+    anomalias: List[Anomalia]
+
+
+def analisar(
+    linhas: Sequence[Any], mes_inicial: int, meses: int, janela: int, limiar_z: float
+) -> AnaliseFrota:
+    quantidade = len(linhas)
+    ids = np.fromiter((int(linha.veiculo_id) for linha in linhas), dtype=np.int64, count=quantidade)
+    litros = np.fromiter((float(linha.litros) for linha in linhas), dtype=np.float64, count=quantidade)
+    valor = np.fromiter((float(linha.valor) for linha in linhas), dtype=np.float64, count=quantidade)
+    km = np.fromiter((float(linha.km) for linha in linhas), dtype=np.float64, count=quantidade)
+    datas = np.array([str(linha.data)[:10] for linha in linhas], dtype="datetime64[D]")
+    # datetime64[M] counts months since 1970-01.
+    posicao_mes = datas.astype("datetime64[M]").astype(np.int64) + 1970 * 12 - mes_inicial
+    distintos, veiculo = np.unique(ids, return_inverse=True)
+    rotulos = {int(ids[indice]): str(linhas[indice].veiculo) for indice in range(quantidade)}
+    veiculos = distintos.size
+
+    # Vehicle x month matrices, then rolling sums as differences of cumulative sums.
+    celula = veiculo * meses + posicao_mes
+    por_mes = {
+        nome: np.bincount(celula, weights=pesos, minlength=veiculos * meses).reshape(veiculos, meses)
+        for nome, pesos in (("litros", litros), ("valor", valor), ("km", km))
+    }
+    moveis = {}
+    for nome, matriz in por_mes.items():
+        acumulado = np.concatenate([np.zeros((veiculos, 1)), np.cumsum(matriz, axis=1)], axis=1)
+        fim = np.arange(1, meses + 1)
+        moveis[nome] = acumulado[:, fim] - acumulado[:, np.maximum(fim - janela, 0)]
+    km_por_litro_movel = _razao(moveis["km"], moveis["litros"])
+    custo_por_km_movel = _razao(moveis["valor"], moveis["km"])
+
+    totais = {nome: matriz.sum(axis=1) for nome, matriz in por_mes.items()}
+    km_por_litro_total = _razao(totais["km"], totais["litros"])
+    custo_por_km_total = _razao(totais["valor"], totais["km"])
+    abastecimentos = np.bincount(veiculo, minlength=veiculos)
+    rotulos_mes = [primeiro_dia(mes_inicial + indice).strftime("%Y-%m") for indice in range(meses)]
+
+    analises = [
+        VeiculoAnalise(
+            veiculo=rotulos[int(distintos[indice])],
+            abastecimentos=int(abastecimentos[indice]),
+            litros=float(totais["litros"][indice]),
+            valor=float(totais["valor"][indice]),
+            km=float(totais["km"][indice]),
+            km_por_litro=_valor(km_por_litro_total[indice]),
+            custo_por_km=_valor(custo_por_km_total[indice]),
+            meses=[
+                MesVeiculo(
+                    mes=rotulos_mes[coluna],
+                    litros=float(por_mes["litros"][indice, coluna]),
+                    valor=float(por_mes["valor"][indice, coluna]),
+                    km=float(por_mes["km"][indice, coluna]),
+                    km_por_litro=_valor(km_por_litro_movel[indice, coluna]),
+                    custo_por_km=_valor(custo_por_km_movel[indice, coluna]),
+                )
+                for coluna in range(meses)
+            ],
+        )
+        for indice in np.argsort(-totais["valor"], kind="stable")
+    ]
+
+    # Each refuelling of the reference month against its vehicle's whole window: low
+    # km/l or high cost/km beyond the threshold hints at leaks or fraud.
+    km_por_litro = _razao(km, litros)
+    custo_por_km = _razao(valor, km)
+    z_km_por_litro = _zscore(km_por_litro, veiculo, veiculos)
+    z_custo_por_km = _zscore(custo_por_km, veiculo, veiculos)
+    with np.errstate(invalid="ignore"):
+        suspeitos = (posicao_mes == meses - 1) & (
+            (np.abs(z_km_por_litro) >= limiar_z) | (np.abs(z_custo_por_km) >= limiar_z)
+        )
+    gravidade = np.fmax(np.nan_to_num(np.abs(z_km_por_litro)), np.nan_to_num(np.abs(z_custo_por_km)))
+    indices = np.flatnonzero(suspeitos)
+    anomalias = [
+        Anomalia(
+            veiculo=rotulos[int(ids[indice])],
+            data=datas[indice].item(),
+            litros=float(litros[indice]),
+            valor=float(valor[indice]),
+            km=float(km[indice]),
+            km_por_litro=_valor(km_por_litro[indice]),
+            z_km_por_litro=_valor(z_km_por_litro[indice]),
+            custo_por_km=_valor(custo_por_km[indice]),
+            z_custo_por_km=_valor(z_custo_por_km[indice]),
+        )
+        for indice in indices[np.argsort(-gravidade[indices], kind="stable")]
+    ]
+    return AnaliseFrota(veiculos=analises, anomalias=anomalias)
+
+
+async def analisar_frota(
+    session: AsyncSession, ano: int, mes: int, meses: int, janela: int, limiar_z: float
+) -> AnaliseFrota:
+    mes_final = ano * 12 + mes - 1
+    mes_inicial = mes_final - meses + 1
+    result = await session.execute(
+        text(ABASTECIMENTOS), {"inicio": primeiro_dia(mes_inicial), "fim": primeiro_dia(mes_final + 1)}
+    )
+    return analisar(result.all(), mes_inicial, meses, janela, limiar_z)
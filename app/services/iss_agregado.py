@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import response_cache
+from ..config import settings
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ORIGEM = "nota_iss"
+
+# Endpoints whose answers come from the aggregate once it is enabled.
+ENDPOINTS = ("iss",)
+
+# One activity per taxpayer: economico_atividades is one-to-many, and joining it
+# directly counted a note once per activity of its issuer.
+RAMO_PRINCIPAL = """
+    SELECT economico_id, MIN(ramo_id) AS ramo_id
+    FROM economico_atividades
+    GROUP BY economico_id
+"""
+
+# Notes with id in (:desde, :ate], summed per (ano, mes, economico, ramo). The id range
+# walks the primary key; YEAR/MONTH only label the rows already read.
+NOTAS = f"""
+    SELECT YEAR(ni.data_emissao) AS ano,
+           MONTH(ni.data_emissao) AS mes,
+           COALESCE(ni.economico_id, 0) AS economico_id,
+           COALESCE(ea.ramo_id, 0) AS ramo_id,
+           COUNT(*) AS quantidade,
+           COALESCE(SUM(ni.valor_total), 0) AS valor
+    FROM nota_iss ni
+    LEFT JOIN ({RAMO_PRINCIPAL}) ea ON ea.economico_id = ni.economico_id
+    WHERE ni.id > :desde AND ni.id <= :ate AND ni.data_emissao IS NOT NULL
+    GROUP BY YEAR(ni.data_emissao), MONTH(ni.data_emissao), COALESCE(ni.economico_id, 0), COALESCE(ea.ramo_id, 0)
+"""
+
+Chave = Tuple[int, int, int, int]
+
+
+@dataclass
+class AgregadoResult:
+    ultimo_id: int
+    notas_lidas: int
+    linhas_lancadas: int
+
+
+@dataclass
+class Controle:
+    ultimo_id: int
+    # Highest id seen at observado_em; the watermark only reaches it ISS_AGREGADO_ATRASO
+    # seconds later, so notes whose transactions were still open then are not skipped.
+    id_observado: int
+    observado_em: datetime | None
+
+
+async def _controle(session: AsyncSession) -> Controle | None:
+    # The row lock serializes writers (API workers, the periodic task, the CLI): a second
+    # one waits here and then reads the watermark the first one committed.
+    result = await session.execute(
+        text(
+            """
+            SELECT ultimo_id, id_observado, observado_em
+            FROM iss_agregado_controle
+            WHERE origem = :origem
+            FOR UPDATE
+            """
+        ),
+        {"origem": ORIGEM},
+    )
+    row = result.first()
+    if row is None:
+        return None
+    observado_em = row.observado_em
+    if observado_em is not None and not isinstance(observado_em, datetime):
+        observado_em = datetime.fromisoformat(str(observado_em))
+    return Controle(int(row.ultimo_id), int(row.id_observado or 0), observado_em)
+
+
+async def _ultimo_id(session: AsyncSession) -> int:
+    return int((await session.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {ORIGEM}"))).scalar() or 0)
+
+
+async def _notas(session: AsyncSession, desde: int, ate: int) -> Dict[Chave, Tuple[int, Decimal]]:
+    result = await session.execute(text(NOTAS), {"desde": desde, "ate": ate})
+    return {
+        (int(row.ano), int(row.mes), int(row.economico_id), int(row.ramo_id)): (
+            int(row.quantidade),
+            Decimal(str(row.valor or 0)),
+        )
+        for row in result.all()
+    }
+
+
+async def _gravar_controle(session: AsyncSession, controle: Controle, agora: datetime) -> None:
+    params = {
+        "origem": ORIGEM,
+        "ultimo_id": controle.ultimo_id,
+        "id_observado": controle.id_observado,
+        "observado_em": controle.observado_em,
+        "atualizado_em": agora,
+    }
+    await session.execute(text("DELETE FROM iss_agregado_controle WHERE origem = :origem"), params)
+    await session.execute(
+        text(
+            """
+            INSERT INTO iss_agregado_controle (origem, ultimo_id, id_observado, observado_em, atualizado_em)
+            VALUES (:origem, :ultimo_id, :id_observado, :observado_em, :atualizado_em)
+            """
+        ),
+        params,
+    )
+
+
+def _limite(controle: Controle | None, agora: datetime) -> int | None:
+    # Highest id safe to read: the id observed ISS_AGREGADO_ATRASO seconds ago, else the
+    # watermark itself (nothing yet, on a first load). None means no lag: MAX(id).
+    atraso = timedelta(seconds=settings.iss_agregado_atraso)
+    if atraso <= timedelta(0):
+        return None
+    if controle is None:
+        return 0
+    if controle.observado_em is not None and agora - controle.observado_em >= atraso:
+        return max(controle.ultimo_id, controle.id_observado)
+    return controle.ultimo_id
+
+
+async def _observar(session: AsyncSession, controle: Controle, agora: datetime) -> None:
+    # Once the observed id is reached, observe the current MAX(id) for a later run.
+    if controle.ultimo_id >= controle.id_observado:
+        ultimo = await _ultimo_id(session)
+        if ultimo > controle.ultimo_id:
+            controle.id_observado, controle.observado_em = ultimo, agora
+
+
+def _linhas(notas: Dict[Chave, Tuple[int, Decimal]]) -> List[Dict[str, Any]]:
+    return [
+        dict(zip(("ano", "mes", "economico_id", "ramo_id"), chave), quantidade=quantidade, valor=valor)
+        for chave, (quantidade, valor) in sorted(notas.items())
+    ]
+
+
+async def _lancar(session: AsyncSession, notas: Dict[Chave, Tuple[int, Decimal]]) -> None:
+    for params in _linhas(notas):
+        atualizado = await session.execute(
+            text(
+                """
+                UPDATE iss_nota_mensal
+                SET quantidade_notas = quantidade_notas + :quantidade, valor_total = valor_total + :valor
+                WHERE ano = :ano AND mes = :mes AND economico_id = :economico_id AND ramo_id = :ramo_id
+                """
+            ),
+            params,
+        )
+        if atualizado.rowcount == 0:
+            await session.execute(
+                text(
+                    """
+                    INSERT INTO iss_nota_mensal (ano, mes, economico_id, ramo_id, quantidade_notas, valor_total)
+                    VALUES (:ano, :mes, :economico_id, :ramo_id, :quantidade, :valor)
+                    """
+                ),
+                params,
+            )
+
+
+async def reconstruir(session: AsyncSession) -> AgregadoResult:
+    # Full rebuild in one transaction. Also the way to pick up edited or deleted notes
+    # and activity changes of a taxpayer, which the id watermark cannot see. Like any
+    # snapshot it only sees committed notes, so it stops at the same lagged id as the
+    # incremental load and leaves the rest to it.
+    anterior = await _controle(session)
+    agora = datetime.utcnow()
+    limite = _limite(anterior, agora)
+    ultimo = await _ultimo_id(session) if limite is None else limite
+    notas = await _notas(session, 0, ultimo)
+    await session.execute(text("DELETE FROM iss_nota_mensal"))
+    linhas = _linhas(notas)
+    if linhas:
+        await session.execute(
+            text(
+                """
+                INSERT INTO iss_nota_mensal (ano, mes, economico_id, ramo_id, quantidade_notas, valor_total)
+                VALUES (:ano, :mes, :economico_id, :ramo_id, :quantidade, :valor)
+                """
+            ),
+            linhas,
+        )
+    controle = Controle(ultimo, 0, None)
+    if anterior is not None:
+        controle.id_observado, controle.observado_em = anterior.id_observado, anterior.observado_em
+    await _observar(session, controle, agora)
+    await _gravar_controle(session, controle, agora)
+    await session.commit()
+    _invalidar_cache()
+    return AgregadoResult(ultimo, sum(quantidade for quantidade, _ in notas.values()), len(linhas))
+
+
+async def atualizar(session: AsyncSession) -> AgregadoResult:
+    notas_lidas = linhas = 0
+    # Bounded batches, each one a transaction holding the control row lock and
+    # committed with its watermark, as in the stock ledger.
+    while True:
+        controle = await _controle(session)
+        if controle is None:
+            await session.rollback()
+            return await reconstruir(session)
+        agora = datetime.utcnow()
+        limite = _limite(controle, agora)
+        if limite is None:
+            limite = await _ultimo_id(session)
+
+        if controle.ultimo_id >= limite:
+            observado = controle.id_observado
+            await _observar(session, controle, agora)
+            if controle.id_observado != observado:
+                await _gravar_controle(session, controle, agora)
+            await session.commit()
+            break
+
+        ate = min(controle.ultimo_id + settings.iss_agregado_lote, limite)
+        notas = await _notas(session, controle.ultimo_id, ate)
+        await _lancar(session, notas)
+        controle.ultimo_id = ate
+        await _gravar_controle(session, controle, agora)
+        await session.commit()
+        notas_lidas += sum(quantidade for quantidade, _ in notas.values())
+        linhas += len(notas)
+
+    if linhas:
+        _invalidar_cache()
+    return AgregadoResult(controle.ultimo_id, notas_lidas, linhas)
+
+
+def _invalidar_cache() -> None:
+    for endpoint in ENDPOINTS:
+        response_cache.invalidate(endpoint=endpoint)
+
+
+async def refresh_periodically(intervalo: int) -> None:
+    while True:
+        try:
+            async with SessionLocal() as session:
+                resultado = await atualizar(session)
+            if resultado.notas_lidas:
+                logger.info(
+                    "Agregado de ISS: %d nota(s) em %d linha(s) até o id %d",
+                    resultado.notas_lidas,
+                    resultado.linhas_lancadas,
+                    resultado.ultimo_id,
+                )
+        except Exception:  # noqa: BLE001
+            logger.exception("Falha ao atualizar o agregado de ISS")
+        await asyncio.sleep(intervalo)
+
+
+async def _main(reconstruir_tudo: bool) -> None:
+    async with SessionLocal() as session:
+        resultado = await (reconstruir(session) if reconstruir_tudo else atualizar(session))
+    print(
+        f"{ORIGEM}: até o id {resultado.ultimo_id}; "
+        f"{resultado.notas_lidas} nota(s) em {resultado.linhas_lancadas} linha(s) lançada(s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Atualiza o agregado mensal de notas de ISS.")
+    parser.add_argument(
+        "--reconstruir",
+        action="store_true",
+        help="Refaz o agregado do zero (necessário após editar ou excluir notas ou mudar atividades)",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.reconstruir))
+
+
+if __name__ == "__main__":
+    main()
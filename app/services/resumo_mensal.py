@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import response_cache
+from ..config import settings
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+Mes = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class ResumoSpec:
+    tabela: str
+    origem: str
+    dimensoes: Tuple[str, ...]
+    medidas: Tuple[str, ...]
+
+
+DIMENSOES_DESPESA = ("orgao_id", "funcao_id", "programa_id", "fonte_id", "natureza_id")
+
+RESUMOS = (
+    ResumoSpec(
+        tabela="resumo_receita_mensal",
+        origem="view_mov_rec",
+        dimensoes=("orgao_id", "origem_id", "fonte_id", "natureza_id"),
+        medidas=("valor_arrecadado",),
+    ),
+    ResumoSpec(
+        tabela="resumo_despesa_mensal",
+        origem="view_desp_executada",
+        dimensoes=DIMENSOES_DESPESA,
+        medidas=("dotacao_atualizada", "empenhado", "liquidado", "valor_pago"),
+    ),
+    ResumoSpec(
+        tabela="resumo_pagamento_mensal",
+        origem="view_mov_pagamento",
+        dimensoes=DIMENSOES_DESPESA,
+        medidas=("valor_pago",),
+    ),
+)
+
+_TABELA_POR_ORIGEM = {spec.origem: spec.tabela for spec in RESUMOS}
+
+
+@dataclass
+class RefreshResult:
+    tabela: str
+    meses_verificados: int
+    meses_recalculados: List[Mes]
+    meses_removidos: List[Mes]
+
+
+def execucao_source(origem: str) -> str:
+    # Routers read the summary table instead of the raw view once it is enabled.
+    if settings.resumo_mensal_enabled:
+        return _TABELA_POR_ORIGEM.get(origem, origem)
+    return origem
+
+
+def _filtro_anos(anos: Sequence[int] | None) -> Tuple[str, Dict[str, object]]:
+    if not anos:
+        return "", {}
+    return "WHERE ano IN :anos", {"anos": list(anos)}
+
+
+def _assinatura(valores: Iterable[object]) -> str:
+    conteudo = "|".join("" if valor is None else str(valor) for valor in valores)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+async def assinaturas_por_mes(
+    session: AsyncSession, spec: ResumoSpec, anos: Sequence[int] | None
+) -> Dict[Mes, str]:
+    # Count and sums plus an order-independent checksum of every grain and measure
+    # column, as in the Parquet snapshots: a row moving between dimensions or two rows
+    # swapping amounts change the month's signature too. COALESCE keeps a NULL in its
+    # position, which CONCAT_WS would otherwise skip.
+    where, params = _filtro_anos(anos)
+    somas = ", ".join(f"SUM({medida})" for medida in spec.medidas)
+    colunas = ", ".join(f"COALESCE({coluna}, '')" for coluna in spec.dimensoes + spec.medidas)
+    statement = text(
+        f"""
+        SELECT ano, mes, COUNT(*), {somas}, BIT_XOR(CRC32(CONCAT_WS('|', {colunas})))
+        FROM {spec.origem}
+        {where}
+        GROUP BY ano, mes
+        """
+    )
+    if anos:
+        statement = statement.bindparams(bindparam("anos", expanding=True))
+    result = await session.execute(statement, params)
+    return {(int(row[0]), int(row[1])): _assinatura(row[2:]) for row in result.all()}
+
+
+async def _assinaturas_salvas(
+    session: AsyncSession, spec: ResumoSpec, anos: Sequence[int] | None
+) -> Dict[Mes, str]:
+    where, params = _filtro_anos(anos)
+    where = f"{where} AND tabela = :tabela" if where else "WHERE tabela = :tabela"
+    statement = text(
+        f"""
+        SELECT ano, mes, assinatura
+        FROM resumo_mensal_controle
+        {where}
+        """
+    )
+    if anos:
+        statement = statement.bindparams(bindparam("anos", expanding=True))
+    result = await session.execute(statement, {**params, "tabela": spec.tabela})
+    return {(int(row.ano), int(row.mes)): row.assinatura for row in result.all()}
+
+
+async def _travar(session: AsyncSession, spec: ResumoSpec) -> Dict[Mes, str]:
+    # Locks the spec's control rows until the caller commits, serializing writers (API
+    # workers, the periodic task, the CLI) as in the stock ledger: a second one waits and
+    # then reads the signatures the first one committed.
+    result = await session.execute(
+        text("SELECT ano, mes, assinatura FROM resumo_mensal_controle WHERE tabela = :tabela FOR UPDATE"),
+        {"tabela": spec.tabela},
+    )
+    return {(int(row.ano), int(row.mes)): row.assinatura for row in result.all()}
+
+
+async def _recalcular_mes(
+    session: AsyncSession, spec: ResumoSpec, ano: int, mes: int, assinatura: str | None
+) -> None:
+    params = {"ano": ano, "mes": mes, "tabela": spec.tabela}
+    await session.execute(
+        text(f"DELETE FROM {spec.tabela} WHERE ano = :ano AND mes = :mes"), params
+    )
+    await session.execute(
+        text("DELETE FROM resumo_mensal_controle WHERE tabela = :tabela AND ano = :ano AND mes = :mes"),
+        params,
+    )
+    if assinatura is None:
+        return
+
+    dimensoes = ", ".join(spec.dimensoes)
+    medidas = ", ".join(spec.medidas)
+    somas = ", ".join(f"COALESCE(SUM({medida}), 0)" for medida in spec.medidas)
+    await session.execute(
+        text(
+            f"""
+            INSERT INTO {spec.tabela} (ano, mes, {dimensoes}, {medidas})
+            SELECT ano, mes, {dimensoes}, {somas}
+            FROM {spec.origem}
+            WHERE ano = :ano AND mes = :mes
+            GROUP BY ano, mes, {dimensoes}
+            """
+        ),
+        params,
+    )
+    await session.execute(
+        text(
+            """
+            INSERT INTO resumo_mensal_controle (tabela, ano, mes, assinatura, atualizado_em)
+            VALUES (:tabela, :ano, :mes, :assinatura, :atualizado_em)
+            """
+        ),
+        {**params, "assinatura": assinatura, "atualizado_em": datetime.utcnow()},
+    )
+
+
+async def refresh_resumo(
+    session: AsyncSession, spec: ResumoSpec, anos: Sequence[int] | None = None, forcar: bool = False
+) -> RefreshResult:
+    origem = await assinaturas_por_mes(session, spec, anos)
+    salvas = await _assinaturas_salvas(session, spec, anos)
+
+    candidatos = sorted(mes for mes, assinatura in origem.items() if forcar or salvas.get(mes) != assinatura)
+    candidatos_removidos = sorted(mes for mes in salvas if mes not in origem)
+    await session.commit()
+
+    # One transaction per month keeps each recomputed partition consistent for readers.
+    # The signatures are re-read under the lock: a month another writer has just
+    # recomputed is skipped instead of being deleted and inserted again.
+    alterados: List[Mes] = []
+    for ano, mes in candidatos:
+        travadas = await _travar(session, spec)
+        if not forcar and travadas.get((ano, mes)) == origem[(ano, mes)]:
+            await session.commit()
+            continue
+        await _recalcular_mes(session, spec, ano, mes, origem[(ano, mes)])
+        await session.commit()
+        alterados.append((ano, mes))
+    removidos: List[Mes] = []
+    for ano, mes in candidatos_removidos:
+        if (ano, mes) not in await _travar(session, spec):
+            await session.commit()
+            continue
+        await _recalcular_mes(session, spec, ano, mes, None)
+        await session.commit()
+        removidos.append((ano, mes))
+
+    return RefreshResult(
+        tabela=spec.tabela,
+        meses_verificados=len(origem),
+        meses_recalculados=alterados,
+        meses_removidos=removidos,
+    )
+
+
+async def refresh_resumos(
+    session: AsyncSession, anos: Sequence[int] | None = None, forcar: bool = False
+) -> List[RefreshResult]:
+    resultados = [await refresh_resumo(session, spec, anos, forcar) for spec in RESUMOS]
+
+    anos_alterados = {
+        ano
+        for resultado in resultados
+        for ano, _ in resultado.meses_recalculados + resultado.meses_removidos
+    }
+    for ano in anos_alterados:
+        response_cache.invalidate(ano=ano)
+    return resultados
+
+
+async def refresh_periodically(intervalo: int) -> None:
+    while True:
+        ano_atual = datetime.utcnow().year
+        try:
+            async with SessionLocal() as session:
+                resultados = await refresh_resumos(session, anos=[ano_atual - 1, ano_atual])
+            for resultado in resultados:
+                if resultado.meses_recalculados or resultado.meses_removidos:
+                    logger.info(
+                        "%s: %d mes(es) recalculado(s), %d removido(s)",
+                        resultado.tabela,
+                        len(resultado.meses_recalculados),
+                        len(resultado.meses_removidos),
+                    )
+        except Exception:  # noqa: BLE001
+            logger.exception("Falha ao atualizar as tabelas de resumo mensal")
+        await asyncio.sleep(intervalo)
+
+
+async def _main(anos: Sequence[int] | None, forcar: bool) -> None:
+    async with SessionLocal() as session:
+        resultados = await refresh_resumos(session, anos=anos, forcar=forcar)
+    for resultado in resultados:
+        recalculados = ", ".join(f"{mes:02d}/{ano}" for ano, mes in resultado.meses_recalculados) or "-"
+        print(
+            f"{resultado.tabela}: {resultado.meses_verificados} mes(es) verificados; "
+            f"recalculados: {recalculados}; removidos: {len(resultado.meses_removidos)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Atualiza as tabelas de resumo mensal de receita e despesa.")
+    parser.add_argument("--ano", type=int, action="append", help="Restringe a atualização ao ano (repetível)")
+    parser.add_argument("--forcar", action="store_true", help="Recalcula todos os meses, mesmo sem alteração")
+    args = parser.parse_args()
+    asyncio.run(_main(args.ano, args.forcar))
+
+
+if __name__ == "__main__":
+    main()
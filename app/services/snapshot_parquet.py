@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import SessionLocal
+from ..exports import VISOES, VisaoExportavel, esquema_arrow, select_longo, tabela_arrow
+
+Particao = Tuple[int | None, int | None]
+
+MANIFESTO = "_manifesto.json"
+ARQUIVO = "dados.parquet"
+SEM_DATA = "sem_data"
+
+
+@dataclass
+class SnapshotResult:
+    visao: str
+    particoes_verificadas: int
+    particoes_gravadas: List[Particao]
+    particoes_removidas: List[Particao]
+    linhas_gravadas: int
+
+
+def _rotulo(particao: Particao) -> str:
+    ano, mes = particao
+    return SEM_DATA if ano is None else f"{ano:04d}-{mes:02d}"
+
+
+def _diretorio(raiz: Path, visao: VisaoExportavel, particao: Particao) -> Path:
+    ano, mes = particao
+    if ano is None:
+        return raiz / visao.nome / SEM_DATA
+    return raiz / visao.nome / f"{ano:04d}" / f"{mes:02d}"
+
+
+def _filtro_particao(visao: VisaoExportavel, particao: Particao) -> Tuple[str, Dict[str, Any]]:
+    if particao[0] is None:
+        coluna = visao.coluna_data or visao.coluna_ano
+        return f"WHERE {coluna} IS NULL", {}
+    return visao.filtro(*particao)
+
+
+async def assinaturas_particoes(session: AsyncSession, visao: VisaoExportavel) -> Dict[Particao, str]:
+    # Row count plus an order-independent checksum of every stable column; a changed
+    # row, an insert or a delete in a month changes that month's signature only.
+    expressao_ano, expressao_mes = visao.particao()
+    colunas = ", ".join(coluna.nome for coluna in visao.estaveis())
+    result = await session.execute(
+        text(
+            f"""
+            SELECT {expressao_ano} AS ano, {expressao_mes} AS mes,
+                   COUNT(*) AS linhas, BIT_XOR(CRC32(CONCAT_WS('|', {colunas}))) AS checksum
+            FROM {visao.nome}
+            GROUP BY {expressao_ano}, {expressao_mes}
+            """
+        )
+    )
+    return {
+        (None if row.ano is None else int(row.ano), None if row.mes is None else int(row.mes)): (
+            f"{row.linhas}:{row.checksum}"
+        )
+        for row in result.all()
+    }
+
+
+async def _gravar_particao(
+    session: AsyncSession, visao: VisaoExportavel, particao: Particao, destino: Path
+) -> int:
+    import pyarrow.parquet as pq
+
+    colunas = visao.estaveis()
+    schema = esquema_arrow(colunas)
+    where, params = _filtro_particao(visao, particao)
+
+    destino.mkdir(parents=True, exist_ok=True)
+    temporario = destino / f"{ARQUIVO}.tmp"
+    linhas = 0
+    result = await session.stream(text(select_longo(visao.nome, colunas, where)), params)
+    with pq.ParquetWriter(temporario, schema, compression="snappy") as writer:
+        async for bloco in result.partitions(settings.export_chunk_rows):
+            writer.write_table(tabela_arrow(colunas, schema, bloco))
+            linhas += len(bloco)
+    # Readers (Power BI, a concurrent refresh) never see a half-written file.
+    os.replace(temporario, destino / ARQUIVO)
+    return linhas
+
+
+def _ler_manifesto(raiz: Path) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    caminho = raiz / MANIFESTO
+    if not caminho.exists():
+        return {}
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def _gravar_manifesto(raiz: Path, manifesto: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    temporario = raiz / f"{MANIFESTO}.tmp"
+    temporario.write_text(json.dumps(manifesto, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporario, raiz / MANIFESTO)
+
+
+async def snapshot_visao(
+    session: AsyncSession,
+    visao: VisaoExportavel,
+    raiz: Path,
+    manifesto: Dict[str, Dict[str, Dict[str, Any]]],
+    forcar: bool = False,
+) -> SnapshotResult:
+    origem = await assinaturas_particoes(session, visao)
+    salvas = manifesto.setdefault(visao.nome, {})
+    por_rotulo = {_rotulo(particao): particao for particao in origem}
+
+    alteradas = sorted(
+        (
+            particao
+            for particao, assinatura in origem.items()
+            if forcar
+            or salvas.get(_rotulo(particao), {}).get("assinatura") != assinatura
+            or not (_diretorio(raiz, visao, particao) / ARQUIVO).exists()
+        ),
+        key=_rotulo,
+    )
+    removidas = sorted(rotulo for rotulo in salvas if rotulo not in por_rotulo)
+
+    linhas = 0
+    for particao in alteradas:
+        gravadas = await _gravar_particao(session, visao, particao, _diretorio(raiz, visao, particao))
+        linhas += gravadas
+        salvas[_rotulo(particao)] = {
+            "assinatura": origem[particao],
+            "linhas": gravadas,
+            "gravado_em": datetime.utcnow().isoformat(timespec="seconds"),
+        }
+        # Saved after every partition so an interrupted run resumes where it stopped.
+        _gravar_manifesto(raiz, manifesto)
+
+    particoes_removidas = []
+    for rotulo in removidas:
+        particao = (None, None) if rotulo == SEM_DATA else tuple(int(parte) for parte in rotulo.split("-"))
+        shutil.rmtree(_diretorio(raiz, visao, particao), ignore_errors=True)
+        del salvas[rotulo]
+        particoes_removidas.append(particao)
+    if removidas:
+        _gravar_manifesto(raiz, manifesto)
+
+    return SnapshotResult(
+        visao=visao.nome,
+        particoes_verificadas=len(origem),
+        particoes_gravadas=alteradas,
+        particoes_removidas=particoes_removidas,
+        linhas_gravadas=linhas,
+    )
+
+
+async def snapshot_visoes(
+    session: AsyncSession, raiz: Path, visoes: Sequence[str] | None = None, forcar: bool = False
+) -> List[SnapshotResult]:
+    raiz.mkdir(parents=True, exist_ok=True)
+    manifesto = _ler_manifesto(raiz)
+    resultados = []
+    for nome in visoes or list(VISOES):
+        resultados.append(await snapshot_visao(session, VISOES[nome], raiz, manifesto, forcar))
+    _gravar_manifesto(raiz, manifesto)
+    return resultados
+
+
+async def _main(raiz: Path, visoes: Sequence[str] | None, forcar: bool) -> None:
+    async with SessionLocal() as session:
+        resultados = await snapshot_visoes(session, raiz, visoes, forcar)
+    for resultado in resultados:
+        print(
+            f"{resultado.visao}: {resultado.particoes_verificadas} partição(ões) verificadas; "
+            f"gravadas: {len(resultado.particoes_gravadas)} ({resultado.linhas_gravadas} linha(s)); "
+            f"removidas: {len(resultado.particoes_removidas)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Grava as views de sql/ em Parquet particionado por ano/mês para o Power BI."
+    )
+    parser.add_argument(
+        "--destino", type=Path, default=Path(settings.snapshot_parquet_dir), help="Pasta raiz dos arquivos"
+    )
+    parser.add_argument(
+        "--view", action="append", choices=sorted(VISOES), help="Restringe a execução à view (repetível)"
+    )
+    parser.add_argument("--forcar", action="store_true", help="Regrava todas as partições, mesmo sem alteração")
+    args = parser.parse_args()
+    asyncio.run(_main(args.destino, args.view, args.forcar))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..pagination import Ordenacao, codificar_cursor, data_cursor, decodificar_cursor
+from ..schemas.paginacao import Pagina
+
+logger = logging.getLogger(__name__)
+
+# Rows that expired up to this long before the load stay in the index (licences list
+# the ones overdue for 30 days).
+RETROATIVO = timedelta(days=30)
+
+
+@dataclass(frozen=True)
+class Vencimento:
+    tipo: str
+    id: int
+    data: date
+    descricao: str
+    # Supplier, vehicle or granting body, already joined at load time.
+    detalhe: str | None
+    valor: float | None
+    situacao: str | None
+
+
+@dataclass(frozen=True)
+class FonteVencimentos:
+    tipo: str
+    # id, data, descricao, detalhe, valor, situacao of the rows expiring from :desde on.
+    carga: str
+    # One aggregate row; any change to it reloads the source.
+    assinatura: str
+
+
+def _assinatura(origem: str, colunas: Sequence[str]) -> str:
+    # Row count plus an order-independent checksum of every column the load reads, joined
+    # ones included, as in the Parquet snapshots: moved deadlines, renamed suppliers and
+    # corrected plates all reload the source. COALESCE keeps a NULL in its position.
+    valores = ", ".join(f"COALESCE({coluna}, '')" for coluna in colunas)
+    return f"SELECT COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', {valores}))) FROM {origem}"
+
+
+FONTES = (
+    FonteVencimentos(
+        tipo="contrato",
+        carga="""
+            SELECT lc.id,
+                   lc.data_fim AS data,
+                   lc.numero AS descricao,
+                   f.nome AS detalhe,
+                   lc.valor_global AS valor,
+                   COALESCE(ls.descricao, 'vigente') AS situacao
+            FROM licit_contrato lc
+            LEFT JOIN fornecedor f ON f.id = lc.fornecedor_id
+            LEFT JOIN licit_status ls ON ls.id = lc.status_id
+            WHERE lc.data_fim >= :desde
+            """,
+        assinatura=_assinatura(
+            """
+            licit_contrato lc
+            LEFT JOIN fornecedor f ON f.id = lc.fornecedor_id
+            LEFT JOIN licit_status ls ON ls.id = lc.status_id
+            """,
+            ("lc.id", "lc.data_fim", "lc.numero", "f.nome", "lc.valor_global", "ls.descricao"),
+        ),
+    ),
+    FonteVencimentos(
+        tipo="licenciamento",
+        carga="""
+            SELECT cl.id,
+                   cl.data_vencimento AS data,
+                   COALESCE(v.placa, 'Veículo') AS descricao,
+                   NULL AS detalhe,
+                   NULL AS valor,
+                   NULL AS situacao
+            FROM ctrl_licenciamento cl
+            LEFT JOIN veiculos v ON v.id = cl.veiculo_id
+            WHERE cl.data_vencimento >= :desde
+            """,
+        assinatura=_assinatura(
+            "ctrl_licenciamento cl LEFT JOIN veiculos v ON v.id = cl.veiculo_id",
+            ("cl.id", "cl.data_vencimento", "v.placa"),
+        ),
+    ),
+    FonteVencimentos(
+        tipo="convenio",
+        carga="""
+            SELECT c.id,
+                   c.data_fim_prevista AS data,
+                   COALESCE(c.descricao, 'Convênio') AS descricao,
+                   c.orgao_repassador AS detalhe,
+                   c.valor_global AS valor,
+                   NULL AS situacao
+            FROM cont_convenio c
+            WHERE c.data_fim_prevista >= :desde
+            """,
+        assinatura=_assinatura(
+            "cont_convenio c",
+            ("c.id", "c.data_fim_prevista", "c.descricao", "c.orgao_repassador", "c.valor_global"),
+        ),
+    ),
+)
+TIPOS = tuple(fonte.tipo for fonte in FONTES)
+
+def _data(valor: Any) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+def _data_cursor(valor: str) -> date:
+    # The index keys on dates; a cursor carrying a time (DATETIME columns) pages by its day.
+    return _data(data_cursor(valor))
+
+
+CHAVES = (Ordenacao("data", "data", _data_cursor), Ordenacao("id", "id"))
+# The bulk listing interleaves the sources: (data, tipo, id).
+CHAVES_GERAL = (
+    Ordenacao("data", "data", _data_cursor),
+    Ordenacao("tipo", "tipo", str),
+    Ordenacao("id", "id"),
+)
+
+
+class IndiceVencimentos:
+    # Immutable snapshot of one source sorted by (data, id); a window or a keyset page
+    # is two binary searches plus a slice.
+
+    def __init__(self, itens: List[Vencimento]) -> None:
+        self.itens = sorted(itens, key=lambda item: (item.data, item.id))
+        self.chaves = [(item.data, item.id) for item in self.itens]
+
+    def intervalo(self, inicio: date, fim: date) -> Tuple[int, int]:
+        # Inclusive on both dates; (d,) sorts before every (d, id).
+        return bisect_left(self.chaves, (inicio,)), bisect_left(self.chaves, (fim + timedelta(days=1),))
+
+    def depois(self, chave: Tuple[date, int]) -> int:
+        return bisect_right(self.chaves, chave)
+
+
+def paginar(
+    indice: IndiceVencimentos, inicio: date, fim: date, limit: int, cursor: str | None = None
+) -> Tuple[List[Vencimento], Pagina]:
+    # Same cursors and semantics as pagination.buscar_pagina over (data, id).
+    baixo, alto = indice.intervalo(inicio, fim)
+    total = alto - baixo if cursor is None else None
+    if cursor:
+        baixo = max(baixo, indice.depois(tuple(decodificar_cursor(cursor, CHAVES))))
+    itens = indice.itens[baixo:min(alto, baixo + limit)]
+    proximo = None
+    if baixo + limit < alto:
+        proximo = codificar_cursor([itens[-1].data, itens[-1].id])
+    return itens, Pagina(limite=limit, total=total, proximo_cursor=proximo)
+
+
+def paginar_geral(
+    indices: Dict[str, IndiceVencimentos], inicio: date, fim: date, limit: int, cursor: str | None = None
+) -> Tuple[List[Vencimento], Dict[str, int] | None, Pagina]:
+    intervalos = {tipo: indice.intervalo(inicio, fim) for tipo, indice in indices.items()}
+    totais = {tipo: alto - baixo for tipo, (baixo, alto) in intervalos.items()} if cursor is None else None
+    if cursor:
+        data, tipo_cursor, id_cursor = decodificar_cursor(cursor, CHAVES_GERAL)
+        for tipo, indice in indices.items():
+            baixo, alto = intervalos[tipo]
+            # Past the cursor: later dates; on the cursor date, types after it, and the
+            # cursor's own type only above its id.
+            if tipo < tipo_cursor:
+                limite = indice.depois((data, float("inf")))
+            elif tipo == tipo_cursor:
+                limite = indice.depois((data, id_cursor))
+            else:
+                limite = bisect_left(indice.chaves, (data,))
+            intervalos[tipo] = (max(baixo, limite), alto)
+
+    # Each source contributes at most limit + 1 items; merging them is tiny next to the index.
+    candidatos = [
+        item
+        for tipo, (baixo, alto) in intervalos.items()
+        for item in indices[tipo].itens[baixo:min(alto, baixo + limit + 1)]
+    ]
+    candidatos.sort(key=lambda item: (item.data, item.tipo, item.id))
+    itens = candidatos[:limit]
+    proximo = None
+    if len(candidatos) > limit:
+        proximo = codificar_cursor([itens[-1].data, itens[-1].tipo, itens[-1].id])
+    total = None if totais is None else sum(totais.values())
+    return itens, totais, Pagina(limite=limit, total=total, proximo_cursor=proximo)
+
+
+class IndicesVencimentos:
+    def __init__(self) -> None:
+        self._indices: Dict[str, IndiceVencimentos] = {}
+        self._assinaturas: Dict[str, Tuple[str, ...]] = {}
+        self._verificado_em: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self._versao = ""
+
+    def versao(self) -> str:
+        return self._versao
+
+    async def _carregar(self, session: AsyncSession, fonte: FonteVencimentos) -> None:
+        inicio = time.perf_counter()
+        result = await session.execute(text(fonte.carga), {"desde": datetime.utcnow().date() - RETROATIVO})
+        itens = [
+            Vencimento(
+                tipo=fonte.tipo,
+                id=int(row.id),
+                data=_data(row.data),
+                descricao=str(row.descricao if row.descricao is not None else "-"),
+                detalhe=None if row.detalhe is None else str(row.detalhe),
+                valor=None if row.valor is None else float(row.valor),
+                situacao=row.situacao,
+            )
+            for row in result.all()
+            if row.data is not None
+        ]
+        self._indices[fonte.tipo] = IndiceVencimentos(itens)
+        logger.info(
+            "Índice de vencimentos %s carregado: %d item(ns) em %.0f ms",
+            fonte.tipo,
+            len(itens),
+            (time.perf_counter() - inicio) * 1000,
+        )
+
+    async def indices(self, session: AsyncSession, tipos: Sequence[str] = TIPOS) -> Dict[str, IndiceVencimentos]:
+        # Loaded on first use; afterwards the source signature is checked at most every
+        # VENCIMENTOS_REFRESH_INTERVAL seconds and the source reloaded only when it moved.
+        async with self._lock:
+            agora = time.monotonic()
+            for fonte in FONTES:
+                if fonte.tipo not in tipos:
+                    continue
+                verificado = self._verificado_em.get(fonte.tipo)
+                if verificado is not None and agora - verificado < settings.vencimentos_refresh_interval:
+                    continue
+                assinatura = tuple(str(valor) for valor in (await session.execute(text(fonte.assinatura))).one())
+                # An index loaded days ago still holds every row a window from today can
+                # ask for (its look-back only reaches further), so age alone is no reason to reload.
+                if fonte.tipo not in self._indices or assinatura != self._assinaturas.get(fonte.tipo):
+                    await self._carregar(session, fonte)
+                    self._assinaturas[fonte.tipo] = assinatura
+                    self._versao = hashlib.sha1(repr(sorted(self._assinaturas.items())).encode("utf-8")).hexdigest()
+                self._verificado_em[fonte.tipo] = agora
+            return {tipo: self._indices[tipo] for tipo in tipos}
+
+    async def indice(self, session: AsyncSession, tipo: str) -> IndiceVencimentos:
+        return (await self.indices(session, (tipo,)))[tipo]
+
+
+indices_vencimentos = IndicesVencimentos()
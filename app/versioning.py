@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# After a failed probe the route is served without an ETag for this long before the
+# probe is tried again, instead of failing on every request.
+SUSPENSAO_SONDA = 300
+
+
+@dataclass(frozen=True)
+class Sonda:
+    tabela: str
+    # MAX over the AUTO_INCREMENT primary key reads a single index entry.
+    expressao: str = "MAX(id)"
+
+
+class VersaoDados:
+    # Every probe is a scalar subquery of one SELECT, so a revalidation costs a single
+    # round-trip. Local versions (e.g. the in-memory cube) are mixed in for routes that
+    # may answer from a snapshot instead of the tables themselves.
+
+    def __init__(self, *sondas: Sonda | str, locais: Sequence[Callable[[], str]] = ()) -> None:
+        self.sondas: Tuple[Sonda, ...] = tuple(
+            sonda if isinstance(sonda, Sonda) else Sonda(sonda) for sonda in dict.fromkeys(sondas)
+        )
+        self.locais = tuple(locais)
+        self.sql = "SELECT " + ", ".join(
+            f"(SELECT {sonda.expressao} FROM {sonda.tabela}) AS v{indice}" for indice, sonda in enumerate(self.sondas)
+        )
+        self._falhou = False
+        self._suspensa_ate = 0.0
+
+    async def token(self, session: AsyncSession, endpoint: str, params: Tuple[Tuple[str, Any], ...]) -> str | None:
+        valores: Tuple[Any, ...] = ()
+        if self.sondas:
+            if time.monotonic() < self._suspensa_ate:
+                return None
+            try:
+                valores = tuple((await session.execute(text(self.sql))).one())
+            except SQLAlchemyError:
+                # A source without the probed column must not break the route: it is
+                # served without an ETag, exactly as before.
+                if not self._falhou:
+                    logger.warning("Sonda de versão de %s falhou; rota servida sem ETag", endpoint, exc_info=True)
+                    self._falhou = True
+                self._suspensa_ate = time.monotonic() + SUSPENSAO_SONDA
+                return None
+        partes = (endpoint, params, tuple(str(valor) for valor in valores), tuple(local() for local in self.locais))
+        partes += (_janela(),)
+        return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()[:20]
+
+
+def _janela() -> int:
+    # MAX(id) only sees inserts; updates and deletes reach the clients at the latest
+    # when this window rolls over.
+    if settings.etag_max_age <= 0:
+        return 0
+    return int(time.time() // settings.etag_max_age)
+
+
+def etag_confere(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): compression may rewrite the representation.
+    alvo = etag.removeprefix("W/")
+    return any(
+        candidato.strip() == "*" or candidato.strip().removeprefix("W/") == alvo
+        for candidato in if_none_match.split(",")
+    )
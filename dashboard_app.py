@@ -1,13 +1,16 @@
 import asyncio
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from dash import Dash, Input, Output, dash_table, dcc, html
 from dotenv import load_dotenv
 import plotly.express as px
 
+from app.config import settings
 from app.database import SessionLocal
+from app.loop_bridge import background_loop
 from app.routers.dashboard_licitacoes_contratos import (
     get_contratos_proximos_vencimentos as fetch_contratos_proximos_vencimentos,
     get_licitacoes_resumo as fetch_licitacoes_resumo,
@@ -21,6 +24,7 @@ from app.routers.dashboard_receita_despesa import (
     get_despesa_resumo as fetch_despesa_resumo,
     get_receita_resumo as fetch_receita_resumo,
 )
+from app.services.cubo_colunar import cubo_colunar
 
 env_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(env_path)
@@ -42,40 +46,80 @@ def format_number(valor: Optional[float]) -> str:
     return formatted
 
 
+# Last payload of each route/arguments pair with the data version it was built from;
+# the Dash side of If-None-Match. Only touched from the background loop thread; the
+# least recently used pairs go first once MAX_ULTIMAS_RESPOSTAS is reached.
+MAX_ULTIMAS_RESPOSTAS = 256
+_ultimas_respostas: "OrderedDict[Tuple[Any, ...], Tuple[str, Any]]" = OrderedDict()
+
+
 async def _fetch_with_session(async_fn, **kwargs) -> Dict[str, Any]:
+    chave = (async_fn.__module__, async_fn.__qualname__, tuple(sorted(kwargs.items())))
+    data_version = getattr(async_fn, "data_version", None)
     async with SessionLocal() as session:
+        versao = await data_version(session=session, **kwargs) if data_version else None
+        anterior = _ultimas_respostas.get(chave)
+        if versao is not None and anterior is not None and anterior[0] == versao:
+            _ultimas_respostas.move_to_end(chave)
+            return anterior[1]
         result = await async_fn(session=session, **kwargs)
     if hasattr(result, "model_dump"):
-        return result.model_dump()
+        result = result.model_dump()
+    if versao is not None:
+        _ultimas_respostas[chave] = (versao, result)
+        _ultimas_respostas.move_to_end(chave)
+        while len(_ultimas_respostas) > MAX_ULTIMAS_RESPOSTAS:
+            _ultimas_respostas.popitem(last=False)
     return result
 
 
+Fetch = Tuple[Callable[..., Awaitable[Any]], Dict[str, Any]]
+
+
+async def _gather_fetches(fetches: Dict[str, Fetch]) -> Dict[str, Any]:
+    # Each fetch runs on its own pooled session; failures come back as values so a
+    # broken panel does not take the rest of the callback down with it.
+    resultados = await asyncio.gather(
+        *(_fetch_with_session(async_fn, **kwargs) for async_fn, kwargs in fetches.values()),
+        return_exceptions=True,
+    )
+    return dict(zip(fetches, resultados))
+
+
+def fetch_many(**fetches: Fetch) -> Dict[str, Any]:
+    return background_loop.run(_gather_fetches(fetches))
+
+
+def fetch_failed(result: Any) -> bool:
+    return isinstance(result, BaseException)
+
+
 def get_overview(ano: Optional[int] = None) -> Any:
-    return asyncio.run(_fetch_with_session(get_dashboard_overview, ano=ano))
+    return background_loop.run(_fetch_with_session(get_dashboard_overview, ano=ano))
 
 
 def get_receita_resumo(ano: int) -> Any:
-    return asyncio.run(_fetch_with_session(fetch_receita_resumo, ano=ano))
+    return background_loop.run(_fetch_with_session(fetch_receita_resumo, ano=ano))
 
 
 def get_despesa_resumo(ano: int) -> Any:
-    return asyncio.run(_fetch_with_session(fetch_despesa_resumo, ano=ano))
+    return background_loop.run(_fetch_with_session(fetch_despesa_resumo, ano=ano))
 
 
 def get_licitacoes_resumo(ano: int) -> Any:
-    return asyncio.run(_fetch_with_session(fetch_licitacoes_resumo, ano=ano))
+    return background_loop.run(_fetch_with_session(fetch_licitacoes_resumo, ano=ano))
 
 
 def get_contratos_proximos_vencimentos(dias: int) -> Any:
-    return asyncio.run(_fetch_with_session(fetch_contratos_proximos_vencimentos, dias=dias))
+    return background_loop.run(_fetch_with_session(fetch_contratos_proximos_vencimentos, dias=dias))
 
 
 def get_obras_resumo() -> Any:
-    return asyncio.run(_fetch_with_session(fetch_obras_resumo))
+    return background_loop.run(_fetch_with_session(fetch_obras_resumo))
 
 
 def get_convenios_resumo() -> Any:
-    return asyncio.run(_fetch_with_session(fetch_convenios_resumo))
+    return background_loop.run(_fetch_with_session(fetch_convenios_resumo))
 
 
 def card_component(titulo: str, valor: str) -> html.Div:
@@ -356,37 +400,52 @@ def update_financeiro(ano: Optional[int]):
     if not ano:
         return px.bar(title="Receita mensal"), px.bar(title="Despesa mensal"), error_alert("Selecione um ano válido.")
 
-    try:
-        receita = get_receita_resumo(ano)
-        despesa = get_despesa_resumo(ano)
-    except Exception as exc:  # noqa: BLE001
-        alert = error_alert(f"Erro ao buscar dados financeiros: {exc}")
-        return px.bar(title="Receita mensal"), px.bar(title="Despesa mensal"), alert
-
-    receita_mensal = [
-        {"Mês": build_month_label(item.get("mes", 0)), "Valor": item.get("receita_realizada_mes", 0)}
-        for item in receita.get("serie_mensal", [])
-    ]
-    despesa_mensal = [
-        {"Mês": build_month_label(item.get("mes", 0)), "Empenhado": item.get("empenhado", 0), "Pago": item.get("pago", 0)}
-        for item in despesa.get("serie_mensal", [])
-    ]
+    resultados = fetch_many(
+        receita=(fetch_receita_resumo, {"ano": ano}),
+        despesa=(fetch_despesa_resumo, {"ano": ano}),
+    )
+    receita, despesa = resultados["receita"], resultados["despesa"]
+
+    cards = []
+    if fetch_failed(receita):
+        fig_receita = px.bar(title=f"Receita mensal - erro: {receita}")
+        cards.append(error_alert(f"Erro ao buscar receitas: {receita}"))
+    else:
+        receita_mensal = [
+            {"Mês": build_month_label(item.get("mes", 0)), "Valor": item.get("receita_realizada_mes", 0)}
+            for item in receita.get("serie_mensal", [])
+        ]
+        fig_receita = build_bar_figure(receita_mensal, x="Mês", y="Valor", title="Receita mensal")
+        cards.extend(
+            [
+                card_component("Receita prevista", format_currency(receita.get("receita_prevista"))),
+                card_component("Receita realizada", format_currency(receita.get("receita_realizada"))),
+            ]
+        )
 
-    fig_receita = build_bar_figure(receita_mensal, x="Mês", y="Valor", title="Receita mensal")
-    fig_despesa = build_bar_figure(despesa_mensal, x="Mês", y="Empenhado", title="Despesa mensal (empenhado vs pago)")
-    if despesa_mensal:
-        fig_despesa.add_bar(x=[item["Mês"] for item in despesa_mensal], y=[item.get("Pago", 0) for item in despesa_mensal], name="Pago")
-        fig_despesa.update_layout(barmode="group")
+    if fetch_failed(despesa):
+        fig_despesa = px.bar(title=f"Despesa mensal - erro: {despesa}")
+        cards.append(error_alert(f"Erro ao buscar despesas: {despesa}"))
+    else:
+        despesa_mensal = [
+            {"Mês": build_month_label(item.get("mes", 0)), "Empenhado": item.get("empenhado", 0), "Pago": item.get("pago", 0)}
+            for item in despesa.get("serie_mensal", [])
+        ]
+        fig_despesa = build_bar_figure(despesa_mensal, x="Mês", y="Empenhado", title="Despesa mensal (empenhado vs pago)")
+        if despesa_mensal:
+            fig_despesa.add_bar(x=[item["Mês"] for item in despesa_mensal], y=[item.get("Pago", 0) for item in despesa_mensal], name="Pago")
+            fig_despesa.update_layout(barmode="group")
+        cards.extend(
+            [
+                card_component("Dotação atualizada", format_currency(despesa.get("dotacao_atualizada"))),
+                card_component("Despesa empenhada", format_currency(despesa.get("empenhado"))),
+                card_component("Despesa liquidada", format_currency(despesa.get("liquidado"))),
+                card_component("Despesa paga", format_currency(despesa.get("pago"))),
+            ]
+        )
 
     total_cards = html.Div(
-        [
-            card_component("Receita prevista", format_currency(receita.get("receita_prevista"))),
-            card_component("Receita realizada", format_currency(receita.get("receita_realizada"))),
-            card_component("Dotação atualizada", format_currency(despesa.get("dotacao_atualizada"))),
-            card_component("Despesa empenhada", format_currency(despesa.get("empenhado"))),
-            card_component("Despesa liquidada", format_currency(despesa.get("liquidado"))),
-            card_component("Despesa paga", format_currency(despesa.get("pago"))),
-        ],
+        cards,
         style={"display": "grid", "gridTemplateColumns": "repeat(auto-fit, minmax(220px, 1fr))", "gap": "12px"},
     )
 
@@ -396,39 +455,49 @@ def update_financeiro(ano: Optional[int]):
 @app.callback(
     Output("licitacoes-status-graph", "figure"),
     Output("licitacoes-modalidade-graph", "figure"),
-    Output("contratos-table", "data"),
     Input("ano-input", "value"),
 )
 def update_licitacoes(ano: Optional[int]):
     if not ano:
-        return px.bar(title="Licitações por status"), px.bar(title="Licitações por modalidade"), []
+        return px.bar(title="Licitações por status"), px.bar(title="Licitações por modalidade")
 
     try:
         licitacoes = get_licitacoes_resumo(ano)
-        contratos = get_contratos_proximos_vencimentos(90)
     except Exception as exc:  # noqa: BLE001
-        alert_fig = px.bar(title=f"Erro: {exc}")
-        return alert_fig, alert_fig, []
+        return (
+            px.bar(title=f"Licitações por status - erro: {exc}"),
+            px.bar(title=f"Licitações por modalidade - erro: {exc}"),
+        )
 
     status_data = licitacoes.get("quantidade_processos_por_status", [])
     modalidade_data = licitacoes.get("quantidade_por_modalidade", [])
-
     fig_status = build_bar_figure(status_data, x="status", y="quantidade", title="Licitações por status")
     fig_modalidade = build_bar_figure(modalidade_data, x="modalidade", y="quantidade", title="Licitações por modalidade")
+    return fig_status, fig_modalidade
 
-    contratos_data = []
-    for contrato in contratos.get("contratos", []):
-        contratos_data.append(
-            {
-                "numero": contrato.get("numero"),
-                "fornecedor": contrato.get("fornecedor"),
-                "data_fim": contrato.get("data_fim"),
-                "valor": format_currency(contrato.get("valor")),
-                "status": contrato.get("status"),
-            }
-        )
 
-    return fig_status, fig_modalidade, contratos_data
+# The expiry window does not depend on the year, so the table loads with the tab
+# instead of again on every year change.
+@app.callback(Output("contratos-table", "data"), Input("tabs", "value"))
+def update_contratos(tab_value: str):
+    if tab_value != "licitacoes":
+        return []
+
+    try:
+        contratos = get_contratos_proximos_vencimentos(90)
+    except Exception as exc:  # noqa: BLE001
+        return [{"numero": "-", "fornecedor": f"Erro ao buscar contratos: {exc}"}]
+
+    return [
+        {
+            "numero": contrato.get("numero"),
+            "fornecedor": contrato.get("fornecedor"),
+            "data_fim": contrato.get("data_fim"),
+            "valor": format_currency(contrato.get("valor")),
+            "status": contrato.get("status"),
+        }
+        for contrato in contratos.get("contratos", [])
+    ]
 
 
 @app.callback(
@@ -442,55 +511,59 @@ def update_obras_convenios(tab_value: str):
     if tab_value != "obras":
         return px.bar(title="Obras por situação"), [], px.bar(title="Convênios por órgão repassador"), []
 
-    try:
-        obras = get_obras_resumo()
-        convenios = get_convenios_resumo()
-    except Exception as exc:  # noqa: BLE001
-        alert_fig = px.bar(title=f"Erro: {exc}")
-        return alert_fig, [], alert_fig, []
-
-    obras_data = obras.get("qtde_obras_por_situacao", [])
-    obras_fig = build_bar_figure(
-        obras_data,
-        x="situacao",
-        y="quantidade",
-        title="Obras por situação",
-        labels={"situacao": "Situação", "quantidade": "Quantidade"},
+    resultados = fetch_many(
+        obras=(fetch_obras_resumo, {}),
+        convenios=(fetch_convenios_resumo, {}),
     )
+    obras, convenios = resultados["obras"], resultados["convenios"]
 
-    obras_atrasadas = obras.get("obras_atrasadas", [])
     obras_atrasadas_data = []
-    for obra in obras_atrasadas:
-        obras_atrasadas_data.append(
-            {
-                "id": obra.get("id"),
-                "descricao": obra.get("descricao"),
-                "data_fim_prevista": obra.get("data_fim_prevista"),
-                "situacao": obra.get("situacao"),
-            }
+    if fetch_failed(obras):
+        obras_fig = px.bar(title=f"Obras por situação - erro: {obras}")
+    else:
+        obras_data = obras.get("qtde_obras_por_situacao", [])
+        obras_fig = build_bar_figure(
+            obras_data,
+            x="situacao",
+            y="quantidade",
+            title="Obras por situação",
+            labels={"situacao": "Situação", "quantidade": "Quantidade"},
         )
-
-    convenios_orgaos = convenios.get("qtde_convenios_por_orgao_repassador", [])
-    convenios_fig = build_bar_figure(
-        convenios_orgaos,
-        x="orgao_repassador",
-        y="quantidade",
-        title="Convênios por órgão repassador",
-        labels={"orgao_repassador": "Órgão repassador", "quantidade": "Quantidade"},
-    )
+        for obra in obras.get("obras_atrasadas", []):
+            obras_atrasadas_data.append(
+                {
+                    "id": obra.get("id"),
+                    "descricao": obra.get("descricao"),
+                    "data_fim_prevista": obra.get("data_fim_prevista"),
+                    "situacao": obra.get("situacao"),
+                }
+            )
 
     convenios_risco_data = []
-    for convenio in convenios.get("convenios_em_risco", []):
-        convenios_risco_data.append(
-            {
-                "descricao": convenio.get("descricao"),
-                "percentual_execucao_financeira": f"{convenio.get('percentual_execucao_financeira', 0):.1f}%",
-                "risco": convenio.get("risco"),
-            }
+    if fetch_failed(convenios):
+        convenios_fig = px.bar(title=f"Convênios por órgão repassador - erro: {convenios}")
+    else:
+        convenios_orgaos = convenios.get("qtde_convenios_por_orgao_repassador", [])
+        convenios_fig = build_bar_figure(
+            convenios_orgaos,
+            x="orgao_repassador",
+            y="quantidade",
+            title="Convênios por órgão repassador",
+            labels={"orgao_repassador": "Órgão repassador", "quantidade": "Quantidade"},
         )
+        for convenio in convenios.get("convenios_em_risco", []):
+            convenios_risco_data.append(
+                {
+                    "descricao": convenio.get("descricao"),
+                    "percentual_execucao_financeira": f"{convenio.get('percentual_execucao_financeira', 0):.1f}%",
+                    "risco": convenio.get("risco"),
+                }
+            )
 
     return obras_fig, obras_atrasadas_data, convenios_fig, convenios_risco_data
 
 
 if __name__ == "__main__":
+    if settings.cubo_memoria_enabled:
+        background_loop.submit(cubo_colunar.refresh_periodically(settings.cubo_memoria_refresh_interval))
     app.run(debug=True, host="0.0.0.0", port=8050)
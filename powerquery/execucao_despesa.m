@@ -1,10 +1,27 @@
 let
-    Fonte = MySql.Database(
-        "SEU_SERVIDOR",
-        "gpdcoronelmurta",
-        [
-            Query = "SELECT * FROM vw_execucao_despesa_mensal;"
-        ]
+    // Atualização incremental: crie os parâmetros RangeStart e RangeEnd (Data/Hora) e defina a
+    // política na tabela (ex.: arquivar 10 anos, atualizar 1 mês, detectar alterações em
+    // atualizado_em). Sem Query nativa, o filtro abaixo é dobrado para o WHERE do MySQL e cada
+    // partição lê só os seus meses pelo índice de competencia.
+    Fonte = MySql.Database("SEU_SERVIDOR", "gpdcoronelmurta"),
+    Execucao = Fonte{[Schema = "gpdcoronelmurta", Item = "vw_execucao_despesa_mensal"]}[Data],
+    #"Linhas filtradas" = Table.SelectRows(
+        Execucao,
+        each [competencia] >= RangeStart and [competencia] < RangeEnd
+    ),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        #"Linhas filtradas",
+        {
+            {"ano", Int64.Type},
+            {"mes", Int64.Type},
+            {"orgao_id", Int64.Type},
+            {"dotacao", type number},
+            {"valor_empenhado", type number},
+            {"valor_liquidado", type number},
+            {"valor_pago", type number},
+            {"competencia", type datetime},
+            {"atualizado_em", type datetime}
+        }
     )
 in
-    Fonte
+    #"Tipos alterados"
\ No newline at end of file
@@ -0,0 +1,19 @@
+let
+    // Pasta gravada por "python -m app.services.snapshot_parquet" (SNAPSHOT_PARQUET_DIR)
+    Pasta = "SEU_CAMINHO\vw_acordos_parcelamento",
+    Arquivos = Folder.Files(Pasta),
+    ArquivosParquet = Table.SelectRows(Arquivos, each [Extension] = ".parquet"),
+    Particoes = Table.AddColumn(ArquivosParquet, "Dados", each Parquet.Document([Content])),
+    Fonte = Table.Combine(Particoes[Dados]),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        Fonte,
+        {
+            {"acordo_id", Int64.Type},
+            {"contribuinte_id", Int64.Type},
+            {"data_acordo", type date},
+            {"qtde_parcelas", Int64.Type},
+            {"valor_total", type number}
+        }
+    )
+in
+    #"Tipos alterados"
@@ -0,0 +1,20 @@
+let
+    // Pasta gravada por "python -m app.services.snapshot_parquet" (SNAPSHOT_PARQUET_DIR)
+    Pasta = "SEU_CAMINHO\vw_acordos_parcelas",
+    Arquivos = Folder.Files(Pasta),
+    ArquivosParquet = Table.SelectRows(Arquivos, each [Extension] = ".parquet"),
+    Particoes = Table.AddColumn(ArquivosParquet, "Dados", each Parquet.Document([Content])),
+    Fonte = Table.Combine(Particoes[Dados]),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        Fonte,
+        {
+            {"parcela_id", Int64.Type},
+            {"acordo_id", Int64.Type},
+            {"numero_parcela", Int64.Type},
+            {"data_vencimento", type date},
+            {"valor_parcela", type number},
+            {"situacao_atual", type text}
+        }
+    )
+in
+    #"Tipos alterados"
@@ -0,0 +1,28 @@
+let
+    // Pasta gravada por "python -m app.services.snapshot_parquet" (SNAPSHOT_PARQUET_DIR)
+    Pasta = "SEU_CAMINHO\vw_contratos_gestao",
+    Arquivos = Folder.Files(Pasta),
+    ArquivosParquet = Table.SelectRows(Arquivos, each [Extension] = ".parquet"),
+    Particoes = Table.AddColumn(ArquivosParquet, "Dados", each Parquet.Document([Content])),
+    Fonte = Table.Combine(Particoes[Dados]),
+    // dias_para_vencer depende da data de hoje e não vai para o snapshot; é recalculado aqui.
+    #"Dias para vencer" = Table.AddColumn(
+        Fonte,
+        "dias_para_vencer",
+        each Duration.Days([vigencia_fim] - Date.From(DateTime.LocalNow()))
+    ),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        #"Dias para vencer",
+        {
+            {"contrato_id", Int64.Type},
+            {"numero_contrato", type text},
+            {"processo_id", Int64.Type},
+            {"data_assinatura", type date},
+            {"vigencia_inicio", type date},
+            {"vigencia_fim", type date},
+            {"valor_total", type number},
+            {"dias_para_vencer", Int64.Type}
+        }
+    )
+in
+    #"Tipos alterados"
@@ -0,0 +1,23 @@
+let
+    // Pasta gravada por "python -m app.services.snapshot_parquet" (SNAPSHOT_PARQUET_DIR)
+    Pasta = "SEU_CAMINHO\vw_execucao_despesa_mensal",
+    Arquivos = Folder.Files(Pasta),
+    ArquivosParquet = Table.SelectRows(Arquivos, each [Extension] = ".parquet"),
+    Particoes = Table.AddColumn(ArquivosParquet, "Dados", each Parquet.Document([Content])),
+    Fonte = Table.Combine(Particoes[Dados]),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        Fonte,
+        {
+            {"ano", Int64.Type},
+            {"mes", Int64.Type},
+            {"orgao_id", Int64.Type},
+            {"dotacao", type number},
+            {"valor_empenhado", type number},
+            {"valor_liquidado", type number},
+            {"valor_pago", type number},
+            {"competencia", type datetime},
+            {"atualizado_em", type datetime}
+        }
+    )
+in
+    #"Tipos alterados"
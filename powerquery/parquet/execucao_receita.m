@@ -0,0 +1,22 @@
+let
+    // Pasta gravada por "python -m app.services.snapshot_parquet" (SNAPSHOT_PARQUET_DIR)
+    Pasta = "SEU_CAMINHO\vw_execucao_receita_mensal",
+    Arquivos = Folder.Files(Pasta),
+    ArquivosParquet = Table.SelectRows(Arquivos, each [Extension] = ".parquet"),
+    Particoes = Table.AddColumn(ArquivosParquet, "Dados", each Parquet.Document([Content])),
+    Fonte = Table.Combine(Particoes[Dados]),
+    #"Tipos alterados" = Table.TransformColumnTypes(
+        Fonte,
+        {
+            {"ano", Int64.Type},
+            {"mes", Int64.Type},
+            {"orgao_id", Int64.Type},
+            {"fonte_id", Int64.Type},
+            {"valor_previsto", type number},
+            {"valor_arrecadado", type number},
+            {"competencia", type datetime},
+            {"atualizado_em", type datetime}
+        }
+    )
+in
+    #"Tipos alterados"
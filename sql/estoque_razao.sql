@@ -0,0 +1,32 @@
+-- Razão de estoque do almoxarifado: movimento diário por produto com o saldo acumulado
+-- no fim de cada dia, mais o saldo atual. Mantido por `python -m app.services.estoque_razao`
+-- (ou pela tarefa periódica da API com ESTOQUE_RAZAO_REFRESH_INTERVAL > 0). As entradas
+-- são datadas pelo cabeçalho entrada_estoque (data_entrada) e as saídas por saida_estoque
+-- (data_saida); ajuste em app/services/estoque_razao.py conforme o schema real.
+
+CREATE TABLE IF NOT EXISTS estoque_movimento_diario (
+    produto_id INT NOT NULL,
+    data DATE NOT NULL,
+    entradas DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    saidas DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    saldo_acumulado DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (produto_id, data)
+);
+
+CREATE TABLE IF NOT EXISTS estoque_saldo (
+    produto_id INT NOT NULL PRIMARY KEY,
+    quantidade DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    atualizado_em DATETIME NOT NULL
+);
+
+-- Último id de entrada_item/saida_item já lançado no razão (marca d'água da carga incremental) e
+-- o MAX(id) observado em observado_em, até onde a marca avança depois de ESTOQUE_RAZAO_ATRASO
+-- segundos. Em uma instalação anterior: ALTER TABLE estoque_razao_controle ADD COLUMN id_observado
+-- BIGINT NOT NULL DEFAULT 0, ADD COLUMN observado_em DATETIME NULL;
+CREATE TABLE IF NOT EXISTS estoque_razao_controle (
+    origem VARCHAR(64) NOT NULL PRIMARY KEY,
+    ultimo_id BIGINT NOT NULL,
+    id_observado BIGINT NOT NULL DEFAULT 0,
+    observado_em DATETIME NULL,
+    atualizado_em DATETIME NOT NULL
+);
@@ -0,0 +1,18 @@
+-- Colunas usadas pela atualização incremental do Power BI (RangeStart/RangeEnd sobre
+-- competencia, "detectar alterações" sobre atualizado_em) e por /export/{view}/delta.
+-- Rode uma vez, antes de recriar vw_execucao_despesa_mensal e vw_execucao_receita_mensal.
+-- Linhas já existentes recebem o horário do ALTER em atualizado_em.
+
+ALTER TABLE execucao_despesa
+    ADD COLUMN competencia DATETIME
+        AS (CAST(DATE_ADD(MAKEDATE(ano, 1), INTERVAL mes - 1 MONTH) AS DATETIME)) STORED,
+    ADD COLUMN atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX ix_execucao_despesa_competencia (competencia),
+    ADD INDEX ix_execucao_despesa_atualizado_em (atualizado_em);
+
+ALTER TABLE execucao_receita
+    ADD COLUMN competencia DATETIME
+        AS (CAST(DATE_ADD(MAKEDATE(ano, 1), INTERVAL mes - 1 MONTH) AS DATETIME)) STORED,
+    ADD COLUMN atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX ix_execucao_receita_competencia (competencia),
+    ADD INDEX ix_execucao_receita_atualizado_em (atualizado_em);
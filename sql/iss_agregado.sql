@@ -0,0 +1,28 @@
+-- Agregado de notas de ISS por (ano, mês, contribuinte, atividade). Mantido por
+-- `python -m app.services.iss_agregado` (ou pela tarefa periódica da API com
+-- ISS_AGREGADO_REFRESH_INTERVAL > 0). Cada nota conta uma única vez, na atividade de menor
+-- ramo_id do contribuinte em economico_atividades (0 quando ele não tem atividade, e
+-- economico_id 0 para notas sem contribuinte); ajuste em app/services/iss_agregado.py
+-- conforme o schema real.
+
+CREATE TABLE IF NOT EXISTS iss_nota_mensal (
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    economico_id INT NOT NULL,
+    ramo_id INT NOT NULL,
+    quantidade_notas INT NOT NULL DEFAULT 0,
+    valor_total DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (ano, mes, economico_id, ramo_id)
+);
+
+-- Último id de nota_iss já agregado (marca d'água da carga incremental) e o MAX(id) observado
+-- em observado_em, até onde a marca avança depois de ISS_AGREGADO_ATRASO segundos. Em uma
+-- instalação anterior: ALTER TABLE iss_agregado_controle ADD COLUMN id_observado BIGINT NOT NULL
+-- DEFAULT 0, ADD COLUMN observado_em DATETIME NULL;
+CREATE TABLE IF NOT EXISTS iss_agregado_controle (
+    origem VARCHAR(64) NOT NULL PRIMARY KEY,
+    ultimo_id BIGINT NOT NULL,
+    id_observado BIGINT NOT NULL DEFAULT 0,
+    observado_em DATETIME NULL,
+    atualizado_em DATETIME NOT NULL
+);
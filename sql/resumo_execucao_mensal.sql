@@ -0,0 +1,56 @@
+-- Tabelas físicas com a execução de receita/despesa já agregada por mês.
+-- Mantidas por `python -m app.services.resumo_mensal` (ou pela tarefa periódica da API
+-- com RESUMO_MENSAL_REFRESH_INTERVAL > 0). Ajuste os tipos e as colunas de dimensão
+-- conforme o schema real de view_mov_rec, view_desp_executada e view_mov_pagamento.
+
+CREATE TABLE IF NOT EXISTS resumo_receita_mensal (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    orgao_id INT NULL,
+    origem_id INT NULL,
+    fonte_id INT NULL,
+    natureza_id INT NULL,
+    valor_arrecadado DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    KEY idx_resumo_receita_ano_mes (ano, mes)
+);
+
+CREATE TABLE IF NOT EXISTS resumo_despesa_mensal (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    orgao_id INT NULL,
+    funcao_id INT NULL,
+    programa_id INT NULL,
+    fonte_id INT NULL,
+    natureza_id INT NULL,
+    dotacao_atualizada DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    empenhado DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    liquidado DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    valor_pago DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    KEY idx_resumo_despesa_ano_mes (ano, mes)
+);
+
+CREATE TABLE IF NOT EXISTS resumo_pagamento_mensal (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    orgao_id INT NULL,
+    funcao_id INT NULL,
+    programa_id INT NULL,
+    fonte_id INT NULL,
+    natureza_id INT NULL,
+    valor_pago DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    KEY idx_resumo_pagamento_ano_mes (ano, mes)
+);
+
+-- Assinatura (contagem, somas e checksum das colunas) de cada mês da origem na última atualização;
+-- só os meses cuja assinatura mudou são recalculados.
+CREATE TABLE IF NOT EXISTS resumo_mensal_controle (
+    tabela VARCHAR(64) NOT NULL,
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    assinatura CHAR(40) NOT NULL,
+    atualizado_em DATETIME NOT NULL,
+    PRIMARY KEY (tabela, ano, mes)
+);
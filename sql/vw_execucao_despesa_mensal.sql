@@ -6,5 +6,7 @@ SELECT
     ed.dotacao,
     ed.valor_empenhado,
     ed.valor_liquidado,
-    ed.valor_pago
+    ed.valor_pago,
+    ed.competencia,
+    ed.atualizado_em
 FROM execucao_despesa ed;
\ No newline at end of file
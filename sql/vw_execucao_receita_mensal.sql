@@ -5,5 +5,7 @@ SELECT
     er.orgao_id,
     er.fonte_id,
     er.valor_previsto,
-    er.valor_arrecadado
+    er.valor_arrecadado,
+    er.competencia,
+    er.atualizado_em
 FROM execucao_receita er;
\ No newline at end of file
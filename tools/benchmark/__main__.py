@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+HOSTS_LOCAIS = {"localhost", "127.0.0.1", "::1"}
+
+
+def _configuracao_atual(chave: str) -> str | None:
+    return os.environ.get(chave) or dotenv_values(".env").get(chave)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    # Imported only after DB_NAME points at the benchmark schema.
+    from app.cache import response_cache
+    from app.config import settings
+    from app.database import SessionLocal, engine, warm_up_pool
+    from app.services.cubo_colunar import cubo_colunar
+    from app.main import app
+
+    from .runner import comparar, executar, rotas_registradas
+    from .seed import criar_banco, semear
+
+    response_cache.enabled = args.com_cache
+    anos = list(range(args.ano - args.anos + 1, args.ano + 1))
+    representativos = {"ano": args.ano, "anos": ",".join(map(str, anos)), "mes": args.mes, "dias": args.dias}
+    rotas, ignoradas = rotas_registradas(app, representativos)
+    for rota in ignoradas:
+        print(f"Rota ignorada: {rota}")
+
+    resultado = {
+        "gerado_em": datetime.utcnow().isoformat(timespec="seconds"),
+        "banco": f"{settings.db_host}:{settings.db_port}/{settings.db_name}",
+        "python": platform.python_version(),
+        "configuracao": {
+            "requisicoes": args.requisicoes,
+            "concorrencia": args.concorrencia,
+            "anos": anos,
+            "cache": args.com_cache,
+            "query_concurrency": settings.query_concurrency,
+            "db_pool_size": settings.db_pool_size,
+            "db_max_overflow": settings.db_max_overflow,
+            "resumo_mensal_enabled": settings.resumo_mensal_enabled,
+            "cubo_memoria_enabled": settings.cubo_memoria_enabled,
+        },
+        "execucoes": [],
+    }
+
+    try:
+        if not args.sem_semear:
+            await criar_banco()
+        for escala in args.escala:
+            linhas = None
+            if not args.sem_semear:
+                print(f"Semeando {settings.db_name} na escala {escala:g}x ({anos[0]}-{anos[-1]})")
+                linhas = await semear(escala, anos, args.semente)
+            await warm_up_pool(min(settings.db_pool_warmup or 1, settings.db_pool_size))
+            if settings.cubo_memoria_enabled:
+                # The ASGI transport skips the lifespan, so load the in-memory cube here.
+                async with SessionLocal() as session:
+                    await cubo_colunar.atualizar(session, anos=anos, forcar=True)
+            print(f"Medindo {len(rotas)} rota(s): {args.requisicoes} requisições, concorrência {args.concorrencia}")
+            medidas = await executar(app, rotas, args.requisicoes, args.concorrencia)
+            resultado["execucoes"].append(
+                {"escala": escala, "linhas_semeadas": linhas, "rotas": [asdict(medida) for medida in medidas]}
+            )
+    finally:
+        await engine.dispose()
+
+    args.saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultado gravado em {args.saida}")
+    if args.comparar:
+        comparar(json.loads(args.comparar.read_text(encoding="utf-8")), resultado)
+
+
+def main() -> None:
+    hoje = datetime.utcnow()
+    parser = argparse.ArgumentParser(
+        description="Semeia um banco local com dados sintéticos e mede todas as rotas GET da API."
+    )
+    parser.add_argument("--banco", default="modulo_gestor_bench", help="Schema MySQL usado no benchmark")
+    parser.add_argument(
+        "--escala", type=float, nargs="+", default=[1.0], help="Escalas a medir, ex.: --escala 1 10 100"
+    )
+    parser.add_argument("--requisicoes", type=int, default=50, help="Requisições por rota")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Requisições simultâneas por rota")
+    parser.add_argument("--ano", type=int, default=hoje.year, help="Último ano semeado e usado nas rotas")
+    parser.add_argument("--anos", type=int, default=3, help="Quantidade de anos semeados")
+    parser.add_argument("--mes", type=int, default=hoje.month, help="Mês usado nas rotas mensais")
+    parser.add_argument("--dias", type=int, default=90, help="Janela de vencimento de contratos")
+    parser.add_argument("--semente", type=int, default=42, help="Semente dos dados sintéticos")
+    parser.add_argument("--sem-semear", action="store_true", help="Reaproveita os dados já semeados")
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de respostas ligado")
+    parser.add_argument("--saida", type=Path, default=Path("benchmark_resultado.json"), help="Arquivo JSON gerado")
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior para comparação")
+    parser.add_argument(
+        "--permitir-host-remoto", action="store_true", help="Permite semear um servidor MySQL que não é local"
+    )
+    args = parser.parse_args()
+
+    # Seeding drops and recreates tables with the production names, so it must never
+    # run against the schema configured for the API.
+    if args.banco == _configuracao_atual("DB_NAME"):
+        parser.error("--banco não pode ser o mesmo banco configurado em DB_NAME")
+    host = _configuracao_atual("DB_HOST") or ""
+    if not args.sem_semear and host not in HOSTS_LOCAIS and not args.permitir_host_remoto:
+        parser.error(f"DB_HOST={host} não é local; use --permitir-host-remoto para semear mesmo assim")
+    os.environ["DB_NAME"] = args.banco
+
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
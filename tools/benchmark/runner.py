@@ -0,0 +1,197 @@
+import asyncio
+import math
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event, text
+
+from app.database import engine
+
+
+@dataclass
+class Rota:
+    path: str
+    params: Dict[str, Any]
+
+
+@dataclass
+class Amostra:
+    sql: int = 0
+    linhas: int = 0
+
+
+@dataclass
+class ResultadoRota:
+    path: str
+    params: Dict[str, Any]
+    requisicoes: int
+    concorrencia: int
+    status: Dict[str, int]
+    throughput_rps: float
+    latencia_ms: Dict[str, float]
+    sql_por_requisicao: float
+    linhas_retornadas_por_requisicao: float
+    linhas_lidas_por_requisicao: Optional[float] = None
+    erros: List[str] = field(default_factory=list)
+
+
+_amostra: ContextVar[Optional[Amostra]] = ContextVar("amostra_benchmark", default=None)
+
+# Storage-engine row reads; the sum over a single isolated request approximates the
+# rows MySQL had to scan to answer it.
+HANDLER_READ = "SHOW GLOBAL STATUS LIKE 'Handler_read%'"
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _contar_sql(_conn, cursor, _statement, _parameters, _context, _executemany) -> None:
+    amostra = _amostra.get()
+    if amostra is None:
+        return
+    amostra.sql += 1
+    if cursor.rowcount > 0:
+        amostra.linhas += cursor.rowcount
+
+
+def rotas_registradas(app: FastAPI, representativos: Dict[str, Any]) -> Tuple[List[Rota], List[str]]:
+    # The OpenAPI document lists every GET route included in app/main.py together
+    # with its query parameters, independently of how the routers were mounted.
+    rotas, ignoradas = [], []
+    for path, operacoes in app.openapi()["paths"].items():
+        operacao = operacoes.get("get")
+        if operacao is None:
+            continue
+        params, faltando = {}, []
+        for parametro in operacao.get("parameters", []):
+            nome = parametro["name"]
+            if parametro.get("in") != "query":
+                faltando.append(nome)
+            elif nome in representativos:
+                params[nome] = representativos[nome]
+            elif parametro.get("required"):
+                faltando.append(nome)
+        if faltando:
+            ignoradas.append(f"{path} (sem valor para {', '.join(faltando)})")
+            continue
+        rotas.append(Rota(path, params))
+    return rotas, ignoradas
+
+
+def percentil(ordenados: Sequence[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+async def _linhas_lidas() -> Optional[int]:
+    try:
+        async with engine.connect() as conexao:
+            result = await conexao.execute(text(HANDLER_READ))
+            return sum(int(row[1]) for row in result)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+async def _perfil_isolado(cliente: httpx.AsyncClient, rota: Rota) -> Optional[int]:
+    antes = await _linhas_lidas()
+    await cliente.get(rota.path, params=rota.params)
+    depois = await _linhas_lidas()
+    if antes is None or depois is None:
+        return None
+    return max(0, depois - antes)
+
+
+async def medir_rota(
+    cliente: httpx.AsyncClient, rota: Rota, requisicoes: int, concorrencia: int
+) -> ResultadoRota:
+    await cliente.get(rota.path, params=rota.params)  # aquecimento
+    linhas_lidas = await _perfil_isolado(cliente, rota)
+
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias: List[float] = []
+    amostras: List[Amostra] = []
+    status: Counter = Counter()
+    erros: List[str] = []
+
+    async def uma_requisicao() -> None:
+        async with semaforo:
+            amostra = Amostra()
+            token = _amostra.set(amostra)
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.get(rota.path, params=rota.params)
+                status[str(resposta.status_code)] += 1
+            except Exception as exc:  # noqa: BLE001
+                status["erro"] += 1
+                if len(erros) < 5:
+                    erros.append(repr(exc))
+            finally:
+                latencias.append(time.perf_counter() - inicio)
+                _amostra.reset(token)
+            amostras.append(amostra)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma_requisicao() for _ in range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+
+    ordenadas = sorted(latencias)
+    return ResultadoRota(
+        path=rota.path,
+        params=rota.params,
+        requisicoes=requisicoes,
+        concorrencia=concorrencia,
+        status=dict(status),
+        throughput_rps=round(requisicoes / duracao, 2) if duracao else 0.0,
+        latencia_ms={
+            "p50": round(percentil(ordenadas, 50) * 1000, 2),
+            "p95": round(percentil(ordenadas, 95) * 1000, 2),
+            "p99": round(percentil(ordenadas, 99) * 1000, 2),
+            "media": round(sum(ordenadas) / len(ordenadas) * 1000, 2),
+            "max": round(ordenadas[-1] * 1000, 2),
+        },
+        sql_por_requisicao=round(sum(a.sql for a in amostras) / len(amostras), 2),
+        linhas_retornadas_por_requisicao=round(sum(a.linhas for a in amostras) / len(amostras), 2),
+        linhas_lidas_por_requisicao=linhas_lidas,
+        erros=erros,
+    )
+
+
+async def executar(
+    app: FastAPI, rotas: Sequence[Rota], requisicoes: int, concorrencia: int
+) -> List[ResultadoRota]:
+    transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    resultados = []
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=None) as cliente:
+        for rota in rotas:
+            resultado = await medir_rota(cliente, rota, requisicoes, concorrencia)
+            resultados.append(resultado)
+            print(
+                f"  {rota.path:<45} {resultado.throughput_rps:>8.1f} req/s  "
+                f"p50 {resultado.latencia_ms['p50']:>8.1f} ms  p95 {resultado.latencia_ms['p95']:>8.1f} ms  "
+                f"p99 {resultado.latencia_ms['p99']:>8.1f} ms  sql {resultado.sql_por_requisicao:>5.1f}"
+            )
+    return resultados
+
+
+def comparar(anterior: Dict[str, Any], atual: Dict[str, Any]) -> None:
+    base = {
+        (execucao["escala"], rota["path"]): rota
+        for execucao in anterior.get("execucoes", [])
+        for rota in execucao["rotas"]
+    }
+    print("\nComparação com a execução anterior (p95 e throughput):")
+    for execucao in atual["execucoes"]:
+        for rota in execucao["rotas"]:
+            antes = base.get((execucao["escala"], rota["path"]))
+            if antes is None:
+                continue
+            p95_antes, p95_agora = antes["latencia_ms"]["p95"], rota["latencia_ms"]["p95"]
+            variacao = (p95_agora - p95_antes) / p95_antes * 100 if p95_antes else 0.0
+            print(
+                f"  {execucao['escala']:>5}x {rota['path']:<45} p95 {p95_antes:>8.1f} -> {p95_agora:>8.1f} ms "
+                f"({variacao:+.0f}%)  {antes['throughput_rps']:.1f} -> {rota['throughput_rps']:.1f} req/s"
+            )
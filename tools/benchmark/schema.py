@@ -0,0 +1,322 @@
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Synthetic stand-ins for the tables and views read by app/routers. Sizes are for a
+# small town (escala 1) and, for tables with por_ano=True, per year of data. Each
+# table grows with escala ** crescimento: facts grow linearly, catalogues do not.
+
+INT = "INT"
+VALOR = "DECIMAL(14, 2)"
+DATA = "DATE"
+TEXTO = "VARCHAR(120)"
+
+
+@dataclass
+class Contexto:
+    rng: random.Random
+    anos: Sequence[int]
+    totais: Dict[str, int] = field(default_factory=dict)
+
+    def ref(self, tabela: str) -> int:
+        return self.rng.randint(1, max(1, self.totais.get(tabela, 1)))
+
+    def valor(self, minimo: float, maximo: float) -> float:
+        return round(self.rng.uniform(minimo, maximo), 2)
+
+    def mes(self) -> int:
+        return self.rng.randint(1, 12)
+
+    def data(self, ano: int) -> date:
+        return date(ano, 1, 1) + timedelta(days=self.rng.randint(0, 364))
+
+    def escolha(self, opcoes: Sequence):
+        return self.rng.choice(opcoes)
+
+
+Gerador = Callable[[Contexto, int, int], Tuple]
+
+
+@dataclass(frozen=True)
+class TabelaSintetica:
+    nome: str
+    colunas: Tuple[Tuple[str, str], ...]
+    linhas: int
+    gerar: Gerador
+    por_ano: bool = True
+    crescimento: float = 1.0
+
+    def quantidade(self, escala: float, anos: int) -> int:
+        base = self.linhas * (anos if self.por_ano else 1)
+        return max(1, round(base * escala ** self.crescimento))
+
+    def ddl(self) -> str:
+        colunas = ",\n    ".join(f"{nome} {tipo}" for nome, tipo in self.colunas)
+        return f"CREATE TABLE {self.nome} (\n    id INT NOT NULL PRIMARY KEY,\n    {colunas}\n)"
+
+
+def _catalogo(nome: str, linhas: int, prefixo: str, crescimento: float = 0.0, coluna: str = "descricao"):
+    return TabelaSintetica(
+        nome,
+        ((coluna, TEXTO),),
+        linhas,
+        lambda ctx, ano, i: (f"{prefixo} {i}",),
+        por_ano=False,
+        crescimento=crescimento,
+    )
+
+
+def _fixo(nome: str, descricoes: Sequence[str]):
+    return TabelaSintetica(
+        nome,
+        (("descricao", TEXTO),),
+        len(descricoes),
+        lambda ctx, ano, i: (descricoes[(i - 1) % len(descricoes)],),
+        por_ano=False,
+        crescimento=0.0,
+    )
+
+
+STATUS_LICITACAO = ("em andamento", "publicado", "disputa", "homologado", "cancelado", "vigente")
+MODALIDADES = ("pregão eletrônico", "concorrência", "tomada de preços", "convite", "dispensa", "inexigibilidade")
+SITUACOES_OBRA = ("em execucao", "execução", "paralisada", "concluida", "planejada")
+TRIBUTOS = ("IPTU", "ISS", "Taxas", "ITBI", "Contribuição de melhoria")
+EVENTOS_RH = ("salario", "ferias", "licenca", "rescisao", "gratificacao", "adicional")
+NATUREZAS_BEM = ("Móveis", "Imóveis", "Veículos", "Equipamentos de TI", "Máquinas")
+REPASSADORES = ("União", "Estado", "FNDE", "FNS", "Emenda parlamentar")
+
+
+def _fatos_execucao(ctx: Contexto, ano: int) -> Tuple:
+    return (
+        ano,
+        ctx.mes(),
+        ctx.ref("orgao"),
+        ctx.ref("funcao"),
+        ctx.ref("programa"),
+        ctx.ref("fonte"),
+        ctx.ref("natureza"),
+    )
+
+
+def _despesa(ctx: Contexto, ano: int, _i: int) -> Tuple:
+    empenhado = ctx.valor(100, 50_000)
+    liquidado = round(empenhado * ctx.rng.uniform(0.6, 1.0), 2)
+    pago = round(liquidado * ctx.rng.uniform(0.7, 1.0), 2)
+    return _fatos_execucao(ctx, ano) + (round(empenhado * 1.1, 2), empenhado, liquidado, pago)
+
+
+def _contrato(ctx: Contexto, ano: int, i: int) -> Tuple:
+    inicio = ctx.data(ano)
+    fim = inicio + timedelta(days=ctx.rng.randint(90, 730))
+    valor = ctx.valor(5_000, 900_000)
+    return (f"{i}/{ano}", ctx.ref("fornecedor"), ctx.ref("licit_status"), inicio, fim, valor, valor)
+
+
+def _processo(ctx: Contexto, ano: int, _i: int) -> Tuple:
+    abertura = ctx.data(ano)
+    homologacao = abertura + timedelta(days=ctx.rng.randint(15, 120)) if ctx.rng.random() < 0.7 else None
+    return (ctx.ref("licit_status"), ctx.ref("licit_modalidade"), abertura, homologacao, ctx.valor(5_000, 1_500_000))
+
+
+def _protocolo(ctx: Contexto, ano: int, _i: int) -> Tuple:
+    criacao = ctx.data(ano)
+    conclusao = criacao + timedelta(days=ctx.rng.randint(1, 90)) if ctx.rng.random() < 0.8 else None
+    return (ctx.ref("prot_status"), ctx.ref("prot_assunto"), criacao, conclusao)
+
+
+def _esic(ctx: Contexto, ano: int, _i: int) -> Tuple:
+    pedido = ctx.data(ano)
+    resposta = pedido + timedelta(days=ctx.rng.randint(1, 40)) if ctx.rng.random() < 0.85 else None
+    return (pedido, resposta, 20)
+
+
+TABELAS: List[TabelaSintetica] = [
+    TabelaSintetica("orgao", (("descricao", TEXTO), ("nome", TEXTO)), 12,
+                    lambda ctx, ano, i: (f"Órgão {i}", f"Secretaria {i}"), por_ano=False, crescimento=0.0),
+    _catalogo("funcao", 10, "Função"),
+    _catalogo("programa", 40, "Programa", 0.3),
+    _catalogo("origem_receita", 8, "Origem"),
+    _catalogo("natureza", 60, "Natureza", 0.3),
+    _catalogo("fonte", 20, "Fonte"),
+    _fixo("licit_status", STATUS_LICITACAO),
+    _fixo("licit_modalidade", MODALIDADES),
+    _fixo("rh_vinculo", ("efetivo", "comissionado", "contratado", "estagiário", "agente político")),
+    _fixo("prot_status", ("aberto", "em análise", "deferido", "indeferido", "arquivado")),
+    _catalogo("prot_assunto", 40, "Assunto"),
+    _catalogo("fornecedor", 400, "Fornecedor", 1.0, coluna="nome"),
+    _catalogo("bairro", 30, "Bairro", 0.5, coluna="nome"),
+    _catalogo("ramopertinente", 50, "Ramo"),
+    _catalogo("economico", 800, "Empresa", 1.0, coluna="nome_fantasia"),
+    TabelaSintetica("economico_atividades", (("economico_id", INT), ("ramo_id", INT)), 1000,
+                    lambda ctx, ano, i: (ctx.ref("economico"), ctx.ref("ramopertinente")), por_ano=False),
+    _catalogo("produto", 600, "Produto", 0.5, coluna="nome"),
+    TabelaSintetica("veiculos", (("placa", TEXTO),), 60,
+                    lambda ctx, ano, i: (f"ABC{i:04d}",), por_ano=False, crescimento=0.7),
+    _catalogo("rota", 20, "Rota", 0.5, coluna="nome"),
+    # Receita e despesa
+    TabelaSintetica("receita_loa", (("ano", INT), ("natureza_id", INT), ("valor_previsto", VALOR)), 300,
+                    lambda ctx, ano, i: (ano, ctx.ref("natureza"), ctx.valor(1_000, 2_000_000)), crescimento=0.5),
+    TabelaSintetica("view_loa_desp", (("ano", INT), ("orgao_id", INT), ("dotacao_inicial", VALOR)), 300,
+                    lambda ctx, ano, i: (ano, ctx.ref("orgao"), ctx.valor(1_000, 2_000_000)), crescimento=0.5),
+    TabelaSintetica(
+        "view_mov_rec",
+        (("ano", INT), ("mes", INT), ("orgao_id", INT), ("origem_id", INT), ("fonte_id", INT),
+         ("natureza_id", INT), ("valor_arrecadado", VALOR)),
+        6000,
+        lambda ctx, ano, i: (ano, ctx.mes(), ctx.ref("orgao"), ctx.ref("origem_receita"), ctx.ref("fonte"),
+                             ctx.ref("natureza"), ctx.valor(10, 80_000)),
+    ),
+    TabelaSintetica(
+        "view_desp_executada",
+        (("ano", INT), ("mes", INT), ("orgao_id", INT), ("funcao_id", INT), ("programa_id", INT),
+         ("fonte_id", INT), ("natureza_id", INT), ("dotacao_atualizada", VALOR), ("empenhado", VALOR),
+         ("liquidado", VALOR), ("valor_pago", VALOR)),
+        8000,
+        _despesa,
+    ),
+    TabelaSintetica(
+        "view_mov_pagamento",
+        (("ano", INT), ("mes", INT), ("orgao_id", INT), ("funcao_id", INT), ("programa_id", INT),
+         ("fonte_id", INT), ("natureza_id", INT), ("valor_pago", VALOR)),
+        6000,
+        lambda ctx, ano, i: _fatos_execucao(ctx, ano) + (ctx.valor(50, 40_000),),
+    ),
+    TabelaSintetica("ts_conta_banc_saldo_ano", (("ano", INT), ("saldo_final", VALOR)), 40,
+                    lambda ctx, ano, i: (ano, ctx.valor(0, 3_000_000)), crescimento=0.5),
+    # Tributos e dívida ativa
+    TabelaSintetica("divida_ativa", (("ano_referencia", INT), ("tributo", TEXTO), ("valor_atualizado", VALOR)), 1000,
+                    lambda ctx, ano, i: (ano, ctx.escolha(TRIBUTOS), ctx.valor(50, 20_000))),
+    TabelaSintetica("divida_ativa_itens", (("divida_id", INT), ("valor", VALOR)), 2000,
+                    lambda ctx, ano, i: (ctx.ref("divida_ativa"), ctx.valor(10, 5_000))),
+    TabelaSintetica("duam_baixa", (("data_baixa", DATA), ("valor_pago", VALOR)), 1500,
+                    lambda ctx, ano, i: (ctx.data(ano), ctx.valor(10, 8_000))),
+    TabelaSintetica(
+        "acordo_parcelamento",
+        (("contribuinte_id", INT), ("data_acordo", DATA), ("qtde_parcelas", INT), ("valor_total", VALOR)),
+        100,
+        lambda ctx, ano, i: (ctx.ref("economico"), ctx.data(ano), ctx.rng.randint(2, 60), ctx.valor(200, 50_000)),
+    ),
+    TabelaSintetica("calculo_iptu_ano", (("ano", INT), ("valor_lancado", VALOR)), 4000,
+                    lambda ctx, ano, i: (ano, ctx.valor(80, 6_000))),
+    TabelaSintetica("view_bci_iptu", (("ano", INT), ("valor_pago", VALOR)), 3000,
+                    lambda ctx, ano, i: (ano, ctx.valor(80, 6_000))),
+    TabelaSintetica("view_iptu", (("ano", INT), ("bairro_id", INT), ("valor_pago", VALOR)), 3000,
+                    lambda ctx, ano, i: (ano, ctx.ref("bairro"), ctx.valor(80, 6_000))),
+    TabelaSintetica(
+        "iss_mensal",
+        (("ano", INT), ("mes", INT), ("economico_id", INT), ("valor_declarado", VALOR), ("valor_pago", VALOR)),
+        3000,
+        lambda ctx, ano, i: (ano, ctx.mes(), ctx.ref("economico"), ctx.valor(50, 30_000), ctx.valor(0, 30_000)),
+    ),
+    TabelaSintetica("nota_iss", (("economico_id", INT), ("data_emissao", DATA), ("valor_total", VALOR)), 8000,
+                    lambda ctx, ano, i: (ctx.ref("economico"), ctx.data(ano), ctx.valor(20, 25_000))),
+    # Licitações, contratos, obras e convênios
+    TabelaSintetica(
+        "licit_processo",
+        (("status_id", INT), ("modalidade_id", INT), ("data_abertura", DATA), ("data_homologacao", DATA),
+         ("valor_estimado", VALOR)),
+        250,
+        _processo,
+    ),
+    TabelaSintetica(
+        "licit_contrato",
+        (("numero", TEXTO), ("fornecedor_id", INT), ("status_id", INT), ("data_inicio", DATA), ("data_fim", DATA),
+         ("valor_contratado", VALOR), ("valor_global", VALOR)),
+        150,
+        _contrato,
+    ),
+    TabelaSintetica(
+        "obr_obra",
+        (("descricao", TEXTO), ("situacao", TEXTO), ("valor_total", VALOR), ("data_fim_prevista", DATA)),
+        20,
+        lambda ctx, ano, i: (f"Obra {i}", ctx.escolha(SITUACOES_OBRA), ctx.valor(50_000, 5_000_000), ctx.data(ano)),
+    ),
+    TabelaSintetica("obr_medicao", (("obra_id", INT), ("percentual_execucao", VALOR)), 130,
+                    lambda ctx, ano, i: (ctx.ref("obr_obra"), ctx.valor(0, 100))),
+    TabelaSintetica(
+        "cont_convenio",
+        (("descricao", TEXTO), ("orgao_repassador", TEXTO), ("valor_global", VALOR), ("data_fim_prevista", DATA)),
+        15,
+        lambda ctx, ano, i: (f"Convênio {i}", ctx.escolha(REPASSADORES), ctx.valor(50_000, 3_000_000),
+                             ctx.data(ano) + timedelta(days=365)),
+    ),
+    TabelaSintetica("ct_conv_movimento", (("convenio_id", INT), ("valor_pago", VALOR)), 200,
+                    lambda ctx, ano, i: (ctx.ref("cont_convenio"), ctx.valor(1_000, 200_000))),
+    # Patrimônio e almoxarifado
+    TabelaSintetica(
+        "patrimonio",
+        (
+            ("natureza", TEXTO),
+            ("valor_aquisicao", VALOR),
+            ("valor_residual", VALOR),
+            ("data_aquisicao", DATA),
+            ("data_baixa", DATA),
+            ("vida_util_meses", INT),
+            ("metodo_depreciacao", TEXTO),
+        ),
+        1700,
+        lambda ctx, ano, i: (
+            ctx.escolha(NATUREZAS_BEM),
+            ctx.valor(100, 300_000),
+            ctx.valor(0, 50),
+            ctx.data(ano),
+            ctx.data(ano + ctx.rng.randint(1, 8)) if ctx.rng.random() < 0.05 else None,
+            ctx.escolha((0, 60, 120, 240, 600)),
+            ctx.escolha(("linear", "linear", "linear", "saldo_decrescente", "soma_digitos")),
+        ),
+    ),
+    TabelaSintetica("patrimonio_responsavel", (("patrimonio_id", INT), ("orgao_id", INT)), 1700,
+                    lambda ctx, ano, i: (ctx.ref("patrimonio"), ctx.ref("orgao"))),
+    TabelaSintetica("ptr_depreciacao", (("patrimonio_id", INT), ("valor_depreciado", VALOR)), 6000,
+                    lambda ctx, ano, i: (ctx.ref("patrimonio"), ctx.valor(5, 5_000))),
+    TabelaSintetica("saida_estoque", (("orgao_id", INT), ("data_saida", DATA), ("valor_total", VALOR)), 2000,
+                    lambda ctx, ano, i: (ctx.ref("orgao"), ctx.data(ano), ctx.valor(10, 8_000))),
+    TabelaSintetica(
+        "saida_item",
+        (("saida_id", INT), ("produto_id", INT), ("quantidade", VALOR), ("valor_total", VALOR)),
+        8000,
+        lambda ctx, ano, i: (ctx.ref("saida_estoque"), ctx.ref("produto"), ctx.rng.randint(1, 50), ctx.valor(1, 2_000)),
+    ),
+    TabelaSintetica("entrada_estoque", (("data_entrada", DATA),), 1000,
+                    lambda ctx, ano, i: (ctx.data(ano),)),
+    TabelaSintetica("entrada_item", (("entrada_id", INT), ("produto_id", INT), ("quantidade", VALOR)), 4000,
+                    lambda ctx, ano, i: (ctx.ref("entrada_estoque"), ctx.ref("produto"), ctx.rng.randint(1, 200))),
+    # Frotas e transporte escolar
+    TabelaSintetica("ctrl_combustivel", (("veiculo_id", INT), ("data_abastecimento", DATA)), 2000,
+                    lambda ctx, ano, i: (ctx.ref("veiculos"), ctx.data(ano))),
+    TabelaSintetica(
+        "ctrl_combustivel_item",
+        (("ctrl_combustivel_id", INT), ("quantidade", VALOR), ("valor_total", VALOR), ("km_rodado", VALOR)),
+        2000,
+        lambda ctx, ano, i: (
+            ctx.ref("ctrl_combustivel"), ctx.valor(10, 150), ctx.valor(50, 900), ctx.valor(20, 800)
+        ),
+    ),
+    TabelaSintetica("viagens", (("veiculo_id", INT), ("data_viagem", DATA)), 3000,
+                    lambda ctx, ano, i: (ctx.ref("veiculos"), ctx.data(ano))),
+    TabelaSintetica("ctrl_licenciamento", (("veiculo_id", INT), ("data_vencimento", DATA)), 20,
+                    lambda ctx, ano, i: (ctx.ref("veiculos"), ctx.data(ano)), crescimento=0.7),
+    TabelaSintetica("transporte_escolar", (("ano", INT), ("rota_id", INT), ("alunos_atendidos", INT)), 1500,
+                    lambda ctx, ano, i: (ano, ctx.ref("rota"), ctx.rng.randint(5, 60))),
+    # Protocolo, e-SIC e RH
+    TabelaSintetica(
+        "prot_protocolo",
+        (("status_id", INT), ("assunto_id", INT), ("data_criacao", DATA), ("data_conclusao", DATA)),
+        3000,
+        _protocolo,
+    ),
+    TabelaSintetica(
+        "esic_registrar_pedidos", (("data_pedido", DATA), ("data_resposta", DATA), ("prazo_dias", INT)), 100, _esic
+    ),
+    TabelaSintetica("rh_calculo", (("ano", INT), ("mes", INT), ("valor_total", VALOR)), 4800,
+                    lambda ctx, ano, i: (ano, ctx.mes(), ctx.valor(1_400, 18_000))),
+    TabelaSintetica("rh_calculo_item", (("ano", INT), ("tipo_evento", TEXTO)), 15000,
+                    lambda ctx, ano, i: (ano, ctx.escolha(EVENTOS_RH))),
+    TabelaSintetica("dclrf", (("ano", INT), ("valor_rcl", VALOR)), 1,
+                    lambda ctx, ano, i: (ano, ctx.valor(40_000_000, 60_000_000)), crescimento=1.0),
+    TabelaSintetica("rh_funcionario", (("ano", INT), ("vinculo_id", INT)), 400,
+                    lambda ctx, ano, i: (ano, ctx.ref("rh_vinculo"))),
+    TabelaSintetica("funcionarios", (("ano", INT), ("orgao_id", INT)), 400,
+                    lambda ctx, ano, i: (ano, ctx.ref("orgao"))),
+]
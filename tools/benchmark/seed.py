@@ -0,0 +1,82 @@
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.services.estoque_razao import reconstruir as reconstruir_razao
+from app.services.iss_agregado import reconstruir as reconstruir_iss
+from app.services.resumo_mensal import RESUMOS, refresh_resumos
+
+from .schema import TABELAS, Contexto
+
+DDL_RESUMO = Path(__file__).resolve().parents[2] / "sql" / "resumo_execucao_mensal.sql"
+DDL_RAZAO = Path(__file__).resolve().parents[2] / "sql" / "estoque_razao.sql"
+RAZAO_TABELAS = ["estoque_movimento_diario", "estoque_saldo", "estoque_razao_controle"]
+DDL_ISS = Path(__file__).resolve().parents[2] / "sql" / "iss_agregado.sql"
+ISS_TABELAS = ["iss_nota_mensal", "iss_agregado_controle"]
+LOTE = 5_000
+
+
+async def criar_banco() -> None:
+    # The target schema may not exist yet, so connect to the server without a database.
+    servidor = create_async_engine(make_url(settings.database_url).set(database=None))
+    try:
+        async with servidor.begin() as conexao:
+            await conexao.execute(
+                text(f"CREATE DATABASE IF NOT EXISTS `{settings.db_name}` CHARACTER SET utf8mb4")
+            )
+    finally:
+        await servidor.dispose()
+
+
+def _comandos_ddl(caminho: Path) -> Sequence[str]:
+    sem_comentarios = re.sub(r"--[^\n]*", "", caminho.read_text(encoding="utf-8"))
+    return [comando.strip() for comando in sem_comentarios.split(";") if comando.strip()]
+
+
+async def semear(escala: float, anos: Sequence[int], semente: int = 42) -> Dict[str, int]:
+    ctx = Contexto(rng=random.Random(semente), anos=anos)
+    resumo_tabelas = [spec.tabela for spec in RESUMOS] + ["resumo_mensal_controle"]
+
+    async with engine.begin() as conexao:
+        for nome in [tabela.nome for tabela in TABELAS] + resumo_tabelas + RAZAO_TABELAS + ISS_TABELAS:
+            await conexao.execute(text(f"DROP TABLE IF EXISTS {nome}"))
+        for tabela in TABELAS:
+            await conexao.execute(text(tabela.ddl()))
+        for comando in [*_comandos_ddl(DDL_RESUMO), *_comandos_ddl(DDL_RAZAO), *_comandos_ddl(DDL_ISS)]:
+            await conexao.execute(text(comando))
+
+    for tabela in TABELAS:
+        inicio = time.perf_counter()
+        nomes = ["id"] + [nome for nome, _ in tabela.colunas]
+        insert = text(
+            f"INSERT INTO {tabela.nome} ({', '.join(nomes)}) VALUES ({', '.join(':' + nome for nome in nomes)})"
+        )
+        total = tabela.quantidade(escala, len(anos))
+        por_ano = -(-total // len(anos)) if tabela.por_ano else total
+        lote, proximo_id = [], 1
+        async with engine.begin() as conexao:
+            for ano in (anos if tabela.por_ano else [anos[-1]]):
+                for _ in range(min(por_ano, total - proximo_id + 1)):
+                    lote.append(dict(zip(nomes, (proximo_id,) + tabela.gerar(ctx, ano, proximo_id))))
+                    proximo_id += 1
+                    if len(lote) >= LOTE:
+                        await conexao.execute(insert, lote)
+                        lote = []
+            if lote:
+                await conexao.execute(insert, lote)
+        ctx.totais[tabela.nome] = proximo_id - 1
+        print(f"  {tabela.nome}: {proximo_id - 1} linha(s) em {time.perf_counter() - inicio:.1f}s")
+
+    async with SessionLocal() as session:
+        await refresh_resumos(session, forcar=True)
+        await reconstruir_razao(session)
+        await reconstruir_iss(session)
+    return dict(ctx.totais)
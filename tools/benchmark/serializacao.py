@@ -0,0 +1,127 @@
+import argparse
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+from app.responses import brotli, orjson
+from app.schemas.obras_convenios import ConvenioPorOrgao, ConveniosResumoResponse, ExecucaoFinanceiraConvenio
+from app.schemas.patrimonio_almoxarifado import AlmoxarifadoResponse, ConsumoResumo, EstoqueProduto
+
+
+def convenios(itens: int) -> ConveniosResumoResponse:
+    execucao = [
+        ExecucaoFinanceiraConvenio(
+            convenio_id=indice,
+            descricao=f"Convênio {indice:05d} - pavimentação e drenagem urbana",
+            percentual_execucao_financeira=round((indice * 37) % 10_000 / 100, 2),
+            risco="alto" if indice % 3 == 0 else "médio" if indice % 3 == 1 else "baixo",
+        )
+        for indice in range(itens)
+    ]
+    # As in the route, every convenio appears in the full list and the at-risk ones again.
+    return ConveniosResumoResponse(
+        qtde_convenios_por_orgao_repassador=[
+            ConvenioPorOrgao(orgao_repassador=f"Ministério {indice}", quantidade=indice, valor_global=indice * 1250.5)
+            for indice in range(25)
+        ],
+        percentual_execucao_financeira_por_convenio=execucao,
+        convenios_em_risco=[item for item in execucao if item.risco != "baixo"],
+    )
+
+
+def almoxarifado(itens: int) -> AlmoxarifadoResponse:
+    return AlmoxarifadoResponse(
+        mes=6,
+        ano=2025,
+        consumo_por_orgao_no_mes=[ConsumoResumo(item=f"Secretaria {indice}", valor=indice * 310.25) for indice in range(20)],
+        consumo_por_produto=[ConsumoResumo(item=f"Produto {indice:05d}", valor=indice * 3.5) for indice in range(itens)],
+        estoque_atual_por_produto=[
+            EstoqueProduto(produto=f"Produto {indice:05d} - material de consumo", quantidade=float(indice % 500))
+            for indice in range(itens)
+        ],
+    )
+
+
+PAYLOADS: Dict[str, Callable[[int], BaseModel]] = {
+    "/dashboard/convenios/resumo": convenios,
+    "/dashboard/almoxarifado/resumo": almoxarifado,
+}
+
+
+def serializadores(modelo: BaseModel) -> Dict[str, Callable[[], bytes]]:
+    adaptador = TypeAdapter(type(modelo))
+    caminhos = {
+        # JSONResponse after jsonable_encoder: FastAPI before the dump_json fast path,
+        # and today every route without a response_model.
+        "json": lambda: json.dumps(
+            jsonable_encoder(modelo), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"),
+        # What FastAPI does now for a route with a response_model.
+        "pydantic": lambda: adaptador.dump_json(adaptador.validate_python(modelo)),
+    }
+    if orjson is not None:
+        caminhos["orjson"] = lambda: orjson.dumps(modelo.model_dump())
+    return caminhos
+
+
+def compressores(gzip_level: int, brotli_quality: int) -> Dict[str, Callable[[bytes], bytes]]:
+    caminhos = {"identity": lambda corpo: corpo, "gzip": lambda corpo: gzip.compress(corpo, gzip_level)}
+    if brotli is not None:
+        caminhos["br"] = lambda corpo: brotli.compress(corpo, mode=brotli.MODE_TEXT, quality=brotli_quality)
+    return caminhos
+
+
+def _medir(funcao: Callable[[], Any], repeticoes: int) -> tuple[Any, float]:
+    resultado = funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def medir(itens: List[int], repeticoes: int, gzip_level: int, brotli_quality: int) -> List[Dict[str, Any]]:
+    linhas = []
+    for rota, gerar in PAYLOADS.items():
+        for quantidade in itens:
+            modelo = gerar(quantidade)
+            corpo = b""
+            for nome, serializar in serializadores(modelo).items():
+                corpo, ms = _medir(serializar, repeticoes)
+                linhas.append({"rota": rota, "itens": quantidade, "etapa": "serializacao", "metodo": nome,
+                               "bytes": len(corpo), "ms": round(ms, 3)})
+            for nome, comprimir in compressores(gzip_level, brotli_quality).items():
+                comprimido, ms = _medir(lambda: comprimir(corpo), repeticoes)
+                linhas.append({"rota": rota, "itens": quantidade, "etapa": "compressao", "metodo": nome,
+                               "bytes": len(comprimido), "ms": round(ms, 3)})
+    return linhas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mede bytes e tempo de serialização/compressão dos maiores payloads do dashboard."
+    )
+    parser.add_argument("--itens", type=int, nargs="+", default=[500, 5000], help="Convênios/produtos por payload")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Repetições por medida")
+    parser.add_argument("--gzip-level", type=int, default=6, help="Nível do gzip (COMPRESSION_GZIP_LEVEL)")
+    parser.add_argument("--brotli-quality", type=int, default=4, help="Qualidade do brotli (COMPRESSION_BROTLI_QUALITY)")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    linhas = medir(args.itens, args.repeticoes, args.gzip_level, args.brotli_quality)
+    if args.json:
+        print(json.dumps(linhas, indent=2))
+        return
+    print(f"{'rota':32} {'itens':>6} {'etapa':12} {'metodo':9} {'bytes':>10} {'ms':>9}")
+    for linha in linhas:
+        print(
+            f"{linha['rota']:32} {linha['itens']:>6} {linha['etapa']:12} {linha['metodo']:9} "
+            f"{linha['bytes']:>10} {linha['ms']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
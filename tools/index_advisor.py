@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import contextvars
+import inspect
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from pydantic.fields import FieldInfo
+from sqlalchemy import event, text
+
+from app import routers
+from app.cache import response_cache
+from app.database import SessionLocal, engine
+
+SAIDA_PADRAO = Path(__file__).resolve().parent.parent / "sql" / "indices_sugeridos.sql"
+
+_rota_atual: contextvars.ContextVar[str] = contextvars.ContextVar("rota_atual", default="-")
+
+_PLACEHOLDER = r"(?:%s|%\(\w+\)s|:\w+|\?)"
+_COLUNA = r"(?:(\w+)\.)?(\w+)"
+_PALAVRAS_RESERVADAS = {
+    "where", "join", "left", "right", "inner", "outer", "on", "group", "order", "limit", "as", "select",
+}
+
+
+@dataclass
+class ConsultaCapturada:
+    statement: str
+    parameters: Any
+    rotas: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AchadoExplain:
+    tabela: str
+    tipo_acesso: str
+    linhas: int
+    chave: Optional[str]
+    extra: str
+
+    @property
+    def problemas(self) -> List[str]:
+        problemas = []
+        if self.tipo_acesso == "ALL":
+            problemas.append("full scan")
+        elif self.tipo_acesso == "index":
+            problemas.append("full index scan")
+        if "Using filesort" in self.extra:
+            problemas.append("filesort")
+        if "Using temporary" in self.extra:
+            problemas.append("temporary")
+        return problemas
+
+
+@dataclass
+class SugestaoIndice:
+    tabela: str
+    colunas: Tuple[str, ...]
+    motivos: List[str] = field(default_factory=list)
+    rotas: List[str] = field(default_factory=list)
+
+    @property
+    def nome(self) -> str:
+        return f"idx_{self.tabela}_{'_'.join(self.colunas)}"[:64]
+
+
+@dataclass
+class AnaliseConsulta:
+    consulta: ConsultaCapturada
+    achados: List[AchadoExplain]
+    indices: List[SugestaoIndice]
+    reescritas: List[str]
+    observacoes: List[str]
+
+
+def _resolver_default(parametro: inspect.Parameter, representativos: Dict[str, Any]) -> Any:
+    if parametro.name in representativos:
+        return representativos[parametro.name]
+    default = parametro.default
+    if isinstance(default, FieldInfo):
+        if default.default_factory is not None:
+            return default.default_factory()
+        default = default.default
+    if default is inspect.Parameter.empty or repr(default) == "PydanticUndefined":
+        raise LookupError(parametro.name)
+    return default
+
+
+def rotas_dashboard() -> List[APIRoute]:
+    return [
+        rota
+        for nome in routers.__all__
+        for rota in getattr(routers, nome).router.routes
+        if isinstance(rota, APIRoute) and rota.path.startswith("/dashboard") and "GET" in rota.methods
+    ]
+
+
+async def coletar_consultas(representativos: Dict[str, Any]) -> "OrderedDict[str, ConsultaCapturada]":
+    consultas: "OrderedDict[str, ConsultaCapturada]" = OrderedDict()
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        chave = " ".join(statement.split())
+        consulta = consultas.setdefault(chave, ConsultaCapturada(statement=statement, parameters=parameters))
+        rota = _rota_atual.get()
+        if rota not in consulta.rotas:
+            consulta.rotas.append(rota)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capturar)
+    cache_habilitado = response_cache.enabled
+    response_cache.enabled = False
+    try:
+        for rota in rotas_dashboard():
+            try:
+                kwargs = {
+                    nome: _resolver_default(parametro, representativos)
+                    for nome, parametro in inspect.signature(rota.endpoint).parameters.items()
+                    if nome != "session"
+                }
+            except LookupError as exc:
+                print(f"[ignorado] {rota.path}: sem valor representativo para '{exc.args[0]}'")
+                continue
+
+            token = _rota_atual.set(rota.path)
+            try:
+                async with SessionLocal() as session:
+                    await rota.endpoint(session=session, **kwargs)
+            except Exception as exc:  # noqa: BLE001
+                print(f"[erro] {rota.path}: {exc}")
+            finally:
+                _rota_atual.reset(token)
+    finally:
+        response_cache.enabled = cache_habilitado
+        event.remove(engine.sync_engine, "before_cursor_execute", capturar)
+    return consultas
+
+
+async def executar_explain(consulta: ConsultaCapturada) -> List[AchadoExplain]:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql("EXPLAIN " + consulta.statement, consulta.parameters)
+        linhas = result.mappings().all()
+    return [
+        AchadoExplain(
+            tabela=str(linha.get("table") or "-"),
+            tipo_acesso=str(linha.get("type") or "-"),
+            linhas=int(linha.get("rows") or 0),
+            chave=linha.get("key"),
+            extra=str(linha.get("Extra") or ""),
+        )
+        for linha in linhas
+    ]
+
+
+def _mapa_aliases(sql: str) -> Dict[str, str]:
+    aliases: Dict[str, str] = {}
+    for tabela, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        aliases[tabela] = tabela
+        if alias and alias.lower() not in _PALAVRAS_RESERVADAS:
+            aliases[alias] = tabela
+    return aliases
+
+
+def _tabela_da_coluna(alias: str | None, aliases: Dict[str, str]) -> Optional[str]:
+    if alias:
+        return aliases.get(alias)
+    tabelas = set(aliases.values())
+    return next(iter(tabelas)) if len(tabelas) == 1 else None
+
+
+def _trecho(sql: str, inicio: str, fins: Sequence[str]) -> str:
+    match = re.search(rf"\b{inicio}\b(.*)", sql, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return ""
+    trecho = match.group(1)
+    for fim in fins:
+        trecho = re.split(rf"\b{fim}\b", trecho, flags=re.IGNORECASE)[0]
+    return trecho
+
+
+def _dividir_condicoes(where: str) -> List[str]:
+    partes, atual, nivel = [], [], 0
+    tokens = re.split(r"(\(|\)|\bAND\b)", where, flags=re.IGNORECASE)
+    for token in tokens:
+        if token == "(":
+            nivel += 1
+        elif token == ")":
+            nivel -= 1
+        if token.upper() == "AND" and nivel == 0:
+            condicao = "".join(atual)
+            # "x BETWEEN a AND b" is one predicate, not two.
+            if re.search(r"\bBETWEEN\b", condicao, re.IGNORECASE) and condicao.upper().count(" AND ") == 0:
+                atual.append(" AND ")
+                continue
+            partes.append(condicao.strip())
+            atual = []
+        else:
+            atual.append(token)
+    if "".join(atual).strip():
+        partes.append("".join(atual).strip())
+    return partes
+
+
+def analisar_sql(sql: str) -> Tuple[Dict[str, Dict[str, List[str]]], List[str], List[str]]:
+    """Classifies WHERE/GROUP BY/JOIN columns per table and lists non-sargable predicates."""
+    aliases = _mapa_aliases(sql)
+    colunas: Dict[str, Dict[str, List[str]]] = {}
+    reescritas: List[str] = []
+    observacoes: List[str] = []
+
+    def registrar(alias: str | None, coluna: str, tipo: str) -> None:
+        tabela = _tabela_da_coluna(alias, aliases)
+        if tabela is None:
+            return
+        destino = colunas.setdefault(tabela, {"igualdade": [], "intervalo": [], "agrupamento": [], "juncao": []})
+        if coluna not in destino[tipo]:
+            destino[tipo].append(coluna)
+
+    where = _trecho(sql, "WHERE", ("GROUP BY", "ORDER BY", "LIMIT", "HAVING"))
+    for condicao in _dividir_condicoes(where):
+        funcao_data = re.fullmatch(rf"(YEAR|MONTH)\({_COLUNA}\)\s*=\s*({_PLACEHOLDER}|\d+)", condicao, re.IGNORECASE)
+        if funcao_data:
+            funcao, alias, coluna, _ = funcao_data.groups()
+            referencia = f"{alias}.{coluna}" if alias else coluna
+            registrar(alias, coluna, "intervalo")
+            if funcao.upper() == "YEAR":
+                reescritas.append(
+                    f"{condicao}  ->  {referencia} >= :inicio_ano AND {referencia} < :inicio_ano_seguinte"
+                )
+            else:
+                reescritas.append(
+                    f"{condicao}  ->  {referencia} >= :inicio_mes AND {referencia} < :inicio_mes_seguinte "
+                    "(combine com o filtro de ano em um único intervalo)"
+                )
+            continue
+
+        like_lower = re.fullmatch(rf"LOWER\({_COLUNA}\)\s+LIKE\s+'%.*%'", condicao, re.IGNORECASE)
+        if like_lower:
+            alias, coluna = like_lower.groups()
+            referencia = f"{alias}.{coluna}" if alias else coluna
+            observacoes.append(
+                f"{condicao}: LIKE com curinga inicial não usa índice; normalize {referencia} em uma coluna de "
+                "código (ou coluna gerada) e compare por igualdade."
+            )
+            continue
+
+        igualdade = re.fullmatch(
+            rf"{_COLUNA}\s*(?:=\s*(?:{_PLACEHOLDER}|'[^']*'|\d+)|IN\s*\(.*\)|IS\s+(?:NOT\s+)?NULL)", condicao,
+            re.IGNORECASE | re.DOTALL,
+        )
+        if igualdade:
+            registrar(igualdade.group(1), igualdade.group(2), "igualdade")
+            continue
+
+        intervalo = re.fullmatch(rf"{_COLUNA}\s*(?:<=|>=|<|>|BETWEEN\b).*", condicao, re.IGNORECASE | re.DOTALL)
+        if intervalo:
+            registrar(intervalo.group(1), intervalo.group(2), "intervalo")
+            continue
+
+        if re.search(r"\w+\(\s*(?:\w+\.)?\w+", condicao):
+            observacoes.append(f"{condicao}: função aplicada à coluna impede o uso de índice.")
+
+    agrupamento = _trecho(sql, "GROUP BY", ("ORDER BY", "LIMIT", "HAVING"))
+    for alias, coluna in re.findall(rf"{_COLUNA}", agrupamento):
+        if coluna.lower() not in _PALAVRAS_RESERVADAS and alias:
+            registrar(alias, coluna, "agrupamento")
+
+    for esquerda_alias, esquerda, direita_alias, direita in re.findall(
+        rf"\bON\s+{_COLUNA}\s*=\s*{_COLUNA}", sql, re.IGNORECASE
+    ):
+        for alias, coluna in ((esquerda_alias, esquerda), (direita_alias, direita)):
+            if coluna.lower() != "id":
+                registrar(alias or None, coluna, "juncao")
+
+    return colunas, reescritas, observacoes
+
+
+def sugerir_indices(sql: str, rotas: List[str]) -> Tuple[List[SugestaoIndice], List[str], List[str]]:
+    colunas, reescritas, observacoes = analisar_sql(sql)
+    sugestoes = []
+    for tabela, tipos in colunas.items():
+        composto = list(tipos["igualdade"])
+        if tipos["intervalo"]:
+            composto.append(tipos["intervalo"][0])
+        elif composto:
+            # Grouping columns only help after an equality prefix on the same table.
+            composto.extend(coluna for coluna in tipos["agrupamento"] if coluna not in composto)
+        if composto:
+            motivo = "filtro/agrupamento por " + ", ".join(composto[:4])
+            sugestoes.append(SugestaoIndice(tabela, tuple(composto[:4]), [motivo], list(rotas)))
+        for coluna in tipos["juncao"]:
+            if coluna not in composto[:1]:
+                sugestoes.append(SugestaoIndice(tabela, (coluna,), [f"junção por {coluna}"], list(rotas)))
+    return sugestoes, reescritas, observacoes
+
+
+async def _metadados(tabelas: Sequence[str]) -> Tuple[set, Dict[str, List[Tuple[str, ...]]]]:
+    if not tabelas:
+        return set(), {}
+    async with engine.connect() as conn:
+        views = await conn.execute(
+            text(
+                """
+                SELECT TABLE_NAME
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'VIEW'
+                """
+            )
+        )
+        estatisticas = await conn.execute(
+            text(
+                """
+                SELECT TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+                """
+            )
+        )
+        indices: Dict[Tuple[str, str], List[str]] = {}
+        for linha in estatisticas:
+            indices.setdefault((linha.TABLE_NAME, linha.INDEX_NAME), []).append(linha.COLUMN_NAME)
+    existentes: Dict[str, List[Tuple[str, ...]]] = {}
+    for (tabela, _), colunas in indices.items():
+        existentes.setdefault(tabela, []).append(tuple(colunas))
+    return {linha.TABLE_NAME for linha in views}, existentes
+
+
+def _coberto(colunas: Tuple[str, ...], existentes: List[Tuple[str, ...]]) -> bool:
+    return any(indice[: len(colunas)] == colunas for indice in existentes)
+
+
+def _consolidar(analises: List[AnaliseConsulta]) -> "OrderedDict[Tuple[str, Tuple[str, ...]], SugestaoIndice]":
+    consolidadas: "OrderedDict[Tuple[str, Tuple[str, ...]], SugestaoIndice]" = OrderedDict()
+    for analise in analises:
+        for sugestao in analise.indices:
+            chave = (sugestao.tabela, sugestao.colunas)
+            atual = consolidadas.setdefault(chave, SugestaoIndice(sugestao.tabela, sugestao.colunas))
+            for motivo in sugestao.motivos:
+                if motivo not in atual.motivos:
+                    atual.motivos.append(motivo)
+            for rota in sugestao.rotas:
+                if rota not in atual.rotas:
+                    atual.rotas.append(rota)
+    # An index whose columns are a prefix of another suggested index is redundant.
+    for chave in list(consolidadas):
+        tabela, colunas = chave
+        if any(
+            outra_tabela == tabela and outra != colunas and outra[: len(colunas)] == colunas
+            for outra_tabela, outra in consolidadas
+        ):
+            consolidadas.pop(chave)
+    return consolidadas
+
+
+def montar_script(
+    analises: List[AnaliseConsulta], views: set, existentes: Dict[str, List[Tuple[str, ...]]]
+) -> str:
+    linhas = [
+        f"-- Índices sugeridos por tools/index_advisor.py em {date.today().isoformat()}",
+        "-- Revise antes de aplicar: as sugestões são heurísticas e baseadas nas consultas dos routers.",
+        "",
+    ]
+
+    achados_por_tabela: Dict[str, List[str]] = {}
+    for analise in analises:
+        for achado in analise.achados:
+            if achado.problemas:
+                descricao = f"{achado.tipo_acesso} ~{achado.linhas} linhas ({', '.join(achado.problemas)})"
+                achados_por_tabela.setdefault(achado.tabela, [])
+                if descricao not in achados_por_tabela[achado.tabela]:
+                    achados_por_tabela[achado.tabela].append(descricao)
+
+    for (tabela, colunas), sugestao in _consolidar(analises).items():
+        if _coberto(colunas, existentes.get(tabela, [])):
+            continue
+        linhas.append(f"-- {tabela} ({', '.join(colunas)})")
+        linhas.append(f"--   motivo: {'; '.join(sugestao.motivos)}")
+        linhas.append(f"--   rotas: {', '.join(sugestao.rotas)}")
+        for descricao in achados_por_tabela.get(tabela, []):
+            linhas.append(f"--   EXPLAIN: {descricao}")
+        if tabela in views:
+            linhas.append(f"--   {tabela} é uma view: crie o índice equivalente na tabela base.")
+            linhas.append(f"-- CREATE INDEX {sugestao.nome} ON {tabela} ({', '.join(colunas)});")
+        else:
+            linhas.append(f"CREATE INDEX {sugestao.nome} ON {tabela} ({', '.join(colunas)});")
+        linhas.append("")
+
+    reescritas = OrderedDict()
+    for analise in analises:
+        for item in analise.reescritas + analise.observacoes:
+            reescritas.setdefault(item, []).extend(
+                rota for rota in analise.consulta.rotas if rota not in reescritas.get(item, [])
+            )
+    if reescritas:
+        linhas.append("-- Predicados a reescrever nos routers (app/routers/):")
+        for item, rotas in reescritas.items():
+            linhas.append(f"--   [{', '.join(rotas)}] {item}")
+        linhas.append("")
+
+    return "\n".join(linhas)
+
+
+def imprimir_relatorio(analises: List[AnaliseConsulta]) -> None:
+    por_rota: Dict[str, Dict[str, int]] = {}
+    for analise in analises:
+        problemas = [problema for achado in analise.achados for problema in achado.problemas]
+        for rota in analise.consulta.rotas:
+            resumo = por_rota.setdefault(rota, {"consultas": 0, "full scan": 0, "filesort": 0, "temporary": 0})
+            resumo["consultas"] += 1
+            for problema in ("full scan", "filesort", "temporary"):
+                resumo[problema] += problemas.count(problema)
+    print(f"{'rota':<45} {'consultas':>9} {'full scan':>9} {'filesort':>9} {'temporary':>9}")
+    for rota, resumo in sorted(por_rota.items(), key=lambda item: -item[1]["full scan"]):
+        print(
+            f"{rota:<45} {resumo['consultas']:>9} {resumo['full scan']:>9} "
+            f"{resumo['filesort']:>9} {resumo['temporary']:>9}"
+        )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    representativos = {"ano": args.ano, "anos": [args.ano - 1, args.ano], "mes": args.mes, "dias": args.dias}
+    consultas = await coletar_consultas(representativos)
+
+    analises = []
+    for consulta in consultas.values():
+        achados = [] if args.sem_explain else await executar_explain(consulta)
+        indices, reescritas, observacoes = sugerir_indices(consulta.statement, consulta.rotas)
+        analises.append(AnaliseConsulta(consulta, achados, indices, reescritas, observacoes))
+
+    tabelas = sorted({sugestao.tabela for analise in analises for sugestao in analise.indices})
+    views, existentes = (set(), {}) if args.sem_explain else await _metadados(tabelas)
+
+    imprimir_relatorio(analises)
+    args.saida.write_text(montar_script(analises, views, existentes), encoding="utf-8")
+    print(f"{len(consultas)} consultas analisadas; script gravado em {args.saida}")
+    await engine.dispose()
+
+
+def main() -> None:
+    hoje = datetime.utcnow()
+    parser = argparse.ArgumentParser(
+        description="Executa EXPLAIN nas consultas dos routers e sugere índices e reescritas."
+    )
+    parser.add_argument("--ano", type=int, default=hoje.year, help="Ano representativo (padrão: ano atual)")
+    parser.add_argument("--mes", type=int, default=hoje.month, help="Mês representativo (padrão: mês atual)")
+    parser.add_argument("--dias", type=int, default=90, help="Janela de vencimento de contratos")
+    parser.add_argument("--saida", type=Path, default=SAIDA_PADRAO, help="Arquivo SQL gerado")
+    parser.add_argument(
+        "--sem-explain", action="store_true", help="Apenas análise estática das consultas (sem EXPLAIN)"
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()